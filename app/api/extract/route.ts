@@ -22,10 +22,99 @@ function formatTranscript(text: string, hosts: string[] = [], guests: string[] =
   return fixedLines.join('\n\n');
 }
 
-export async function POST(request: NextRequest) {
-  try {
-    const { text, docTitle } = await request.json();
+// Transcripts are split into windows of about 3000 tokens (4 chars/token) at
+// speaker/timestamp boundaries; windows are extracted in parallel and merged
+const WINDOW_CHARS = 12000;
+// Windows sent to OpenAI at once, so a long transcript cannot burst past the rate limit
+const MAX_CONCURRENT_WINDOWS = 4;
+const TURN_START = /\n+(?=\[\d{1,2}:\d{2}(?::\d{2})?\]|\*\*[^*\n]{1,80}\*\*|[^\s:\[][^:\n]{0,60}:\s)/g;
+
+type Extraction = {
+  episodeTitle?: string;
+  series?: string;
+  episodeNumber?: string;
+  date?: string;
+  hosts?: string[];
+  guests?: string[];
+  guestWorkExperience?: { name: string; title: string; company: string }[];
+  [key: string]: unknown;
+};
+
+function chunkTranscript(text: string, maxChars: number = WINDOW_CHARS): string[] {
+  // Cut points at the start of every speaker turn, plus extra cuts (at a
+  // space) inside any turn longer than one window
+  const starts = [0];
+  for (const match of text.matchAll(TURN_START)) {
+    if (match.index! > 0) starts.push(match.index!);
+  }
+  starts.push(text.length);
+
+  const cuts = [0];
+  for (let i = 1; i < starts.length; i++) {
+    let start = starts[i - 1];
+    while (starts[i] - start > maxChars) {
+      const space = text.lastIndexOf(' ', start + maxChars);
+      start = space > start ? space + 1 : start + maxChars;
+      cuts.push(start);
+    }
+    cuts.push(starts[i]);
+  }
+
+  // Pack consecutive pieces into windows of at most maxChars
+  const windows: string[] = [];
+  let windowStart = 0;
+  let windowEnd = 0;
+  for (const cut of cuts.slice(1)) {
+    if (cut - windowStart > maxChars && windowEnd > windowStart) {
+      windows.push(text.slice(windowStart, windowEnd));
+      windowStart = windowEnd;
+    }
+    windowEnd = cut;
+  }
+  if (windowEnd > windowStart) windows.push(text.slice(windowStart, windowEnd));
+  return windows;
+}
+
+const normalize = (value: string) => value.split(/\s+/).filter(Boolean).join(' ').toLowerCase();
+
+function mergeNames(names: string[]): string[] {
+  const seen = new Map<string, string>();
+  for (const name of names) {
+    if (typeof name === 'string' && name.trim() && !seen.has(normalize(name))) {
+      seen.set(normalize(name), name.split(/\s+/).filter(Boolean).join(' '));
+    }
+  }
+  return [...seen.values()];
+}
+
+function mergeExtractions(parts: Extraction[]): Extraction {
+  // Scalars take the first non-empty value in transcript order; names are
+  // deduplicated, and anyone who is a host is not also listed as a guest
+  const merged: Extraction = {};
+  for (const part of parts) {
+    for (const [key, value] of Object.entries(part)) {
+      if (Array.isArray(value)) continue;
+      if (value !== null && value !== undefined && value !== '' && !merged[key]) merged[key] = value;
+    }
+  }
+
+  const hosts = mergeNames(parts.flatMap((part) => part.hosts ?? []));
+  const hostKeys = new Set(hosts.map(normalize));
+  const guests = mergeNames(parts.flatMap((part) => part.guests ?? [])).filter((name) => !hostKeys.has(normalize(name)));
+
+  const experience = new Map<string, { name: string; title: string; company: string }>();
+  for (const entry of parts.flatMap((part) => part.guestWorkExperience ?? [])) {
+    if (!entry?.name) continue;
+    const key = `${normalize(entry.name)}|${normalize(entry.company ?? '')}`;
+    const existing = experience.get(key);
+    if (!existing || (!existing.title && entry.title)) experience.set(key, entry);
+  }
 
+  return { ...merged, hosts, guests, guestWorkExperience: [...experience.values()] };
+}
+
+async function extractWindow(window: string, part: number, parts: number, docTitle?: string): Promise<Extraction | null> {
+  try {
     const response = await fetch('https://api.openai.com/v1/chat/completions', {
       method: 'POST',
       headers: {
@@ -37,11 +126,11 @@ export async function POST(request: NextRequest) {
         messages: [
           {
             role: 'system',
-            content: 'Extract podcast data as JSON. Return only valid JSON with: episodeTitle, series, episodeNumber, hosts (array), guests (array), guestWorkExperience (array of {name, title, company}), date (YYYY-MM-DD format if found). Look at document title and content for all fields.',
+            content: 'Extract podcast data as JSON. Return only valid JSON with: episodeTitle, series, episodeNumber, hosts (array), guests (array), guestWorkExperience (array of {name, title, company}), date (YYYY-MM-DD format if found). Look at document title and content for all fields. The transcript may be one part of a longer episode; extract only what this part contains and leave other fields empty.',
           },
           {
             role: 'user',
-            content: `Document title: ${docTitle || 'N/A'}\n\nExtract from this transcript:\n\n${text.slice(0, 4000)}`,
+            content: `Document title: ${docTitle || 'N/A'}\n\nExtract from this transcript (part ${part} of ${parts}):\n\n${window}`,
           },
         ],
         temperature: 0.1,
@@ -52,11 +141,42 @@ export async function POST(request: NextRequest) {
     const data = await response.json();
     const content = data.choices[0].message.content;
     const jsonMatch = content.match(/\{[\s\S]*\}/);
-    const extracted = jsonMatch ? JSON.parse(jsonMatch[0]) : {};
+    return jsonMatch ? JSON.parse(jsonMatch[0]) : {};
+  } catch (error) {
+    console.error(`Window ${part} of ${parts} failed:`, error);
+    return null;
+  }
+}
+
+async function extractWindows(windows: string[], docTitle?: string): Promise<(Extraction | null)[]> {
+  // A small worker pool: each worker takes the next window until none are left
+  const results: (Extraction | null)[] = new Array(windows.length).fill(null);
+  let next = 0;
+  const worker = async () => {
+    while (next < windows.length) {
+      const i = next++;
+      results[i] = await extractWindow(windows[i], i + 1, windows.length, docTitle);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(MAX_CONCURRENT_WINDOWS, windows.length) }, worker));
+  return results;
+}
+
+export async function POST(request: NextRequest) {
+  try {
+    const { text, docTitle } = await request.json();
+
+    // Extract windows concurrently (at most MAX_CONCURRENT_WINDOWS at a time)
+    const windows = text && text.trim() ? chunkTranscript(text) : [];
+    const results = await extractWindows(windows, docTitle);
+    const parts = results.filter((result): result is Extraction => result !== null);
+    // An empty transcript has no windows and yields an empty extraction
+    if (windows.length > 0 && parts.length === 0) throw new Error('All transcript windows failed');
+    const extracted = mergeExtractions(parts);
 
     return NextResponse.json({
       ...extracted,
-      transcript: formatTranscript(text, extracted.hosts, extracted.guests)
+      transcript: formatTranscript(text || '', extracted.hosts, extracted.guests)
     });
   } catch (error) {
     console.error('API Error:', error);
@@ -0,0 +1,144 @@
+"""
+Benchmark extract_podcast_info against the original multi-regex version.
+
+Usage: python -m benchmarks.bench_extract_podcast_info [--sizes 16,64] [--skip-legacy]
+
+Prints the cost per MB of transcript for both implementations on synthetic
+transcripts and checks that they extract the same hosts, guests, title and
+work experience. The original version backtracks heavily on long lines, so
+the default sizes and line lengths are kept small enough for it to finish.
+"""
+
+import argparse
+import random
+import re
+import time
+
+from podcast_info_matcher import extract_podcast_info
+
+_SPEAKERS = ["Jane Doe", "John Smith", "Maria Lopez", "Wei Chen"]
+_FILLER = (
+    "we talked about the future of the team and how leadership shows up in hard moments "
+    "it was a long road but the people around me made the difference every single day "
+    "so when you look at the data the story is really about trust and consistency"
+).split()
+_INTROS = [
+    "Welcome to the Leadership Today podcast.",
+    "I'm {name} and this is where we talk about work.",
+    "We are joined by {name}, Senior Director at Acme Health.",
+    "My guest {name} was CEO of Northwind before that.",
+    "She spent ten years as VP of Sales at Contoso.",
+]
+
+def legacy_extract_podcast_info(transcript_text):
+    """The original extract_podcast_info from extract_core_data.py, kept for comparison"""
+    title_patterns = [
+        r'Welcome to (.+?) podcast',
+        r'Welcome to (.+?)\.',
+        r'This is (.+?) podcast',
+        r'You\'re listening to (.+?) podcast',
+        r'(.+?) Podcast',
+        r'(.+?) podcast'
+    ]
+    episode_title = ""
+    for pattern in title_patterns:
+        match = re.search(pattern, transcript_text, re.IGNORECASE)
+        if match:
+            episode_title = match.group(1).strip()
+            break
+
+    host_patterns = [
+        r"I'm ([A-Z][a-z]+ [A-Z][a-z]+)",
+        r"My name is ([A-Z][a-z]+ [A-Z][a-z]+)",
+        r"This is ([A-Z][a-z]+ [A-Z][a-z]+)",
+        r"I am ([A-Z][a-z]+ [A-Z][a-z]+)"
+    ]
+    guest_patterns = [
+        r"joined by ([A-Z][a-z]+ [A-Z][a-z]+)",
+        r"with us today ([A-Z][a-z]+ [A-Z][a-z]+)",
+        r"welcome ([A-Z][a-z]+ [A-Z][a-z]+)",
+        r"guest ([A-Z][a-z]+ [A-Z][a-z]+)"
+    ]
+    all_names = set()
+    for pattern in host_patterns + guest_patterns:
+        for match in re.findall(pattern, transcript_text, re.IGNORECASE):
+            if len(match.split()) == 2:
+                all_names.add(match)
+    names_list = list(all_names)
+    if len(names_list) >= 2:
+        hosts, guests = names_list[:2], names_list[2:]
+    else:
+        hosts, guests = names_list, []
+
+    work_experience = []
+    title_company_patterns = [
+        r"([A-Z][a-z]+ [A-Z][a-z]+).*?([A-Z][A-Z][A-Z]|[A-Z][a-z]+\s+[A-Z][a-z]+).*?(CEO|CTO|CFO|VP|Vice President|President|Director|Manager|Chief|Senior|Principal)",
+        r"([A-Z][a-z]+ [A-Z][a-z]+).*?(CEO|CTO|CFO|VP|Vice President|President|Director|Manager|Chief|Senior|Principal).*?at ([A-Z][a-z]+)",
+    ]
+    for pattern in title_company_patterns:
+        for match in re.findall(pattern, transcript_text, re.IGNORECASE):
+            if len(match) >= 3:
+                title = match[1] if 'CEO' in match[1] or 'VP' in match[1] else match[2]
+                company = match[2] if 'CEO' in match[1] or 'VP' in match[1] else match[1]
+                work_experience.append({'name': match[0], 'title': title, 'company': company})
+
+    return {
+        'episode_title': episode_title,
+        'hosts': hosts,
+        'guests': guests,
+        'work_experience': work_experience
+    }
+
+def make_transcript(size_bytes, words_per_turn, seed=0):
+    """Build a synthetic '[HH:MM:SS] Speaker: text' transcript of about size_bytes"""
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    seconds = 0
+    while total < size_bytes:
+        speaker = rng.choice(_SPEAKERS)
+        words = [rng.choice(_FILLER) for _ in range(words_per_turn)]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(_INTROS).format(name=rng.choice(_SPEAKERS)))
+        line = f"[{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}] {speaker.split()[0]}: {' '.join(words)}"
+        lines.append(line)
+        total += len(line) + 2
+        seconds += rng.randint(5, 40)
+    return '\n\n'.join(lines)
+
+def _time_per_mb(func, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best / (len(text.encode('utf-8')) / 1e6), result
+
+def _same_output(a, b):
+    return (
+        a['episode_title'] == b['episode_title']
+        and a['work_experience'] == b['work_experience']
+        and set(a['hosts'] + a['guests']) == set(b['hosts'] + b['guests'])
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="16,64", help="transcript sizes in KB (default: 16,64)")
+    parser.add_argument("--words-per-turn", type=int, default=20, help="words per speaker turn (default: 20)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, best is kept (default: 3)")
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the compiled matcher")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'compiled s/MB':>14} {'legacy s/MB':>12} {'speedup':>8}  same output")
+    for size_kb in (int(size) for size in args.sizes.split(',')):
+        text = make_transcript(size_kb * 1024, args.words_per_turn)
+        new_cost, new_result = _time_per_mb(extract_podcast_info, text, args.repeat)
+        if args.skip_legacy:
+            print(f"{size_kb:>6}KB {new_cost:>14.4f} {'-':>12} {'-':>8}  -")
+            continue
+        old_cost, old_result = _time_per_mb(legacy_extract_podcast_info, text, 1)
+        same = _same_output(old_result, new_result)
+        print(f"{size_kb:>6}KB {new_cost:>14.4f} {old_cost:>12.4f} {old_cost / new_cost:>7.1f}x  {'yes' if same else 'NO'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark the streaming transcript reformatter against the regex version.
+
+Usage: python -m benchmarks.bench_reformat_transcripts [--sizes 1,8,32] [--skip-legacy]
+
+Writes synthetic multi-hour transcripts (sizes in MB) to a temporary file and
+prints the cost per MB and peak Python memory of reformat_file() (streaming
+from the file) and of reformat_transcript_regex() (on the whole string). The
+streaming output is checked against a direct port of formatTranscript() from
+app/api/extract/route.ts.
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+
+from reformat_transcripts import reformat_file, reformat_transcript_regex
+
+_SPEAKERS = ["Jane Doe", "John Smith", "Maria Lopez", "Wei Chen"]
+_FILLER = (
+    "we talked about the future of the team and how leadership shows up in hard moments "
+    "it was a long road but the people around me made the difference every single day "
+    "so when you look at the data the story is really about trust and consistency"
+).split()
+
+def typescript_format_transcript(text):
+    """formatTranscript() from app/api/extract/route.ts, ported as-is, for checking output"""
+    formatted = re.sub(r"\[(\d{2}:\d{2}:\d{2})\]\s*([^:\n]+):\s*", r"\2: [\1] ", text)
+    last_speaker = None
+    fixed_lines = []
+    for line in formatted.split('\n\n'):
+        if re.match(r"\[(\d{2}:\d{2}:\d{2})\]", line) and last_speaker:
+            line = f"{last_speaker}: {line}"
+        else:
+            match = re.match(r"([^:\[]+):", line)
+            if match:
+                last_speaker = match.group(1).strip()
+        fixed_lines.append(line)
+    return '\n\n'.join(fixed_lines)
+
+def make_transcript(size_bytes, words_per_turn, seed=0):
+    """Build a synthetic transcript of about size_bytes
+
+    Most turns are "[HH:MM:SS] Speaker: text"; some are continuation
+    paragraphs with only a timestamp, which get the previous speaker.
+    """
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    seconds = 0
+    while total < size_bytes:
+        words = ' '.join(rng.choice(_FILLER) for _ in range(words_per_turn))
+        timestamp = f"[{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}]"
+        if lines and rng.random() < 0.2:
+            line = f"{timestamp} {words}"
+        else:
+            line = f"{timestamp} {rng.choice(_SPEAKERS)}: {words}"
+        lines.append(line)
+        total += len(line) + 2
+        seconds += rng.randint(5, 40)
+    return '\n\n'.join(lines)
+
+def _measure(func, repeat):
+    """Return (best seconds, peak traced bytes of the last run)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,8,32", help="transcript sizes in MB (default: 1,8,32)")
+    parser.add_argument("--words-per-turn", type=int, default=40, help="words per speaker turn (default: 40)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, best is kept (default: 3)")
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the streaming reformatter")
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'stream s/MB':>12} {'stream peak':>12} {'regex s/MB':>11} {'regex peak':>11}  matches route.ts")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "transcript.txt")
+        output_path = os.path.join(tmp, "reformatted.txt")
+        for size_mb in (int(size) for size in args.sizes.split(',')):
+            text = make_transcript(size_mb * 1024 * 1024, args.words_per_turn)
+            with open(input_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+            mb = len(text.encode('utf-8')) / 1e6
+
+            stream_time, stream_peak = _measure(lambda: reformat_file(input_path, output_path), args.repeat)
+            with open(output_path, 'r', encoding='utf-8', newline='') as f:
+                same = f.read() == typescript_format_transcript(text)
+            row = f"{size_mb:>4}MB {stream_time / mb:>12.4f} {stream_peak / 1e6:>10.2f}MB"
+            if args.skip_legacy:
+                print(f"{row} {'-':>11} {'-':>11}  {'yes' if same else 'NO'}")
+                continue
+            regex_time, regex_peak = _measure(lambda: reformat_transcript_regex(text), args.repeat)
+            print(f"{row} {regex_time / mb:>11.4f} {regex_peak / 1e6:>9.2f}MB  {'yes' if same else 'NO'}")
+
+if __name__ == "__main__":
+    main()
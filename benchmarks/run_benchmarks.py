@@ -0,0 +1,253 @@
+"""
+Benchmark suite for the extraction pipeline, checked against a stored baseline.
+
+Usage: python -m benchmarks.run_benchmarks [--count 50] [--size-kb 40] [--save-baseline]
+
+Generates a reproducible synthetic corpus (see transcript_generator.py) and
+times extract_text_from_docx, parse_filename_info, extract_podcast_info,
+the enhancement stages of enhance_episode_data, the finalizers (JSON export
+and artifact builds) and the transcript reformatters on it. Each case keeps
+its best time over --repeat runs and a digest of its output.
+
+--save-baseline writes the results to the baseline file (a machine-local
+file under data/ by default). Later runs with the same corpus settings are
+compared against it: a case that got more than --tolerance slower, or whose
+output digest changed, is reported and the exit status is 1.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.transcript_generator import generate_corpus
+from episode_store import STORE_PATH, EpisodeWriter, iter_episodes
+from extract_core_data import build_episode_data, extract_text_from_docx
+from filename_info import parse_filename_info
+from podcast_info_matcher import extract_podcast_info
+from reformat_transcripts import reformat_file, reformat_transcript, reformat_transcript_regex
+
+BASELINE_PATH = "data/benchmark_baseline.json"
+TAXONOMY_PATH = os.path.abspath("config/topic_taxonomy.json")
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+class Corpus:
+    """The generated files of one benchmark run, with their texts preloaded"""
+
+    def __init__(self, directory, count, size_bytes, seed):
+        paths = generate_corpus(directory, count, size_bytes, seed=seed)
+        self.directory = directory
+        self.docx_paths = [path for path in paths if path.endswith('.docx')]
+        self.txt_paths = [path for path in paths if path.endswith('.txt')]
+        self.filenames = [os.path.basename(path) for path in paths]
+        self.texts = [_read_text(path) for path in self.txt_paths]
+        self.docx_bytes = sum(os.path.getsize(path) for path in self.docx_paths)
+        self.text_bytes = sum(len(text.encode('utf-8')) for text in self.texts)
+
+def bench_extract_text_from_docx(corpus):
+    return corpus.docx_bytes, lambda: [extract_text_from_docx(path) for path in corpus.docx_paths]
+
+def bench_parse_filename_info(corpus):
+    # Repeated so the case runs long enough to time reliably
+    filenames = corpus.filenames * 200
+    return None, lambda: [parse_filename_info(filename) for filename in filenames]
+
+def bench_extract_podcast_info(corpus):
+    return corpus.text_bytes, lambda: [extract_podcast_info(text) for text in corpus.texts]
+
+def bench_reformat_transcript(corpus):
+    return corpus.text_bytes, lambda: [reformat_transcript(text) for text in corpus.texts]
+
+def bench_reformat_transcript_regex(corpus):
+    return corpus.text_bytes, lambda: [reformat_transcript_regex(text) for text in corpus.texts]
+
+def bench_reformat_file(corpus):
+    output_dir = os.path.join(corpus.directory, "reformatted")
+    os.makedirs(output_dir, exist_ok=True)
+
+    def run():
+        outputs = []
+        for path in corpus.txt_paths:
+            output_path = os.path.join(output_dir, os.path.basename(path))
+            reformat_file(path, output_path)
+            outputs.append(_read_text(output_path))
+        return outputs
+    return corpus.text_bytes, run
+
+def bench_enhance_episode_data(corpus):
+    # Imported here because enhance_existing_data reads relative paths at call time
+    from enhance_existing_data import enhance_episode_data
+
+    workdir = os.path.join(corpus.directory, "enhance")
+    os.makedirs(workdir, exist_ok=True)
+    episodes = [
+        build_episode_data(os.path.basename(path), text, extract_podcast_info(text), "2025-01-01T00:00:00")
+        for path, text in zip(corpus.txt_paths, corpus.texts)
+    ]
+
+    def run():
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            with EpisodeWriter(STORE_PATH) as writer:
+                for episode in episodes:
+                    writer.write(episode)
+            # Stages only: the finalizers are timed by their own case
+            with contextlib.redirect_stdout(io.StringIO()):
+                enhance_episode_data(TAXONOMY_PATH, finalizers=())
+            # extractedAt changes every run, so it is left out of the digest
+            return [{key: value for key, value in episode.items() if key != 'extractedAt'}
+                    for episode in iter_episodes(STORE_PATH)]
+        finally:
+            os.chdir(cwd)
+    return corpus.text_bytes, run
+
+def bench_finalizers(corpus):
+    from corpus_stats import STATS_PATH
+    from person_index import PEOPLE_PATH
+    from pipeline import run_finalizers
+
+    workdir = os.path.join(corpus.directory, "finalize")
+    episodes = [
+        build_episode_data(os.path.basename(path), text, extract_podcast_info(text), "2025-01-01T00:00:00")
+        for path, text in zip(corpus.txt_paths, corpus.texts)
+    ]
+
+    def run():
+        # Every run starts without artifacts, so incremental builds do not make later runs faster
+        shutil.rmtree(workdir, ignore_errors=True)
+        os.makedirs(workdir)
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            with EpisodeWriter(STORE_PATH) as writer:
+                for episode in episodes:
+                    writer.write(episode)
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_finalizers(STORE_PATH)
+            with open(STATS_PATH, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+            stats.pop('generatedAt', None)
+            with open(PEOPLE_PATH, 'r', encoding='utf-8') as f:
+                people = json.load(f)
+            return [stats, people]
+        finally:
+            os.chdir(cwd)
+    return corpus.text_bytes, run
+
+CASES = {
+    "extract_text_from_docx": bench_extract_text_from_docx,
+    "parse_filename_info": bench_parse_filename_info,
+    "extract_podcast_info": bench_extract_podcast_info,
+    "reformat_transcript": bench_reformat_transcript,
+    "reformat_transcript_regex": bench_reformat_transcript_regex,
+    "reformat_file": bench_reformat_file,
+    "enhance_episode_data": bench_enhance_episode_data,
+    "finalizers": bench_finalizers,
+}
+
+def run_case(setup, corpus, repeat):
+    """Return the best time over repeat runs, the bytes processed and the output digest"""
+    nbytes, func = setup(corpus)
+    best = float('inf')
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func()
+        best = min(best, time.perf_counter() - start)
+    return {'seconds': best, 'bytes': nbytes, 'digest': _digest(output)}
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages for results against a baseline"""
+    problems = []
+    for name, result in results.items():
+        expected = baseline['cases'].get(name)
+        if expected is None:
+            continue
+        if result['digest'] != expected['digest']:
+            problems.append(f"{name}: output changed (digest {expected['digest']} -> {result['digest']})")
+        limit = expected['seconds'] * (1 + tolerance)
+        if result['seconds'] > limit:
+            problems.append(
+                f"{name}: {result['seconds']:.4f}s vs baseline {expected['seconds']:.4f}s "
+                f"({result['seconds'] / expected['seconds']:.2f}x, limit {1 + tolerance:.2f}x)"
+            )
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=50, help="transcripts per format (default: 50)")
+    parser.add_argument("--size-kb", type=int, default=40, help="approximate size of each transcript in KB (default: 40)")
+    parser.add_argument("--seed", type=int, default=0, help="corpus random seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, best is kept (default: 3)")
+    parser.add_argument("--only", help="comma-separated case names to run (default: all)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help=f"baseline file (default: {BASELINE_PATH})")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a case fails, as a fraction (default: 0.25)")
+    args = parser.parse_args()
+
+    names = list(CASES) if not args.only else [name.strip() for name in args.only.split(',')]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}; choose from {', '.join(CASES)}")
+    settings = {'count': args.count, 'size_kb': args.size_kb, 'seed': args.seed}
+
+    results = {}
+    print(f"{'case':<28} {'seconds':>9} {'MB/s':>8}  digest")
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Corpus(tmp, args.count, args.size_kb * 1024, args.seed)
+        for name in names:
+            result = results[name] = run_case(CASES[name], corpus, args.repeat)
+            rate = f"{result['bytes'] / 1e6 / result['seconds']:>8.2f}" if result['bytes'] else f"{'-':>8}"
+            print(f"{name:<28} {result['seconds']:>9.4f} {rate}  {result['digest']}")
+
+    if args.save_baseline:
+        directory = os.path.dirname(args.baseline)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        baseline = {
+            'settings': settings,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cases': results,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['settings'] != settings:
+        print(f"Baseline was recorded with {baseline['settings']}, not {settings}; not comparing")
+        sys.exit(2)
+    if baseline.get('python') != platform.python_version():
+        print(f"Note: baseline was recorded on Python {baseline.get('python')}")
+
+    problems = compare(results, baseline, args.tolerance)
+    if problems:
+        print("\nREGRESSIONS against the baseline:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
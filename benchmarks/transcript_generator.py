@@ -0,0 +1,156 @@
+"""
+Generate synthetic podcast transcripts as DOCX and plain-text files.
+
+Usage: python -m benchmarks.transcript_generator OUT_DIR [--count 100] [--size-kb 40] [--formats docx,txt]
+
+Transcripts follow the layout of the files in Test Scripts/: a title
+paragraph with the file name, an intro by the host that names the show,
+the guests and their roles, then "[HH:MM:SS] Speaker: text" turns with some
+continuation paragraphs that have no timestamp. File names cycle through the
+three naming schemes parse_filename_info() understands. The same seed always
+produces byte-identical files, so benchmark inputs are reproducible.
+"""
+
+import argparse
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+_FIRST_NAMES = ["Jane", "John", "Maria", "Wei", "Priya", "Tom", "Aisha", "Carlos", "Elena", "Sam"]
+_LAST_NAMES = ["Doe", "Smith", "Lopez", "Chen", "Patel", "Brown", "Khan", "Garcia", "Novak", "Okafor"]
+_SHOWS = ["Leadership Today", "Next in Health", "PWC Pulse", "Mya Shift", "Present"]
+_TITLES = ["Senior Director", "VP of Sales", "Chief People Officer", "Managing Partner", "CTO"]
+_COMPANIES = ["Acme Health", "Northwind", "Contoso", "Globex", "Initech"]
+_SERIES = ["CLS", "MBS", "Pulse", "NIH"]
+_FILLER = (
+    "we talked about the future of the team and how leadership shows up in hard moments "
+    "it was a long road but the people around me made the difference every single day "
+    "so when you look at the data the story is really about trust and consistency "
+    "our patients and clients expect technology and innovation to improve the experience "
+    "culture and strategy both matter when the business is going through transformation"
+).split()
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+_DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+_DOCUMENT_END = '<w:sectPr/></w:body></w:document>'
+
+def _name(rng):
+    return f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+
+def _timestamp(seconds):
+    return f"[{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}]"
+
+def transcript_filename(index, extension=".docx"):
+    """File name for the index-th transcript, cycling through the real naming schemes"""
+    year = 2020 + index % 6
+    date = f"{year}{index % 12 + 1:02d}{index % 28 + 1:02d}"
+    scheme = index % 3
+    if scheme == 0:
+        name = f"{date}-{_SERIES[index % len(_SERIES)].lower()}-{index:04d}-V1-TRX"
+    elif scheme == 1:
+        name = f"{date}-{_SERIES[index % len(_SERIES)]}-{index:04d}-V1"
+    else:
+        name = f"{year % 100:02d}_{date[4:]}_Present_{index:04d}-V1"
+    return name + extension
+
+def make_transcript(title, size_bytes, words_per_turn=40, seed=0):
+    """Build the paragraphs of a synthetic transcript of about size_bytes"""
+    rng = random.Random(seed)
+    host = _name(rng)
+    guests = [_name(rng) for _ in range(rng.randint(1, 2))]
+    show = rng.choice(_SHOWS)
+    paragraphs = [
+        title,
+        "[00:00:00] ",
+        f"{host}: Welcome to the {show} podcast. I'm {host}, and today we are joined by "
+        + " and ".join(f"{guest}, {rng.choice(_TITLES)} at {rng.choice(_COMPANIES)}" for guest in guests) + ".",
+    ]
+    speakers = [host] + guests
+    total = sum(len(paragraph) + 1 for paragraph in paragraphs)
+    seconds = rng.randint(10, 30)
+    while total < size_bytes:
+        words = ' '.join(rng.choice(_FILLER) for _ in range(words_per_turn))
+        if rng.random() < 0.2:
+            paragraph = words
+        else:
+            paragraph = f"{_timestamp(seconds)} {rng.choice(speakers)}: {words}"
+        if rng.random() < 0.05:
+            paragraph += f' "{" ".join(rng.choice(_FILLER) for _ in range(12))}"'
+        paragraphs.append(paragraph)
+        total += len(paragraph.encode('utf-8')) + 1
+        seconds += rng.randint(5, 40)
+    return paragraphs
+
+def write_docx(path, paragraphs):
+    """Write paragraphs as a minimal WordprocessingML document"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _PACKAGE_RELS)
+        body = ''.join(
+            f'<w:p><w:r><w:t xml:space="preserve">{escape(paragraph)}</w:t></w:r></w:p>'
+            for paragraph in paragraphs
+        )
+        archive.writestr('word/document.xml', _DOCUMENT_START + body + _DOCUMENT_END)
+
+def write_txt(path, paragraphs):
+    """Write paragraphs as a plain-text transcript, separated by blank lines"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('\n\n'.join(paragraphs))
+
+def generate_corpus(directory, count, size_bytes, formats=("docx", "txt"), words_per_turn=40, seed=0):
+    """Write count transcripts in each format to directory and return their paths
+
+    Transcript i has the same text in every format, so DOCX and plain-text
+    timings are comparable.
+    """
+    os.makedirs(directory, exist_ok=True)
+    writers = {"docx": write_docx, "txt": write_txt}
+    paths = []
+    for index in range(count):
+        base_name = os.path.splitext(transcript_filename(index))[0]
+        paragraphs = make_transcript(base_name, size_bytes, words_per_turn, seed=seed * 1_000_003 + index)
+        for extension in formats:
+            path = os.path.join(directory, f"{base_name}.{extension}")
+            writers[extension](path, paragraphs)
+            paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", help="folder to write the transcripts to")
+    parser.add_argument("--count", type=int, default=100, help="number of transcripts (default: 100)")
+    parser.add_argument("--size-kb", type=int, default=40, help="approximate size of each transcript in KB (default: 40)")
+    parser.add_argument("--formats", default="docx,txt", help="comma-separated formats: docx, txt (default: docx,txt)")
+    parser.add_argument("--words-per-turn", type=int, default=40, help="words per speaker turn (default: 40)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args()
+
+    formats = [extension.strip() for extension in args.formats.split(',') if extension.strip()]
+    unknown = set(formats) - {"docx", "txt"}
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+    paths = generate_corpus(args.directory, args.count, args.size_kb * 1024, formats, args.words_per_turn, args.seed)
+    print(f"Wrote {len(paths)} files to {args.directory}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Change manifest for Firestore sync: which episodes, and which parts of them, changed.
+
+Every episode's fields are split into field groups, and each group gets a
+content fingerprint (a hash of its fields' JSON):
+
+    metadata      everything not in another group (title, date, hosts,
+                  guests, work experience, word count ...)
+    transcript    the transcript text
+    enrichments   key topics, notable quotes and summary
+
+extractedAt is left out, since it changes on every run without anything
+else changing; it is uploaded along with any change.
+
+The fingerprints are compared with those recorded by the last successful
+sync (data/firestore_sync.json, written by scripts/importToFirestore.ts),
+and public/data/changes.json lists the episodes added, deleted and
+modified since then, with the changed groups and their fields. Fields that
+were removed from an episode are listed too, so the sync can delete them.
+Until a sync records a new baseline, each run's manifest still covers
+everything that changed since the last sync, so nothing is lost when the
+extractors run several times between syncs. The manifest also carries the
+current fingerprints, which the sync records as the new baseline.
+
+    python change_manifest.py
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from episode_store import STORE_PATH, iter_episodes
+
+MANIFEST_PATH = "public/data/changes.json"
+SYNC_STATE_PATH = "data/firestore_sync.json"
+
+TRANSCRIPT_FIELDS = ("transcript",)
+ENRICHMENT_FIELDS = ("keyTopics", "notableQuotes", "summary")
+# Not fingerprinted: changes on every run
+UNTRACKED_FIELDS = ("extractedAt",)
+FIELD_GROUPS = ("metadata", "transcript", "enrichments")
+
+def field_group(field):
+    """The field group a stored episode field belongs to (None if untracked)"""
+    if field in TRANSCRIPT_FIELDS:
+        return "transcript"
+    if field in ENRICHMENT_FIELDS:
+        return "enrichments"
+    if field in UNTRACKED_FIELDS:
+        return None
+    return "metadata"
+
+def fingerprint_episode(episode):
+    """Return {group: [fingerprint, sorted field names]} for an episode's field groups"""
+    fields = {group: {} for group in FIELD_GROUPS}
+    for field, value in episode.items():
+        group = field_group(field)
+        if group:
+            fields[group][field] = value
+    fingerprints = {}
+    for group, values in fields.items():
+        encoded = json.dumps(values, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        fingerprints[group] = [hashlib.blake2b(encoded, digest_size=12).hexdigest(), sorted(values)]
+    return fingerprints
+
+def load_sync_state(path=SYNC_STATE_PATH):
+    """The fingerprints and time of the last sync ({} and None if there was none)"""
+    if not os.path.exists(path):
+        return {}, None
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    return state.get('fingerprints') or {}, state.get('syncedAt')
+
+def diff_fingerprints(previous, current):
+    """Return (added ids, modified entries, deleted ids) between two fingerprint tables
+
+    A modified entry is {'id', 'groups', 'fields'}: the changed groups and
+    every field of those groups before or after the change.
+    """
+    added = [episode_id for episode_id in current if episode_id not in previous]
+    deleted = [episode_id for episode_id in previous if episode_id not in current]
+    modified = []
+    for episode_id, groups in current.items():
+        before = previous.get(episode_id)
+        if before is None:
+            continue
+        changed = [group for group in FIELD_GROUPS if before.get(group, [None])[0] != groups[group][0]]
+        if changed:
+            fields = set()
+            for group in changed:
+                fields.update(groups[group][1])
+                fields.update(before.get(group, [None, []])[1])
+            modified.append({'id': episode_id, 'groups': changed, 'fields': sorted(fields)})
+    return added, modified, deleted
+
+def build_change_manifest(episodes, path=MANIFEST_PATH, sync_state_path=SYNC_STATE_PATH):
+    """Fingerprint episodes, diff them against the last sync and write the manifest; returns it"""
+    current = {}
+    for episode in episodes:
+        current[str(episode.get('id'))] = fingerprint_episode(episode)
+    previous, synced_at = load_sync_state(sync_state_path)
+    added, modified, deleted = diff_fingerprints(previous, current)
+    manifest = {
+        'generatedAt': datetime.now().isoformat(),
+        'since': synced_at,
+        'added': added,
+        'modified': modified,
+        'deleted': deleted,
+        'fingerprints': current,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return manifest
+
+def build_change_manifest_from_store(store_path=STORE_PATH, path=MANIFEST_PATH, sync_state_path=SYNC_STATE_PATH):
+    """Rebuild the change manifest from the episode store"""
+    manifest = build_change_manifest(iter_episodes(store_path), path, sync_state_path)
+    transcripts = sum('transcript' in entry['groups'] for entry in manifest['modified'])
+    print(f"Change manifest: {len(manifest['added'])} added, {len(manifest['modified'])} modified "
+          f"({transcripts} with transcript changes), {len(manifest['deleted'])} deleted since the last sync "
+          f"({manifest['since'] or 'none yet'}) in {path}")
+    return manifest
+
+if __name__ == "__main__":
+    manifest = build_change_manifest_from_store()
+    for entry in manifest['modified']:
+        print(f"  {entry['id']}: {', '.join(entry['groups'])}")
@@ -0,0 +1,188 @@
+"""
+Map-reduce extraction over whole transcripts.
+
+A transcript is cut into windows at speaker/timestamp boundaries, each
+window staying within a token budget. All windows are sent to the model
+concurrently (through the rate-limited LLMClient, so every window is cached
+on its own) and the partial JSON results are merged: names are deduplicated
+across windows, work experience is unioned, and topics and quotes are ranked
+by how many windows report them. Latency is that of the slowest window
+rather than growing with the transcript's length.
+"""
+
+import asyncio
+import re
+from llm_client import CHARS_PER_TOKEN, LLMError, parse_json_reply
+
+# Default size of one window, in estimated prompt tokens
+WINDOW_TOKENS = 3000
+
+# A new speaker turn starts on a line beginning with a timestamp
+# ("[00:01:02]"), a bold speaker name ("**Jane Doe** (Guest):") or a
+# "Speaker Name:" prefix
+_TURN_START_RE = re.compile(
+    r"\n+(?=\[\d{1,2}:\d{2}(?::\d{2})?\]|\*\*[^*\n]{1,80}\*\*|[^\s:\[][^:\n]{0,60}:\s)"
+)
+_SENTENCE_END_RE = re.compile(r"[.!?]\s+")
+
+# Field names used by the different prompts, grouped by how they are merged
+_NAME_FIELDS = {'hosts', 'guests'}
+_WORK_FIELDS = {'guest_work_experience', 'guestWorkExperience'}
+_TOPIC_FIELDS = {'key_topics', 'keyTopics'}
+_QUOTE_FIELDS = {'notable_quotes', 'notableQuotes'}
+
+MAX_TOPICS = 10
+MAX_QUOTES = 3
+
+def _turn_spans(text):
+    """Return (start, end) spans of the speaker turns in text, in order"""
+    starts = [0] + [m.start() for m in _TURN_START_RE.finditer(text) if m.start() > 0]
+    return list(zip(starts, starts[1:] + [len(text)]))
+
+def _split_long_turn(text, start, end, max_chars):
+    """Split one over-long turn into pieces of at most max_chars, preferring sentence ends"""
+    while end - start > max_chars:
+        limit = start + max_chars
+        cut = None
+        for m in _SENTENCE_END_RE.finditer(text, start + max_chars // 2, limit):
+            cut = m.end()
+        if cut is None:
+            space = text.rfind(' ', start + 1, limit)
+            cut = space + 1 if space > start else limit
+        yield start, cut
+        start = cut
+    if end > start:
+        yield start, end
+
+def chunk_transcript(text, window_tokens=WINDOW_TOKENS):
+    """Split a transcript into windows of whole speaker turns
+
+    Windows are consecutive slices of text that together cover all of it;
+    each holds at most window_tokens (estimated) unless a single sentence
+    is longer. Windows are packed from the start, so an edit near the end
+    of a transcript leaves the earlier windows (and their cached responses)
+    unchanged.
+    """
+    max_chars = window_tokens * CHARS_PER_TOKEN
+    windows = []
+    window_start = window_end = 0
+    for turn_start, turn_end in _turn_spans(text):
+        for start, end in _split_long_turn(text, turn_start, turn_end, max_chars):
+            if end - window_start > max_chars and window_end > window_start:
+                windows.append(text[window_start:window_end])
+                window_start = start
+            window_end = end
+    if window_end > window_start:
+        windows.append(text[window_start:window_end])
+    return windows
+
+def _normalize(value):
+    return ' '.join(str(value).split()).casefold()
+
+def _merge_names(values):
+    """Deduplicate names case- and whitespace-insensitively, keeping first-seen order and spelling"""
+    seen = {}
+    for name in values:
+        if isinstance(name, str) and name.strip():
+            seen.setdefault(_normalize(name), ' '.join(name.split()))
+    return list(seen.values())
+
+def _merge_work_experience(values):
+    """Union work experience entries, dropping duplicates and title-less repeats"""
+    merged = {}
+    for entry in values:
+        if not isinstance(entry, dict) or not entry.get('name'):
+            continue
+        key = (_normalize(entry.get('name', '')), _normalize(entry.get('company', '')))
+        existing = merged.get(key)
+        if existing is None or (not existing.get('title') and entry.get('title')):
+            merged[key] = entry
+    return list(merged.values())
+
+def _rank(items, key, limit):
+    """Order items by how many windows reported them, then by first appearance"""
+    counts = {}
+    first = {}
+    for item in items:
+        k = key(item)
+        if not k:
+            continue
+        counts[k] = counts.get(k, 0) + 1
+        first.setdefault(k, item)
+    ranked = sorted(first, key=lambda k: -counts[k])
+    return [first[k] for k in ranked[:limit]]
+
+def _quote_key(quote):
+    text = quote.get('quote', '') if isinstance(quote, dict) else quote
+    return _normalize(str(text).strip(' "\'“”'))
+
+def merge_extractions(parts):
+    """Merge per-window extraction results into one result
+
+    Scalar fields take the first non-empty value in transcript order (an
+    episode's title and series are given in its introduction). A name
+    reported as a host in any window is not also listed as a guest.
+    """
+    merged = {}
+    collected = {}
+    for part in parts:
+        for field, value in part.items():
+            if field in _NAME_FIELDS or field in _WORK_FIELDS or field in _TOPIC_FIELDS or field in _QUOTE_FIELDS:
+                if isinstance(value, list):
+                    collected.setdefault(field, []).extend(value)
+                else:
+                    collected.setdefault(field, [])
+            elif value not in (None, '', [], {}) and merged.get(field) in (None, '', [], {}):
+                merged[field] = value
+            else:
+                merged.setdefault(field, value)
+
+    for field, values in collected.items():
+        if field in _NAME_FIELDS:
+            merged[field] = _merge_names(values)
+        elif field in _WORK_FIELDS:
+            merged[field] = _merge_work_experience(values)
+        elif field in _TOPIC_FIELDS:
+            merged[field] = _rank(values, _normalize, MAX_TOPICS)
+        else:
+            merged[field] = _rank(values, _quote_key, MAX_QUOTES)
+
+    if 'hosts' in merged and 'guests' in merged:
+        hosts = {_normalize(name) for name in merged['hosts']}
+        merged['guests'] = [name for name in merged['guests'] if _normalize(name) not in hosts]
+    return merged
+
+async def extract_chunked(client, transcript_text, build_messages, prompt_version, cache_inputs=(),
+                          window_tokens=WINDOW_TOKENS, **request_options):
+    """Extract JSON fields from every window of a transcript concurrently and merge them
+
+    build_messages(window, part, parts) returns the chat messages for one
+    window (part is 1-based). cache_inputs are the other strings the prompt
+    is built from (e.g. the filename), used with the window text as its
+    response cache key. Windows that fail are skipped; LLMError is raised
+    only if every window fails.
+    """
+    windows = chunk_transcript(transcript_text, window_tokens)
+    if not windows:
+        raise LLMError("empty transcript")
+    results = await asyncio.gather(*(
+        client.complete(
+            build_messages(window, part, len(windows)),
+            prompt_version=prompt_version,
+            inputs=(*cache_inputs, str(part), str(len(windows)), window),
+            parse=parse_json_reply,
+            **request_options
+        )
+        for part, window in enumerate(windows, 1)
+    ), return_exceptions=True)
+
+    parts = [result for result in results if isinstance(result, dict)]
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for error in errors:
+        if not isinstance(error, (LLMError, ValueError)):
+            raise error
+    if not parts:
+        raise LLMError(f"all {len(windows)} window(s) failed: {errors[0] if errors else 'no JSON object returned'}")
+    if errors:
+        print(f"  {len(errors)} of {len(windows)} window(s) failed: {errors[0]}")
+    return merge_extractions(parts)
@@ -0,0 +1,323 @@
+"""
+Columnar episode metadata with transcripts in a separate memory-mapped blob.
+
+Readers that only need titles, dates, hosts and so on should not have to
+parse every transcript. build_columnar_store() splits the episode store
+into two files:
+
+    data/episodes.columns   every field except the transcript, one packed
+                            column per field, plus the transcript offset index
+    data/transcripts.blob   the UTF-8 transcripts back to back
+
+Each column stores one state byte per row (missing, null or value) followed
+by its values: int columns as packed 64-bit integers, low-cardinality string
+columns (series, dates) as codes into a dictionary, other strings and
+JSON-encoded values (lists, objects) as an offset array into one UTF-8
+buffer. ColumnarStore memory-maps both files and decodes a column only when
+it is first used, so listing every episode touches kilobytes per episode,
+and a transcript is read from the blob only when it is asked for.
+
+    python columnar_store.py --build
+    python columnar_store.py 20250204-MBS-0506-V1
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from array import array
+from episode_store import STORE_PATH, iter_episodes
+
+COLUMNS_PATH = "data/episodes.columns"
+TRANSCRIPTS_PATH = "data/transcripts.blob"
+
+_MAGIC = b"EPCOLS01"
+
+# Row states of a column
+_MISSING, _NULL, _VALUE = 0, 1, 2
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _read_array(typecode, data, pos, count):
+    values = array(typecode)
+    values.frombytes(data[pos:pos + count * values.itemsize])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+def _column_type(values):
+    """Pick the encoding for a column from its non-null values"""
+    present = [value for value in values if value is not _MISSING and value is not None]
+    if present and all(type(value) is int for value in present):
+        return 'int'
+    if all(isinstance(value, str) for value in present):
+        # Dictionary-encode when values repeat a lot
+        return 'dict' if len(set(present)) * 4 <= len(present) else 'str'
+    return 'json'
+
+def _encode_column(values):
+    """Return (column type, encoded bytes, extra footer entries) for one column"""
+    kind = _column_type(values)
+    states = bytes(_MISSING if value is _MISSING else _NULL if value is None else _VALUE for value in values)
+    present = [value if state == _VALUE else None for value, state in zip(values, states)]
+    if kind == 'int':
+        return kind, states + _little_endian(array('q', (value or 0 for value in present))), {}
+    if kind == 'dict':
+        dictionary = list(dict.fromkeys(value for value in present if value is not None))
+        codes = {value: code for code, value in enumerate(dictionary)}
+        return kind, states + _little_endian(array('I', (codes.get(value, 0) for value in present))), {'values': dictionary}
+    offsets = array('Q', [0])
+    chunks = []
+    for value in present:
+        if value is not None:
+            chunks.append((value if kind == 'str' else json.dumps(value, ensure_ascii=False)).encode('utf-8'))
+            offsets.append(offsets[-1] + len(chunks[-1]))
+        else:
+            offsets.append(offsets[-1])
+    return kind, states + _little_endian(offsets) + b''.join(chunks), {}
+
+def build_columnar_store(episodes, path=COLUMNS_PATH, blob_path=TRANSCRIPTS_PATH):
+    """Write the column file and transcript blob for episodes and return the episode count
+
+    Transcripts are streamed to the blob as episodes are read; only the
+    metadata columns are held in memory.
+    """
+    for file_path in (path, blob_path):
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    columns = {}
+    transcript_states = bytearray()
+    transcript_offsets = array('Q', [0])
+    count = 0
+    with open(f"{blob_path}.tmp", 'wb') as blob:
+        for episode in episodes:
+            for name, value in episode.items():
+                if name == 'transcript':
+                    continue
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [_MISSING] * count
+                column.append(value)
+            for column in columns.values():
+                if len(column) == count:
+                    column.append(_MISSING)
+
+            transcript = episode.get('transcript', _MISSING)
+            if isinstance(transcript, str):
+                data = transcript.encode('utf-8')
+                blob.write(data)
+                transcript_states.append(_VALUE)
+                transcript_offsets.append(transcript_offsets[-1] + len(data))
+            else:
+                transcript_states.append(_MISSING if transcript is _MISSING else _NULL)
+                transcript_offsets.append(transcript_offsets[-1])
+            count += 1
+
+    footer = {'rows': count, 'blob_bytes': transcript_offsets[-1], 'columns': []}
+    with open(f"{path}.tmp", 'wb') as f:
+        f.write(_MAGIC)
+        pos = len(_MAGIC)
+        footer['transcripts'] = pos
+        data = bytes(transcript_states) + _little_endian(transcript_offsets)
+        f.write(data)
+        pos += len(data)
+        for name, values in columns.items():
+            kind, data, extra = _encode_column(values)
+            footer['columns'].append({'name': name, 'type': kind, 'offset': pos, 'length': len(data), **extra})
+            f.write(data)
+            pos += len(data)
+        footer_data = json.dumps(footer, ensure_ascii=False).encode('utf-8')
+        f.write(footer_data)
+        f.write(len(footer_data).to_bytes(8, 'little'))
+    # The blob goes first: open readers keep their mapping of the old files,
+    # and new readers check the blob size recorded in the column file
+    os.replace(f"{blob_path}.tmp", blob_path)
+    os.replace(f"{path}.tmp", path)
+    return count
+
+def _map(path):
+    """Memory-map a file read-only (empty files cannot be mapped)"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class _Column:
+    """One column of a ColumnarStore, decoded lazily from the mapped file"""
+
+    def __init__(self, data, rows, entry):
+        self.name = entry['name']
+        self.type = entry['type']
+        self._data = data
+        self._rows = rows
+        self._start = entry['offset'] + rows
+        self.states = data[entry['offset']:self._start]
+        self._dictionary = entry.get('values')
+        self._values = None
+        self._offsets = None
+
+    def _value_offsets(self):
+        if self._offsets is None:
+            self._offsets = _read_array('Q', self._data, self._start, self._rows + 1)
+        return self._offsets
+
+    def get(self, row):
+        """Return the value of one row (None if it is null or missing)"""
+        if self._values is not None:
+            return self._values[row]
+        if self.states[row] != _VALUE:
+            return None
+        if self.type == 'int':
+            pos = self._start + 8 * row
+            return int.from_bytes(self._data[pos:pos + 8], 'little', signed=True)
+        if self.type == 'dict':
+            pos = self._start + 4 * row
+            return self._dictionary[int.from_bytes(self._data[pos:pos + 4], 'little')]
+        offsets = self._value_offsets()
+        base = self._start + 8 * (self._rows + 1)
+        text = str(self._data[base + offsets[row]:base + offsets[row + 1]], 'utf-8')
+        return text if self.type == 'str' else json.loads(text)
+
+    def values(self):
+        """Return every row's value as a list, decoding the column once"""
+        if self._values is None:
+            if self.type == 'int':
+                raw = _read_array('q', self._data, self._start, self._rows)
+                self._values = [value if state == _VALUE else None for value, state in zip(raw, self.states)]
+            elif self.type == 'dict':
+                raw = _read_array('I', self._data, self._start, self._rows)
+                self._values = [self._dictionary[code] if state == _VALUE else None for code, state in zip(raw, self.states)]
+            else:
+                offsets = self._value_offsets()
+                base = self._start + 8 * (self._rows + 1)
+                buffer = self._data[base:base + offsets[-1]]
+                texts = [
+                    str(buffer[offsets[row]:offsets[row + 1]], 'utf-8') if state == _VALUE else None
+                    for row, state in enumerate(self.states)
+                ]
+                if self.type == 'json':
+                    texts = [json.loads(text) if text is not None else None for text in texts]
+                self._values = texts
+        return self._values
+
+class ColumnarStore:
+    """Read access to the files written by build_columnar_store()"""
+
+    def __init__(self, path=COLUMNS_PATH, blob_path=TRANSCRIPTS_PATH):
+        self._data = _map(path)
+        if self._data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a columnar episode store")
+        footer_length = int.from_bytes(self._data[-8:], 'little')
+        footer = json.loads(bytes(self._data[-8 - footer_length:-8]))
+        self._rows = footer['rows']
+        self._blob = _map(blob_path)
+        if len(self._blob) != footer['blob_bytes']:
+            raise ValueError(f"{blob_path} does not match {path}; rebuild the columnar store")
+        pos = footer['transcripts']
+        self._transcript_states = self._data[pos:pos + self._rows]
+        self._transcript_offsets = _read_array('Q', self._data, pos + self._rows, self._rows + 1)
+        self._columns = {entry['name']: _Column(self._data, self._rows, entry) for entry in footer['columns']}
+        self._row_by_id = None
+
+    def close(self):
+        for data in (self._data, self._blob):
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def columns(self):
+        """Names of the metadata columns, in the order they first appeared"""
+        return list(self._columns)
+
+    def column(self, name):
+        """Return all values of one metadata column as a list"""
+        return self._columns[name].values()
+
+    def row(self, row, fields=None):
+        """Return the metadata of one episode by row number, without its transcript"""
+        record = {}
+        for name in fields or self._columns:
+            column = self._columns[name]
+            if column.states[row] != _MISSING:
+                record[name] = column.get(row)
+        return record
+
+    def iter_rows(self, fields=None):
+        """Yield the metadata of every episode in store order"""
+        columns = [self._columns[name] for name in fields or self._columns]
+        values = [column.values() for column in columns]
+        for row in range(self._rows):
+            yield {
+                column.name: column_values[row]
+                for column, column_values in zip(columns, values)
+                if column.states[row] != _MISSING
+            }
+
+    def row_of(self, episode_id):
+        """Return the row number of an episode id, or None"""
+        if self._row_by_id is None:
+            ids = self.column('id') if 'id' in self._columns else []
+            self._row_by_id = {str(value): row for row, value in enumerate(ids)}
+        return self._row_by_id.get(episode_id)
+
+    def get(self, episode_id, transcript=False):
+        """Return an episode's metadata (and its transcript if asked), or None"""
+        row = self.row_of(episode_id)
+        if row is None:
+            return None
+        record = self.row(row)
+        if transcript and self._transcript_states[row] != _MISSING:
+            record['transcript'] = self.transcript(row)
+        return record
+
+    def transcript(self, episode):
+        """Return one transcript, by episode id or row number, read from the blob"""
+        row = episode if isinstance(episode, int) else self.row_of(episode)
+        if row is None or self._transcript_states[row] != _VALUE:
+            return None
+        return str(self._blob[self._transcript_offsets[row]:self._transcript_offsets[row + 1]], 'utf-8')
+
+def build_columnar_store_from_store(store_path=STORE_PATH, path=COLUMNS_PATH, blob_path=TRANSCRIPTS_PATH):
+    """Rebuild the columnar store from the episode store"""
+    count = build_columnar_store(iter_episodes(store_path), path, blob_path)
+    print(f"Columnar store: {count} episodes written to {path} and {blob_path}")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or read the columnar episode store")
+    parser.add_argument("episode_id", nargs="?", help="print the metadata and start of the transcript of one episode")
+    parser.add_argument("--build", action="store_true", help=f"rebuild {COLUMNS_PATH} from {STORE_PATH}")
+    args = parser.parse_args()
+
+    if args.build:
+        build_columnar_store_from_store()
+    with ColumnarStore() as store:
+        if args.episode_id:
+            episode = store.get(args.episode_id, transcript=True)
+            if episode is None:
+                print(f"No episode {args.episode_id}")
+                sys.exit(1)
+            transcript = episode.pop('transcript', None) or ''
+            print(json.dumps(episode, indent=2, ensure_ascii=False))
+            print(transcript[:500])
+        else:
+            for episode in store.iter_rows(['id', 'date', 'episodeTitle']):
+                print(f"{episode.get('id')}  {episode.get('date') or '-'}  {episode.get('episodeTitle') or ''}")
+
+if __name__ == "__main__":
+    main()
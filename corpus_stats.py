@@ -0,0 +1,197 @@
+"""
+Corpus statistics for the dashboard, precomputed from NumPy arrays.
+
+CorpusArrays holds the episode metadata the dashboard aggregates as flat
+arrays: dates as datetime64, series as categorical codes, word counts, and
+hosts, guests and key topics as code lists (one flat array of codes plus
+per-episode offsets). compute_stats() derives every figure from those with
+bincount/unique instead of per-episode loops, and build_stats_from_store()
+writes the result to a small JSON artifact next to the legacy episode
+export. Its top-level fields match DashboardStats in lib/types.ts.
+
+Metadata is read from the columnar store (see columnar_store.py) when it is
+up to date, so no transcript is parsed.
+
+    python corpus_stats.py
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+import numpy as np
+from columnar_store import COLUMNS_PATH, TRANSCRIPTS_PATH, ColumnarStore
+from episode_store import STORE_PATH, iter_episodes
+
+STATS_PATH = "public/data/stats.json"
+TOP_N = 10
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def _categorical(values):
+    """Return (codes, names) for a sequence of strings"""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int32, count=len(values))
+    return codes, list(index)
+
+def _code_lists(lists):
+    """Return (flat codes, offsets, names) for a sequence of string lists
+
+    Repeats within one episode are counted once, so counts are episode counts.
+    """
+    index = {}
+    flat = []
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    for i, values in enumerate(lists):
+        for value in dict.fromkeys(value for value in values or () if value):
+            flat.append(index.setdefault(value, len(index)))
+        offsets[i + 1] = len(flat)
+    return np.array(flat, dtype=np.int32), offsets, list(index)
+
+def _dates(values):
+    """datetime64[D] array of ISO dates; missing or invalid dates are NaT"""
+    strings = [value if isinstance(value, str) and _DATE_RE.match(value) else 'NaT' for value in values]
+    try:
+        return np.array(strings, dtype='datetime64[D]')
+    except ValueError:
+        # An impossible date such as 2024-02-30; convert one by one
+        dates = np.full(len(strings), np.datetime64('NaT'), dtype='datetime64[D]')
+        for i, value in enumerate(strings):
+            try:
+                dates[i] = np.datetime64(value, 'D')
+            except ValueError:
+                pass
+        return dates
+
+class CorpusArrays:
+    """Episode metadata as NumPy arrays, one row per episode"""
+
+    def __init__(self, ids, dates, series, word_counts, hosts, guests, topics):
+        self.ids = list(ids)
+        self.dates = _dates(dates)
+        # Episodes without a series are grouped as "Unknown", like calculateStats()
+        self.series_codes, self.series_names = _categorical([value or 'Unknown' for value in series])
+        self.word_counts = np.array([value if isinstance(value, int) else 0 for value in word_counts], dtype=np.int64)
+        self.host_codes, self.host_offsets, self.host_names = _code_lists(hosts)
+        self.guest_codes, self.guest_offsets, self.guest_names = _code_lists(guests)
+        self.topic_codes, self.topic_offsets, self.topic_names = _code_lists(topics)
+
+    @classmethod
+    def from_episodes(cls, episodes):
+        """Build the arrays from episode records (transcripts are ignored)"""
+        columns = {name: [] for name in ('id', 'date', 'series', 'wordCount', 'hosts', 'guests', 'keyTopics')}
+        for episode in episodes:
+            for name, values in columns.items():
+                values.append(episode.get(name))
+        return cls(*columns.values())
+
+    @classmethod
+    def from_columnar_store(cls, store):
+        """Build the arrays from a ColumnarStore without touching the transcript blob"""
+        def column(name):
+            return store.column(name) if name in store.columns else [None] * len(store)
+        return cls(*(column(name) for name in ('id', 'date', 'series', 'wordCount', 'hosts', 'guests', 'keyTopics')))
+
+    def __len__(self):
+        return len(self.ids)
+
+def _top(codes, names, limit):
+    """The most frequent codes as [{'name', 'episodes'}], ties broken by name"""
+    counts = np.bincount(codes, minlength=len(names))
+    order = sorted(np.flatnonzero(counts), key=lambda code: (-counts[code], names[code]))[:limit]
+    return [{'name': names[code], 'episodes': int(counts[code])} for code in order]
+
+def _date_string(value):
+    return str(value) if not np.isnat(value) else 'N/A'
+
+def compute_stats(arrays, top_n=TOP_N):
+    """Return the dashboard statistics of a CorpusArrays as a JSON-serializable dict"""
+    count = len(arrays)
+    dated = ~np.isnat(arrays.dates)
+    dates = arrays.dates[dated]
+    series_counts = np.bincount(arrays.series_codes, minlength=len(arrays.series_names))
+    series_words = np.bincount(arrays.series_codes, weights=arrays.word_counts, minlength=len(arrays.series_names))
+    # First and last date of every series in one pass each; NaT is the
+    # smallest int64, so series without dates come out as NaT
+    days = dates.view(np.int64)
+    dated_codes = arrays.series_codes[dated]
+    series_earliest = np.full(len(arrays.series_names), np.iinfo(np.int64).max)
+    series_latest = np.full(len(arrays.series_names), np.iinfo(np.int64).min)
+    np.minimum.at(series_earliest, dated_codes, days)
+    np.maximum.at(series_latest, dated_codes, days)
+    series_earliest[series_latest == np.iinfo(np.int64).min] = np.iinfo(np.int64).min
+    series_earliest = series_earliest.view('datetime64[D]')
+    series_latest = series_latest.view('datetime64[D]')
+
+    per_series = {}
+    for code in np.argsort(-series_counts, kind='stable'):
+        per_series[arrays.series_names[code]] = {
+            'episodes': int(series_counts[code]),
+            'words': int(series_words[code]),
+            'earliest': _date_string(series_earliest[code]),
+            'latest': _date_string(series_latest[code]),
+        }
+
+    months, month_codes = np.unique(dates.astype('datetime64[M]'), return_inverse=True)
+    month_counts = np.bincount(month_codes, minlength=len(months))
+    month_words = np.bincount(month_codes, weights=arrays.word_counts[dated], minlength=len(months))
+    per_month = [
+        {'month': str(month), 'episodes': int(episodes), 'words': int(words)}
+        for month, episodes, words in zip(months, month_counts, month_words)
+    ]
+
+    words = arrays.word_counts
+    return {
+        'totalEpisodes': count,
+        'totalGuests': len(arrays.guest_names),
+        'totalHosts': len(arrays.host_names),
+        'seriesBreakdown': {arrays.series_names[code]: int(series_counts[code]) for code in range(len(arrays.series_names))},
+        'dateRange': {
+            'earliest': _date_string(dates.min()) if len(dates) else 'N/A',
+            'latest': _date_string(dates.max()) if len(dates) else 'N/A',
+        },
+        'undatedEpisodes': int(count - dated.sum()),
+        'wordCount': {
+            'total': int(words.sum()),
+            'mean': round(float(words.mean()), 1) if count else 0,
+            'median': float(np.median(words)) if count else 0,
+            'p90': float(np.percentile(words, 90)) if count else 0,
+        },
+        'perSeries': per_series,
+        'perMonth': per_month,
+        'topGuests': _top(arrays.guest_codes, arrays.guest_names, top_n),
+        'topHosts': _top(arrays.host_codes, arrays.host_names, top_n),
+        'topicFrequencies': _top(arrays.topic_codes, arrays.topic_names, len(arrays.topic_names)),
+    }
+
+def write_stats(stats, path=STATS_PATH):
+    """Write the stats artifact atomically"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({**stats, 'generatedAt': datetime.now().isoformat()}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def load_arrays(store_path=STORE_PATH, columns_path=COLUMNS_PATH, blob_path=TRANSCRIPTS_PATH):
+    """CorpusArrays for the episode store, from the columnar store when it is at least as new"""
+    if os.path.exists(columns_path) and (
+            not os.path.exists(store_path) or os.path.getmtime(columns_path) >= os.path.getmtime(store_path)):
+        with ColumnarStore(columns_path, blob_path) as store:
+            return CorpusArrays.from_columnar_store(store)
+    return CorpusArrays.from_episodes(iter_episodes(store_path))
+
+def build_stats_from_store(store_path=STORE_PATH, stats_path=STATS_PATH):
+    """Rebuild the stats artifact from the episode store"""
+    stats = compute_stats(load_arrays(store_path))
+    write_stats(stats, stats_path)
+    print(f"Corpus stats: {stats['totalEpisodes']} episodes summarized in {stats_path}")
+    return stats
+
+if __name__ == "__main__":
+    stats = build_stats_from_store()
+    print(f"Episodes: {stats['totalEpisodes']}, hosts: {stats['totalHosts']}, guests: {stats['totalGuests']}")
+    print(f"Dates: {stats['dateRange']['earliest']} - {stats['dateRange']['latest']}")
+    for series, row in stats['perSeries'].items():
+        print(f"  {series}: {row['episodes']} episodes, {row['words']} words")
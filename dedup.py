@@ -0,0 +1,219 @@
+"""
+Near-duplicate transcript detection with MinHash signatures and LSH banding.
+
+Re-delivered or re-versioned transcripts (-V1, -V3, -V1-TRX ...) have
+different ids but nearly the same text. Each transcript is reduced to a
+MinHash signature over its 5-word shingles (timestamps removed, case
+folded), and signatures are split into bands that are hashed into LSH
+buckets, so only transcripts sharing a bucket are compared. Candidate pairs
+whose estimated Jaccard similarity reaches the threshold are grouped, and
+each group keeps its newest version: highest -V number, then latest file
+modification time.
+
+Signatures use one-permutation hashing: every shingle is hashed once and
+lands in one of SIGNATURE_SIZE bins, which keep their minimum; empty bins
+borrow from the next non-empty bin. This estimates Jaccard similarity like
+SIGNATURE_SIZE independent hash functions at the cost of one.
+
+    python dedup.py "Test Scripts"
+"""
+
+import argparse
+import hashlib
+import os
+import re
+
+SHINGLE_WORDS = 5
+SIGNATURE_SIZE = 128
+BANDS = 16
+THRESHOLD = 0.8
+# Bump when the signature computation changes so cached signatures are recomputed
+SIGNATURE_VERSION = "oph-128-5-1"
+
+_TIMESTAMP_RE = re.compile(r"\[?\b\d{1,2}:\d{2}(?::\d{2})?\b\]?")
+_WORD_RE = re.compile(r"\w+")
+_VERSION_RE = re.compile(r"[-_ ]v(\d+)(?=$|[-_ .])", re.IGNORECASE)
+_EMPTY_BIN = (1 << 64) - 1
+
+def shingle_hashes(text, size=SHINGLE_WORDS):
+    """Return the set of 64-bit hashes of the size-word shingles of text"""
+    words = _WORD_RE.findall(_TIMESTAMP_RE.sub(' ', text).lower())
+    if len(words) < size:
+        words = words and [' '.join(words)]
+        size = 1
+    hashes = set()
+    for i in range(len(words) - size + 1):
+        digest = hashlib.blake2b(' '.join(words[i:i + size]).encode('utf-8'), digest_size=8).digest()
+        hashes.add(int.from_bytes(digest, 'little'))
+    return hashes
+
+def minhash(text, size=SIGNATURE_SIZE):
+    """Return the MinHash signature of text as a tuple of ints, or None if it has no words"""
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return None
+    bins = [_EMPTY_BIN] * size
+    for value in hashes:
+        slot = value % size
+        if value < bins[slot]:
+            bins[slot] = value
+    # Densify: an empty bin takes the value of the next non-empty bin to the
+    # right (wrapping), tagged with the distance so borrowed values only match
+    # values borrowed the same way
+    filled = [i for i, value in enumerate(bins) if value != _EMPTY_BIN]
+    if len(filled) < size:
+        nearest = filled[0] + size
+        for i in range(size - 1, -1, -1):
+            if bins[i] != _EMPTY_BIN:
+                nearest = i
+            else:
+                source = nearest % size
+                bins[i] = (bins[source] + (nearest - i) * 0x9E3779B97F4A7C15) & _EMPTY_BIN
+    return tuple(bins)
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+def version_number(filename):
+    """The -V<n> version in a transcript file name (0 if there is none)"""
+    match = _VERSION_RE.search(os.path.splitext(os.path.basename(filename))[0])
+    return int(match.group(1)) if match else 0
+
+def version_key(filename, mtime=0):
+    """Sort key of a transcript version; the largest key is the newest"""
+    return (version_number(filename), mtime, filename)
+
+class LSHIndex:
+    """Signatures bucketed by band, for finding candidate near-duplicates"""
+
+    def __init__(self, bands=BANDS, size=SIGNATURE_SIZE):
+        if size % bands:
+            raise ValueError(f"signature size {size} is not divisible into {bands} bands")
+        self.bands = bands
+        self.rows = size // bands
+        self._buckets = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def candidates(self, signature):
+        """Return the keys sharing at least one band with signature"""
+        found = set()
+        for band, key in self._band_keys(signature):
+            found.update(self._buckets[band].get(key, ()))
+        return found
+
+    def add(self, key, signature):
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+def find_duplicates(items, threshold=THRESHOLD, bands=BANDS):
+    """Group near-duplicate transcripts
+
+    items yields (key, signature, newness) with unique keys; signatures may
+    be None (empty transcripts are never duplicates). Returns a list of
+    groups {'keep': key, 'duplicates': [(key, similarity to keep), ...]},
+    where keep is the item with the largest newness.
+    """
+    index = LSHIndex(bands, SIGNATURE_SIZE)
+    signatures = {}
+    newness = {}
+    parent = {}
+
+    def root(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for key, signature, item_newness in items:
+        if signature is None:
+            continue
+        signatures[key] = signature
+        newness[key] = item_newness
+        parent[key] = key
+        for other in index.candidates(signature):
+            if similarity(signature, signatures[other]) >= threshold:
+                parent[root(key)] = root(other)
+        index.add(key, signature)
+
+    members = {}
+    for key in signatures:
+        members.setdefault(root(key), []).append(key)
+    groups = []
+    for keys in members.values():
+        if len(keys) < 2:
+            continue
+        keep = max(keys, key=lambda key: newness[key])
+        duplicates = sorted(
+            ((key, similarity(signatures[keep], signatures[key])) for key in keys if key != keep),
+            key=lambda pair: newness[pair[0]], reverse=True,
+        )
+        groups.append({'keep': keep, 'duplicates': duplicates})
+    groups.sort(key=lambda group: str(group['keep']))
+    return groups
+
+def superseded(groups):
+    """The keys of every duplicate that is not kept"""
+    return {key for group in groups for key, _ in group['duplicates']}
+
+def report_duplicates(groups):
+    """Print the near-duplicate groups and what is skipped"""
+    if not groups:
+        print("No near-duplicate transcripts found")
+        return
+    skipped = len(superseded(groups))
+    print(f"Near-duplicate transcripts: {len(groups)} group(s), skipping {skipped} older version(s)")
+    for group in groups:
+        print(f"  keep {group['keep']}")
+        for key, score in group['duplicates']:
+            print(f"    skip {key} ({score:.1%} similar)")
+
+def cached_minhash(get_text, digest=None, cache=None):
+    """MinHash signature of get_text(), reused from an ExtractionCache when the source is unchanged
+
+    digest is the content hash of the source file; get_text is only called
+    on a cache miss.
+    """
+    cached = cache.get_fields(digest, "minhash", SIGNATURE_VERSION) if cache and digest else None
+    if cached is not None:
+        return tuple(cached['signature']) if cached['signature'] else None
+    signature = minhash(get_text())
+    if cache and digest:
+        cache.put_fields(digest, "minhash", SIGNATURE_VERSION, {'signature': signature and list(signature)})
+    return signature
+
+def signatures_for_files(paths, read_text, cache=None):
+    """Yield (path, signature, newness) for transcript files, ready for find_duplicates()
+
+    read_text(filename, content) returns the transcript of a file's bytes.
+    Files that cannot be read get no signature and are never skipped.
+    """
+    from extraction_cache import content_hash
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        try:
+            signature = cached_minhash(lambda: read_text(os.path.basename(path), content), content_hash(content), cache)
+        except Exception as e:
+            print(f"Could not read {path} for duplicate detection: {e}")
+            signature = None
+        yield path, signature, version_key(os.path.basename(path), os.path.getmtime(path))
+
+def main():
+    parser = argparse.ArgumentParser(description="Report near-duplicate transcripts in a folder")
+    parser.add_argument("directory", nargs="?", default="Test Scripts", help="transcript folder (default: Test Scripts)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"minimum estimated Jaccard similarity (default: {THRESHOLD})")
+    args = parser.parse_args()
+
+    from pipeline import source_text, transcript_paths
+
+    groups = find_duplicates(signatures_for_files(transcript_paths(args.directory), source_text), args.threshold)
+    report_duplicates(groups)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Paragraph text from .docx files without building a python-docx object tree.
+
+word/document.xml is decompressed and parsed incrementally straight from
+the zip, and each top-level body paragraph's text is yielded as soon as it
+ends; finished elements are discarded, so memory stays small however long
+the transcript is. The text is the same as python-docx's
+`[p.text for p in Document(path).paragraphs]`: runs directly in the
+paragraph or in a hyperlink, with tabs, line breaks and non-breaking
+hyphens translated the same way. Files that do not have the usual layout
+(no word/document.xml, strict OOXML namespaces) are read with python-docx.
+"""
+
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCUMENT = _W + "document"
+_P = _W + "p"
+_R = _W + "r"
+_HYPERLINK = _W + "hyperlink"
+_T = _W + "t"
+_BR = _W + "br"
+_BR_TYPE = _W + "type"
+
+# Text equivalents of the other run children python-docx reads
+_RUN_CHARACTERS = {
+    _W + "tab": "\t",
+    _W + "ptab": "\t",
+    _W + "cr": "\n",
+    _W + "noBreakHyphen": "-",
+}
+
+class UnsupportedDocx(ValueError):
+    """The file is not laid out as the streaming reader expects"""
+
+def _run_text(run):
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _T:
+            if child.text:
+                parts.append(child.text)
+        elif tag == _BR:
+            if child.get(_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        else:
+            character = _RUN_CHARACTERS.get(tag)
+            if character:
+                parts.append(character)
+    return "".join(parts)
+
+def _paragraph_text(paragraph):
+    parts = []
+    for child in paragraph:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(run) for run in child if run.tag == _R)
+    return "".join(parts)
+
+def iter_xml_paragraphs(path):
+    """Yield the text of each body paragraph by stream-parsing word/document.xml
+
+    Raises UnsupportedDocx (before yielding anything) if the file is not a
+    zip with a transitional-namespace word/document.xml.
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as e:
+        raise UnsupportedDocx(str(e)) from e
+    with archive:
+        try:
+            source = archive.open("word/document.xml")
+        except KeyError as e:
+            raise UnsupportedDocx("no word/document.xml") from e
+        with source:
+            depth = 0
+            body = None
+            for event, element in iterparse(source, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 1 and element.tag != _DOCUMENT:
+                        raise UnsupportedDocx(f"unexpected root element {element.tag}")
+                    if depth == 2:
+                        body = element
+                    continue
+                depth -= 1
+                if depth == 2:
+                    # A direct child of w:body (paragraph, table, section
+                    # properties) is complete; only paragraphs have text
+                    if element.tag == _P:
+                        yield _paragraph_text(element)
+                    body.clear()
+
+def _python_docx_paragraphs(path):
+    from docx import Document
+    return [paragraph.text for paragraph in Document(path).paragraphs]
+
+def iter_paragraphs(path):
+    """Yield the text of each paragraph of a .docx (path or binary file), falling back to python-docx for unusual files"""
+    try:
+        yield from iter_xml_paragraphs(path)
+    except UnsupportedDocx:
+        yield from _python_docx_paragraphs(path)
+
+def docx_text(path):
+    """Return the paragraphs of a .docx joined with newlines"""
+    return '\n'.join(iter_paragraphs(path))
@@ -1,93 +1,93 @@
-import json
-import re
+import argparse
 from datetime import datetime
+from episode_store import STORE_PATH, iter_episodes
+from metrics import Metrics
+from pipeline import DEFAULT_FINALIZERS, Pipeline, Stage
+from quote_miner import QuoteMiner
+from summarizer import summarize_transcript
+from topic_tagger import TAXONOMY_PATH, TopicTagger
 
-def enhance_episode_data():
-    """Enhance existing episode data with additional fields"""
-    
-    # Load existing data
-    with open("public/data/extracted_data.json", 'r', encoding='utf-8') as f:
-        episodes = json.load(f)
-    
-    # Enhance each episode with additional metadata
-    for episode in episodes:
-        # Extract key topics from transcript (simple keyword extraction)
-        transcript = episode.get('transcript', '')
-        
-        # Common business/podcast topics
-        topics = []
-        topic_keywords = {
-            'Leadership': ['leadership', 'leader', 'leading', 'management', 'manager'],
-            'Technology': ['technology', 'tech', 'AI', 'artificial intelligence', 'digital', 'innovation'],
-            'Healthcare': ['health', 'healthcare', 'medical', 'patient', 'clinical', 'hospital'],
-            'Business Strategy': ['strategy', 'strategic', 'business', 'growth', 'transformation'],
-            'Procurement': ['procurement', 'sourcing', 'supplier', 'vendor', 'supply chain'],
-            'Career Development': ['career', 'professional', 'development', 'skills', 'training'],
-            'Culture': ['culture', 'cultural', 'organizational', 'workplace', 'team'],
-            'Purpose & Faith': ['purpose', 'faith', 'calling', 'spiritual', 'God', 'belief'],
-            'Diversity & Inclusion': ['diversity', 'inclusion', 'diverse', 'inclusive', 'equity'],
-            'Consulting': ['consulting', 'consultant', 'advisory', 'client', 'engagement']
-        }
-        
-        for topic, keywords in topic_keywords.items():
-            if any(keyword.lower() in transcript.lower() for keyword in keywords):
-                topics.append(topic)
-        
-        episode['keyTopics'] = topics[:6]  # Limit to 6 topics
-        
-        # Extract notable quotes (simple approach - look for quoted text)
-        quotes = []
-        quote_patterns = [
-            r'"([^"]{50,200})"',  # Text in quotes
-            r'culture eating strategy for breakfast',  # Known quote
-            r'trusted advisors',
-            r'iron sharpens iron'
-        ]
-        
-        for pattern in quote_patterns:
-            matches = re.findall(pattern, transcript, re.IGNORECASE)
-            for match in matches[:2]:  # Limit to 2 quotes per pattern
-                if len(match) > 30:  # Only meaningful quotes
-                    quotes.append({
-                        'quote': match.strip(),
-                        'speaker': episode['guests'][0] if episode['guests'] else episode['hosts'][0] if episode['hosts'] else 'Unknown'
-                    })
-        
-        episode['notableQuotes'] = quotes[:3]  # Limit to 3 quotes
-        
-        # Generate summary based on episode title and topics
-        if episode.get('episodeTitle') and topics:
-            summary = f"In this episode of {episode['episodeTitle']}, "
-            if episode['guests']:
-                summary += f"host(s) {', '.join(episode['hosts'])} interview {', '.join(episode['guests'])} "
-            else:
-                summary += f"{', '.join(episode['hosts'])} discuss "
-            
-            summary += f"key topics including {', '.join(topics[:3])}. "
-            
-            if episode['guestWorkExperience']:
-                companies = list(set([exp['company'] for exp in episode['guestWorkExperience']]))
-                summary += f"The conversation covers insights from experience at {', '.join(companies[:2])}."
-            
-            episode['summary'] = summary
-        else:
-            episode['summary'] = f"A podcast episode featuring discussions on business and professional topics."
-        
-        # Update extraction timestamp
-        episode['extractedAt'] = datetime.now().isoformat()
-    
-    # Save enhanced data
-    with open("public/data/extracted_data.json", 'w', encoding='utf-8') as f:
-        json.dump(episodes, f, indent=2, ensure_ascii=False)
-    
-    print(f"Enhanced {len(episodes)} episodes with key topics, quotes, and summaries")
-    
-    # Print summary of enhancements
-    for episode in episodes:
+def enhance_episode_data(taxonomy_path=TAXONOMY_PATH, metrics=None, finalizers=DEFAULT_FINALIZERS):
+    """Enhance existing episode data with additional fields
+
+    Episodes are streamed from the episode store through the topic, quote and
+    summary stages and rewritten one at a time, so memory use does not depend
+    on the size of the corpus; the finalizers then rebuild the artifacts.
+    Stage timings go to `metrics` if given.
+    """
+
+    # Build the topic automaton and the quote miner once for the whole run
+    tagger = TopicTagger.from_file(taxonomy_path)
+    miner = QuoteMiner()
+
+    def report(episode):
         print(f"\n{episode['id']}:")
         print(f"  Topics: {', '.join(episode['keyTopics'])}")
         print(f"  Quotes: {len(episode['notableQuotes'])}")
         print(f"  Summary: {episode['summary'][:100]}...")
 
+    pipeline = Pipeline(enhancement_stages(tagger, miner), build=_stamp, finalizers=finalizers, metrics=metrics)
+    count = pipeline.run(iter_episodes(STORE_PATH), STORE_PATH, on_episode=report)
+
+    print(f"\nEnhanced {count} episodes with key topics, quotes, and summaries")
+
+def enhancement_stages(tagger, miner=None):
+    """Pipeline stages adding key topics, notable quotes and a summary"""
+    return [
+        Stage("topics", lambda episode: tag_topics(episode, tagger)),
+        Stage("quotes", lambda episode: find_quotes(episode, miner)),
+        Stage("summary", summarize, after=["topics"]),
+    ]
+
+def _stamp(episode):
+    # Update extraction timestamp
+    episode['extractedAt'] = datetime.now().isoformat()
+    return episode
+
+def tag_topics(episode, tagger):
+    """Key topics from the transcript, most mentioned first"""
+    transcript = episode.get('transcript', '')
+    topics = [topic for topic, hits in tagger.rank_topics(transcript)]
+
+    return {'keyTopics': topics[:6]}  # Limit to 6 topics
+
+def find_quotes(episode, miner=None):
+    """Notable quotes mined from the transcript, attributed to their speakers"""
+    miner = miner or QuoteMiner()
+    return {'notableQuotes': miner.mine(episode)}
+
+def summarize(episode):
+    """Extractive summary of the transcript, or one built from the title, participants and key topics"""
+    summary = summarize_transcript(episode.get('transcript'))
+    if summary:
+        return {'summary': summary}
+    topics = episode['keyTopics']
+    if episode.get('episodeTitle') and topics:
+        summary = f"In this episode of {episode['episodeTitle']}, "
+        if episode['guests']:
+            summary += f"host(s) {', '.join(episode['hosts'])} interview {', '.join(episode['guests'])} "
+        else:
+            summary += f"{', '.join(episode['hosts'])} discuss "
+
+        summary += f"key topics including {', '.join(topics[:3])}. "
+
+        if episode['guestWorkExperience']:
+            # First-mention order, so the summary is the same on every run
+            companies = list(dict.fromkeys(exp['company'] for exp in episode['guestWorkExperience']))
+            summary += f"The conversation covers insights from experience at {', '.join(companies[:2])}."
+
+        return {'summary': summary}
+    return {'summary': f"A podcast episode featuring discussions on business and professional topics."}
+
+
 if __name__ == "__main__":
-    enhance_episode_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Add key topics, quotes and summaries to the stored episodes")
+    parser.add_argument(
+        "--metrics", metavar="PATH",
+        help="write per-stage/per-file metrics (.prom/.txt: Prometheus text format, otherwise JSON)"
+    )
+    args = parser.parse_args()
+    metrics = Metrics("enhance_existing_data") if args.metrics else None
+    enhance_episode_data(metrics=metrics)
+    if metrics:
+        metrics.write(args.metrics)
@@ -0,0 +1,172 @@
+"""
+Line-delimited (NDJSON) episode store.
+
+Each line of the store is one episode record, so extraction can write
+episodes as they finish and the enhancement/merge steps can stream them back
+one at a time instead of loading the whole corpus. The Next.js loader still
+reads the legacy indented array in public/data/extracted_data.json, which is
+produced from the store by export_json_array().
+"""
+
+import json
+import os
+
+STORE_PATH = "data/episodes.ndjson"
+LEGACY_JSON_PATH = "public/data/extracted_data.json"
+
+# Read size for the streaming JSON array reader
+_CHUNK_SIZE = 1 << 20
+
+def _ensure_parent_dir(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+class EpisodeWriter:
+    """Write episodes to an NDJSON store one at a time
+
+    Lines go to a temporary file that atomically replaces the store on a
+    clean exit, so readers never see a half-written store and the store can
+    be rewritten while it is being read with iter_episodes().
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        _ensure_parent_dir(self.path)
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+        return self
+
+    def write(self, episode):
+        self._file.write(json.dumps(episode, ensure_ascii=False))
+        self._file.write('\n')
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+def append_episodes(episodes, path=STORE_PATH):
+    """Append episodes to the end of an NDJSON store"""
+    _ensure_parent_dir(path)
+    count = 0
+    with open(path, 'a', encoding='utf-8') as f:
+        for episode in episodes:
+            f.write(json.dumps(episode, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+def upsert_episodes(episodes, path=STORE_PATH, remove=(), existing_ids=None):
+    """Add or replace episodes by id and drop the ids in remove; returns (added, replaced, removed)
+
+    When no stored episode is replaced or removed the new ones are simply
+    appended. Otherwise the store is rewritten in one streaming pass, with
+    replaced episodes kept in place. existing_ids, the ids already in the
+    store, saves a scan to find out which case applies.
+    """
+    updates = {str(episode['id']): episode for episode in episodes}
+    remove = set(remove) - set(updates)
+    if existing_ids is None:
+        existing_ids = {str(episode.get('id')) for episode in iter_episodes(path, legacy_path=None)}
+    if not remove and not existing_ids & set(updates):
+        return append_episodes(updates.values(), path), 0, 0
+    replaced = removed = 0
+    with EpisodeWriter(path) as writer:
+        for episode in iter_episodes(path, legacy_path=None):
+            episode_id = str(episode.get('id'))
+            if episode_id in remove:
+                removed += 1
+                continue
+            if episode_id in updates:
+                episode = updates.pop(episode_id)
+                replaced += 1
+            writer.write(episode)
+        for episode in updates.values():
+            writer.write(episode)
+    return len(updates), replaced, removed
+
+def iter_json_array(path):
+    """Yield the elements of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(_CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} does not contain a JSON array")
+        pos = 1
+        eof = False
+        while True:
+            # Skip whitespace and the separator between elements
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer = f.read(_CHUNK_SIZE)
+                pos = 0
+                eof = not buffer
+            if pos >= len(buffer):
+                raise ValueError(f"Unexpected end of file in {path}")
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # A scalar ending exactly at the buffer edge may be truncated
+                complete = eof or end < len(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                # Element spans the chunk boundary: read more and retry
+                more = f.read(_CHUNK_SIZE)
+                eof = not more
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield item
+            pos = end
+            if pos > _CHUNK_SIZE:
+                buffer = buffer[pos:]
+                pos = 0
+
+def iter_episodes(path=STORE_PATH, legacy_path=LEGACY_JSON_PATH):
+    """Yield episodes from the NDJSON store one at a time
+
+    Falls back to streaming the legacy JSON array when the store has not been
+    created yet, so existing checkouts keep working.
+    """
+    if not os.path.exists(path):
+        if legacy_path and os.path.exists(legacy_path):
+            yield from iter_json_array(legacy_path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def export_json_array(store_path=STORE_PATH, json_path=LEGACY_JSON_PATH):
+    """Write the store as the legacy indented JSON array used by lib/data.ts
+
+    Output is byte-for-byte what json.dump(episodes, f, indent=2,
+    ensure_ascii=False) would produce, but only one episode is held in memory
+    at a time.
+    """
+    _ensure_parent_dir(json_path)
+    tmp_path = f"{json_path}.tmp"
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for episode in iter_episodes(store_path, legacy_path=None):
+            f.write('[\n  ' if count == 0 else ',\n  ')
+            f.write(json.dumps(episode, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+            count += 1
+        f.write('\n]' if count else '[]')
+    os.replace(tmp_path, json_path)
+    return count
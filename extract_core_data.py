@@ -1,207 +1,243 @@
+import argparse
 import json
 import os
-from docx import Document
-import re
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
+from docx_text import iter_paragraphs
+from episode_store import LEGACY_JSON_PATH, STORE_PATH, EpisodeWriter
+from extraction_cache import CACHE_PATH, ExtractionCache, file_content_hash
+from filename_info import parse_filename_info
+from metrics import Metrics, profile_call
+from pipeline import run_finalizers
+from podcast_info_matcher import extract_podcast_info
+
+# Bump when extract_text_from_docx output changes so cached text is re-parsed
+TEXT_VERSION = "docx-xml-1"
+# Bump when extract_podcast_info output changes so cached fields are re-extracted
+CORE_EXTRACTOR_VERSION = "core-2"
 
 def extract_text_from_docx(file_path):
-    """Extract text from a Word document"""
-    try:
-        doc = Document(file_path)
-        text = []
-        for paragraph in doc.paragraphs:
-            text.append(paragraph.text)
-        return '\n'.join(text)
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return ""
-
-def parse_filename_info(filename):
-    """Parse date, series, and episode info from filename"""
-    # Remove extension
-    base_name = filename.replace('.docx', '').replace('.txt', '')
-
-    # Try to extract date (YYYYMMDD format)
-    date_match = re.search(r'(\d{8})', base_name)
-    date = None
-    if date_match:
-        date_str = date_match.group(1)
-        try:
-            date = datetime.strptime(date_str, '%Y%m%d').strftime('%Y-%m-%d')
-        except:
-            pass
-
-    # Try to extract series and episode number
-    # Pattern 1: Standard format like "20241021-cls-062-V1-TRX" or "20250204-MBS-0506-V1"
-    series_match = re.search(r'-([A-Z]+)-(\d+)', base_name, re.IGNORECASE)
-    series = ""
-    episode_number = ""
-
-    if series_match:
-        series = series_match.group(1).upper()
-        episode_number = series_match.group(2)
-    else:
-        # Pattern 2: "Present" format like "22_0322_Present_010-V1"
-        present_match = re.search(r'Present_(\d+)', base_name, re.IGNORECASE)
-        if present_match:
-            series = "Present"
-            episode_number = present_match.group(1)
+    """Extract text from a Word document (parse errors propagate to the caller)"""
+    return '\n'.join(iter_paragraphs(file_path))
 
+def build_episode_data(filename, transcript_text, podcast_info, extracted_at=None):
+    """Assemble the core episode record from a transcript and its extracted info"""
+    # Parse basic info from filename
+    file_info = parse_filename_info(filename)
+
+    # Create episode data with only the requested fields
     return {
-        'date': date,
-        'series': series,
-        'episode_number': episode_number
+        "id": filename.replace('.docx', ''),
+        "fileName": filename.replace('.docx', ''),
+        "date": file_info['date'],
+        "series": file_info['series'],
+        "episodeNumber": file_info['episode_number'],
+        "episodeTitle": podcast_info['episode_title'],
+        "hosts": podcast_info['hosts'],
+        "guests": podcast_info['guests'],
+        "guestWorkExperience": podcast_info['work_experience'],
+        "transcript": transcript_text,
+        "audioLink": "",  # To be filled in later when audio links are available
+        "wordCount": len(transcript_text.split()) if transcript_text else 0,
+        "extractedAt": extracted_at or datetime.now().isoformat()
     }
 
-def extract_podcast_info(transcript_text):
-    """Extract podcast information from transcript text"""
-    
-    # Extract episode title (look for common podcast title patterns)
-    title_patterns = [
-        r'Welcome to (.+?) podcast',
-        r'Welcome to (.+?)\.',
-        r'This is (.+?) podcast',
-        r'You\'re listening to (.+?) podcast',
-        r'(.+?) Podcast',
-        r'(.+?) podcast'
-    ]
-    
-    episode_title = ""
-    for pattern in title_patterns:
-        match = re.search(pattern, transcript_text, re.IGNORECASE)
-        if match:
-            episode_title = match.group(1).strip()
-            break
-    
-    # Extract hosts and guests (look for introduction patterns)
-    hosts = []
-    guests = []
-    
-    # Common host introduction patterns
-    host_patterns = [
-        r"I'm ([A-Z][a-z]+ [A-Z][a-z]+)",
-        r"My name is ([A-Z][a-z]+ [A-Z][a-z]+)",
-        r"This is ([A-Z][a-z]+ [A-Z][a-z]+)",
-        r"I am ([A-Z][a-z]+ [A-Z][a-z]+)"
-    ]
-    
-    # Guest introduction patterns
-    guest_patterns = [
-        r"joined by ([A-Z][a-z]+ [A-Z][a-z]+)",
-        r"with us today ([A-Z][a-z]+ [A-Z][a-z]+)",
-        r"welcome ([A-Z][a-z]+ [A-Z][a-z]+)",
-        r"guest ([A-Z][a-z]+ [A-Z][a-z]+)"
-    ]
-    
-    # Extract names
-    all_names = set()
-    
-    for pattern in host_patterns + guest_patterns:
-        matches = re.findall(pattern, transcript_text, re.IGNORECASE)
-        for match in matches:
-            if len(match.split()) == 2:  # First and last name
-                all_names.add(match)
-    
-    # Try to distinguish hosts from guests based on context
-    # This is a simplified approach - in practice, you'd need more sophisticated logic
-    names_list = list(all_names)
-    if len(names_list) >= 2:
-        hosts = names_list[:2]  # Assume first 2 are hosts
-        guests = names_list[2:]  # Rest are guests
-    else:
-        hosts = names_list
-    
-    # Extract work experience (look for title and company patterns)
-    work_experience = []
-    
-    # Patterns for job titles and companies
-    title_company_patterns = [
-        r"([A-Z][a-z]+ [A-Z][a-z]+).*?([A-Z][A-Z][A-Z]|[A-Z][a-z]+\s+[A-Z][a-z]+).*?(CEO|CTO|CFO|VP|Vice President|President|Director|Manager|Chief|Senior|Principal)",
-        r"([A-Z][a-z]+ [A-Z][a-z]+).*?(CEO|CTO|CFO|VP|Vice President|President|Director|Manager|Chief|Senior|Principal).*?at ([A-Z][a-z]+)",
-    ]
-    
-    for pattern in title_company_patterns:
-        matches = re.findall(pattern, transcript_text, re.IGNORECASE)
-        for match in matches:
-            if len(match) >= 3:
-                name = match[0]
-                title = match[1] if 'CEO' in match[1] or 'VP' in match[1] else match[2]
-                company = match[2] if 'CEO' in match[1] or 'VP' in match[1] else match[1]
-                
-                work_experience.append({
-                    'name': name,
-                    'title': title,
-                    'company': company
-                })
-    
+def rule_fields(episode):
+    """Pipeline stage: title, hosts, guests and work experience from extract_podcast_info"""
+    podcast_info = extract_podcast_info(episode['transcript'])
     return {
-        'episode_title': episode_title,
-        'hosts': hosts,
-        'guests': guests,
-        'work_experience': work_experience
+        "episodeTitle": podcast_info['episode_title'],
+        "hosts": podcast_info['hosts'],
+        "guests": podcast_info['guests'],
+        "guestWorkExperience": podcast_info['work_experience'],
     }
 
-def process_test_scripts():
-    """Process all test script files and extract core podcast data"""
-    test_scripts_dir = "Test Scripts"
-    extracted_data = []
-    
-    # Get list of docx files
-    docx_files = [f for f in os.listdir(test_scripts_dir) if f.endswith('.docx')]
-    
-    for filename in docx_files:
-        print(f"Processing {filename}...")
-        
-        file_path = os.path.join(test_scripts_dir, filename)
-        transcript_text = extract_text_from_docx(file_path)
-        
+def _timed(timings, stage, func, *args):
+    """Call func, storing its (wall, CPU) seconds in timings[stage]"""
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        return func(*args)
+    finally:
+        timings[stage] = (time.perf_counter() - wall, time.process_time() - cpu)
+
+def _extract_file_safely(job):
+    """Worker entry point: never raises, so one bad file can't stop the batch
+
+    job is (file_path, transcript_text); the text is None unless it came from
+    the cache, in which case the DOCX is not opened again. Returns
+    (result, error, timings) where timings maps stage to (wall, CPU) seconds
+    measured in the worker.
+    """
+    file_path, transcript_text = job
+    timings = {}
+    try:
+        if transcript_text is None:
+            transcript_text = _timed(timings, 'text', extract_text_from_docx, file_path)
         if not transcript_text:
-            continue
-            
-        # Parse basic info from filename
-        file_info = parse_filename_info(filename)
-        
+            return None, "no text extracted", timings
         # Extract podcast information from transcript
-        podcast_info = extract_podcast_info(transcript_text)
-        
-        # Create episode data with only the requested fields
-        episode_data = {
-            "id": filename.replace('.docx', ''),
-            "fileName": filename.replace('.docx', ''),
-            "date": file_info['date'],
-            "series": file_info['series'],
-            "episodeNumber": file_info['episode_number'],
-            "episodeTitle": podcast_info['episode_title'],
-            "hosts": podcast_info['hosts'],
-            "guests": podcast_info['guests'],
-            "guestWorkExperience": podcast_info['work_experience'],
-            "transcript": transcript_text,
-            "audioLink": "",  # To be filled in later when audio links are available
-            "wordCount": len(transcript_text.split()) if transcript_text else 0,
-            "extractedAt": datetime.now().isoformat()
-        }
-        
-        extracted_data.append(episode_data)
+        podcast_info = _timed(timings, 'rules', extract_podcast_info, transcript_text)
+        podcast_info['extracted_at'] = datetime.now().isoformat()
+        return (transcript_text, podcast_info), None, timings
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", timings
+
+def process_docx_file(file_path):
+    """Parse one transcript and extract its core episode data"""
+    result, error, _ = _extract_file_safely((file_path, None))
+    if error:
+        print(f"Error reading {file_path}: {error}")
+        return None
+    transcript_text, podcast_info = result
+    return build_episode_data(os.path.basename(file_path), transcript_text, podcast_info, podcast_info['extracted_at'])
+
+def process_test_scripts(workers=1, cache=None, failures=None, metrics=None):
+    """Process all test script files and yield core podcast data per episode
+
+    With workers > 1 the files are parsed in a process pool. Episodes are
+    yielded in filename order as soon as they are ready, with a bounded
+    number of files in flight, so memory does not grow with the corpus.
+    Per-file failures are appended to `failures` instead of aborting the
+    run. When an ExtractionCache is given, files whose contents are
+    unchanged since the last run are served from it and only new or
+    modified files are parsed. Per-file stage timings (measured in the
+    workers), bytes read and cache lookups go to `metrics` if given.
+    """
+    test_scripts_dir = "Test Scripts"
+    if failures is None:
+        failures = []
+
+    # Get list of docx files (sorted so output order is stable across runs)
+    docx_files = sorted(f for f in os.listdir(test_scripts_dir) if f.endswith('.docx'))
+
+    executor = None
+    if workers > 1 and len(docx_files) > 1:
+        print(f"Processing {len(docx_files)} files with {workers} workers...")
+        executor = ProcessPoolExecutor(max_workers=workers)
+    max_in_flight = workers * 4
+    in_flight = deque()
+    hits = 0
+
+    def submit(filename):
+        """Return (future, content_hash); content_hash is None for cache hits"""
+        nonlocal hits
+        file_path = os.path.join(test_scripts_dir, filename)
+        content_hash = transcript_text = None
+        future = Future()
+        if cache:
+            content_hash = file_content_hash(file_path)
+            transcript_text = cache.get_text(content_hash, TEXT_VERSION)
+            podcast_info = cache.get_fields(content_hash, "core", CORE_EXTRACTOR_VERSION) if transcript_text else None
+            if metrics:
+                metrics.cache_lookup("text", transcript_text is not None)
+                metrics.cache_lookup("core", podcast_info is not None)
+            if podcast_info is not None:
+                hits += 1
+                future.set_result(((transcript_text, podcast_info), None, {}))
+                return future, None
+        # Cached text (if any) is passed along so only extraction is redone
+        job = (file_path, transcript_text)
+        if executor:
+            return executor.submit(_extract_file_safely, job), content_hash
+        future.set_result(_extract_file_safely(job))
+        return future, content_hash
+
+    def finish(filename, future, content_hash):
+        result, error, timings = future.result()
+        if metrics:
+            nbytes = os.path.getsize(os.path.join(test_scripts_dir, filename))
+            for stage, (wall, cpu) in timings.items():
+                metrics.record(stage, wall, cpu, filename, nbytes)
+        if error:
+            failures.append({"fileName": filename, "error": error})
+            print(f"Failed {filename}: {error}")
+            return
+        transcript_text, podcast_info = result
+        if cache and content_hash:
+            cache.put_text(content_hash, TEXT_VERSION, transcript_text)
+            cache.put_fields(content_hash, "core", CORE_EXTRACTOR_VERSION, podcast_info)
         print(f"Processed {filename}")
-    
-    return extracted_data
+        yield build_episode_data(filename, transcript_text, podcast_info, podcast_info.get('extracted_at'))
+
+    try:
+        for filename in docx_files:
+            if len(in_flight) >= max_in_flight:
+                yield from finish(*in_flight.popleft())
+            in_flight.append((filename, *submit(filename)))
+        while in_flight:
+            yield from finish(*in_flight.popleft())
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    if cache:
+        print(f"{hits} unchanged file(s) served from cache, {len(docx_files) - hits} processed")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract core podcast data from the Test Scripts folder")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of worker processes for DOCX parsing and extraction (default: 1)"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help=f"re-parse every file instead of reusing {CACHE_PATH}"
+    )
+    parser.add_argument(
+        "--metrics", metavar="PATH",
+        help="write per-stage/per-file metrics (.prom/.txt: Prometheus text format, otherwise JSON)"
+    )
+    parser.add_argument(
+        "--profile", metavar="FILE",
+        help="parse and extract one DOCX file under cProfile instead of processing the folder"
+    )
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    if args.profile:
+        profile_call(process_docx_file, args.profile)
+        return
     print("Extracting core podcast data as specified in the chat...")
     
     # Process test scripts
-    extracted_data = process_test_scripts()
-    
-    # Save extracted data
-    output_file = "public/data/extracted_data.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(extracted_data, f, indent=2, ensure_ascii=False)
+    # Episodes are written to the store as they finish; only the fields
+    # needed for the summary below are kept in memory
+    cache = None if args.no_cache else ExtractionCache()
+    metrics = Metrics("extract_core_data") if args.metrics else None
+    failures = []
+    summaries = []
+    try:
+        with EpisodeWriter(STORE_PATH) as writer:
+            for episode in process_test_scripts(workers=max(1, args.workers), cache=cache, failures=failures, metrics=metrics):
+                writer.write(episode)
+                summaries.append({key: value for key, value in episode.items() if key != 'transcript'})
+    finally:
+        if cache:
+            cache.close()
+    
+    # Save extracted data: JSON export and index builds
+    output_file = LEGACY_JSON_PATH
+    total = writer.count
+    run_finalizers(STORE_PATH, metrics=metrics)
+
+    if metrics:
+        metrics.count('episodes_written', total)
+        metrics.count('episodes_failed', len(failures))
+        metrics.write(args.metrics)
     
-    print(f"Core data extracted and saved to {output_file}")
-    print(f"Total episodes: {len(extracted_data)}")
+    print(f"Core data extracted and saved to {STORE_PATH} and {output_file}")
+    print(f"Total episodes: {total}")
+
+    if failures:
+        print(f"Failed files: {len(failures)}")
+        for failure in failures:
+            print(f"  {failure['fileName']}: {failure['error']}")
     
     # Print summary
-    for episode in extracted_data:
+    for episode in summaries:
         print(f"\n{episode['id']}:")
         print(f"  Title: {episode['episodeTitle']}")
         print(f"  Series: {episode['series']} #{episode['episodeNumber']}")
@@ -1,199 +1,298 @@
+import argparse
+import asyncio
 import json
 import os
-from docx import Document
-from openai import OpenAI
-import re
+import time
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime
+from dedup import cached_minhash, find_duplicates, report_duplicates, superseded, version_key
+from docx_text import iter_paragraphs
+from episode_store import LEGACY_JSON_PATH, STORE_PATH, EpisodeWriter, iter_episodes
+from extraction_cache import ExtractionCache, file_content_hash
+from filename_info import parse_filename_info
+from chunked_extraction import extract_chunked
+from llm_client import LLMError, create_client
+from metrics import Metrics
+from pipeline import run_finalizers
+from summarizer import summarize_transcript
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Bump when extract_text_from_docx output changes so cached text is re-parsed
+TEXT_VERSION = "docx-xml-1"
+# Bump when the prompt or model changes so cached AI fields are re-extracted
+AI_EXTRACTOR_VERSION = "enhanced-ai-2"
+# Bump when the prompt template changes so cached API responses are not reused
+PROMPT_VERSION = "enhanced-prompt-2"
 
 def extract_text_from_docx(file_path):
     """Extract text from a Word document"""
     try:
-        doc = Document(file_path)
-        text = []
-        for paragraph in doc.paragraphs:
-            text.append(paragraph.text)
-        return '\n'.join(text)
+        return '\n'.join(iter_paragraphs(file_path))
     except Exception as e:
         print(f"Error reading {file_path}: {e}")
         return ""
 
-def enhance_extraction_with_ai(transcript_text, filename):
-    """Use OpenAI to extract structured data from transcript"""
-
-    prompt = f"""
-    Extract the following information from this podcast transcript and return it as JSON:
-
-    1. Episode title (if mentioned)
-    2. Series name - Look for the actual podcast name in the transcript (e.g., "My Best Shift podcast", "Present Navigating and Enduring Life Events", "Heidrick & Struggles Leadership Podcast", "PWC Pulse", "Next in Health")
-       IMPORTANT: If you see "Mya Shift" or similar, the correct name is "My Best Shift podcast"
-       IMPORTANT: Do NOT use "Unknown" as a series name - always extract the actual podcast name from the transcript
-    3. Episode number (if mentioned)
-    4. Date (parse from filename: {filename})
-    5. Host names (list)
-    6. Guest names (list)
-    7. Guest work experience (name, title, company for each guest)
-    8. Key topics discussed (list of 5-10 main topics)
-    9. Notable quotes (2-3 impactful quotes with speaker attribution)
-    10. Word count (approximate)
-    11. Summary (2-3 sentence summary of the episode)
-
-    Transcript:
-    {transcript_text[:4000]}...
-
-    Return only valid JSON format.
+async def enhance_extraction_with_ai(client, transcript_text, filename):
+    """Use OpenAI to extract structured data from transcript
+
+    The whole transcript is covered: it is split into windows that are
+    extracted concurrently and merged (see chunked_extraction).
     """
 
+    def build_messages(window, part, parts):
+        prompt = f"""
+        Extract the following information from this podcast transcript and return it as JSON:
+
+        1. Episode title (if mentioned)
+        2. Series name - Look for the actual podcast name in the transcript (e.g., "My Best Shift podcast", "Present Navigating and Enduring Life Events", "Heidrick & Struggles Leadership Podcast", "PWC Pulse", "Next in Health")
+           IMPORTANT: If you see "Mya Shift" or similar, the correct name is "My Best Shift podcast"
+           IMPORTANT: Do NOT use "Unknown" as a series name - always extract the actual podcast name from the transcript
+        3. Episode number (if mentioned)
+        4. Date (parse from filename: {filename})
+        5. Host names (list)
+        6. Guest names (list)
+        7. Guest work experience (name, title, company for each guest)
+        8. Key topics discussed (list of 5-10 main topics)
+        9. Notable quotes (2-3 impactful quotes with speaker attribution)
+        10. Word count (approximate)
+        11. Summary (2-3 sentence summary of the episode)
+
+        This is part {part} of {parts} of the transcript. Extract only what this part contains and leave missing fields empty.
+
+        Transcript (part {part} of {parts}):
+        {window}
+
+        Return only valid JSON format.
+        """
+        return [
+            {"role": "system", "content": "You are an expert at extracting structured data from podcast transcripts. Return only valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+
     try:
-        response = client.chat.completions.create(
+        result = await extract_chunked(
+            client,
+            transcript_text,
+            build_messages,
+            PROMPT_VERSION,
+            cache_inputs=(filename,),
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert at extracting structured data from podcast transcripts. Return only valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
             max_tokens=1500,
             temperature=0.1
         )
 
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        print(f"Error with OpenAI API: {e}")
+        return result
+    except (LLMError, ValueError) as e:
+        print(f"Error with OpenAI API for {filename}: {e}")
         return None
 
-def parse_filename_info(filename):
-    """Parse date, series, and episode info from filename"""
-    # Remove extension
-    base_name = filename.replace('.docx', '').replace('.txt', '')
+async def enhance_all_with_ai(jobs, client=None, metrics=None):
+    """Run enhance_extraction_with_ai concurrently for (transcript_text, filename) jobs
+
+    jobs may be a generator: it is consumed as slots free up, with at most
+    client.concurrency * 4 transcripts in flight, so transcripts waiting on
+    the API do not pile up in memory. Results come back in job order, with
+    None for files that failed.
+    """
+    client = client or create_client()
+    max_in_flight = client.concurrency * 4
+    in_flight = deque()
+    results = []
 
-    # Try to extract date (YYYYMMDD format)
-    date_match = re.search(r'(\d{8})', base_name)
-    date = None
-    if date_match:
-        date_str = date_match.group(1)
+    async def timed(text, filename):
+        started = time.perf_counter()
         try:
-            date = datetime.strptime(date_str, '%Y%m%d').strftime('%Y-%m-%d')
-        except:
-            pass
-
-    # Try to extract series and episode number
-    # Pattern 1: Standard format like "20241021-cls-062-V1-TRX" or "20250204-MBS-0506-V1"
-    series_match = re.search(r'-([A-Z]+)-(\d+)', base_name, re.IGNORECASE)
-    series = ""
-    episode_number = ""
-
-    if series_match:
-        series = series_match.group(1).upper()
-        episode_number = series_match.group(2)
-    else:
-        # Pattern 2: "Present" format like "22_0322_Present_010-V1"
-        present_match = re.search(r'Present_(\d+)', base_name, re.IGNORECASE)
-        if present_match:
-            series = "Present"
-            episode_number = present_match.group(1)
+            return await enhance_extraction_with_ai(client, text, filename)
+        finally:
+            if metrics:
+                metrics.record('ai', time.perf_counter() - started, None, filename, len(text.encode('utf-8')))
+
+    try:
+        for text, filename in jobs:
+            if len(in_flight) >= max_in_flight:
+                results.append(await in_flight.popleft())
+            in_flight.append(asyncio.create_task(timed(text, filename)))
+        while in_flight:
+            results.append(await in_flight.popleft())
+        print(f"AI requests: {client.stats['requests']}, retries: {client.stats['retries']}, failures: {client.stats['failures']}, cached responses: {client.stats['cache_hits']}")
+        return results
+    finally:
+        if metrics:
+            metrics.record_llm(client)
+        client.close()
+
+def read_transcript(file_path, content_hash=None, cache=None, metrics=None):
+    """The text of a transcript, from the cache when the file is unchanged"""
+    filename = os.path.basename(file_path)
+    transcript_text = cache.get_text(content_hash, TEXT_VERSION) if cache else None
+    if metrics and cache:
+        metrics.cache_lookup("text", transcript_text is not None)
+    if transcript_text is None:
+        with metrics.time('text', filename, os.path.getsize(file_path)) if metrics else nullcontext():
+            transcript_text = extract_text_from_docx(file_path)
+        if cache and transcript_text:
+            cache.put_text(content_hash, TEXT_VERSION, transcript_text)
+    return transcript_text
+
+def build_enhanced_episode(filename, transcript_text, ai_data):
+    """Assemble the enhanced episode record of a transcript and its AI fields (None if the call failed)"""
+    # Parse basic info from filename
+    file_info = parse_filename_info(filename)
 
     return {
-        'date': date,
-        'series': series,
-        'episode_number': episode_number
+        "id": filename.replace('.docx', ''),
+        "fileName": filename.replace('.docx', ''),
+        "date": file_info['date'] or (ai_data.get('date') if ai_data else None),
+        "series": file_info['series'] or (ai_data.get('series') if ai_data else ""),
+        "episodeNumber": file_info['episode_number'] or (ai_data.get('episode_number') if ai_data else ""),
+        "episodeTitle": ai_data.get('episode_title', '') if ai_data else '',
+        "hosts": ai_data.get('hosts', []) if ai_data else [],
+        "guests": ai_data.get('guests', []) if ai_data else [],
+        "guestWorkExperience": ai_data.get('guest_work_experience', []) if ai_data else [],
+        "keyTopics": ai_data.get('key_topics', []) if ai_data else [],
+        "notableQuotes": ai_data.get('notable_quotes', []) if ai_data else [],
+        # Local extractive summary when the API gave none (disabled, failed or rate limited)
+        "summary": (ai_data.get('summary') if ai_data else '') or summarize_transcript(transcript_text),
+        "transcript": transcript_text,
+        "audioLink": "",
+        "wordCount": len(transcript_text.split()) if transcript_text else 0,
+        "extractedAt": datetime.now().isoformat()
     }
 
-def process_test_scripts():
-    """Process all test script files and extract enhanced data"""
+def process_test_scripts(cache=None, client=None, metrics=None, skipped=None):
+    """Process all test script files and extract their AI fields
+
+    Returns (filename, content hash, AI fields) per transcript; transcripts
+    are not kept in memory; merge_with_existing_data() reads them again
+    (from the cache when given) while it writes the episodes.
+    When an ExtractionCache is given, unchanged files reuse their cached text
+    and AI fields, so only new or modified transcripts are sent to the API.
+    The API calls for the remaining files run concurrently through the
+    rate-limited LLM client. Timings and cache lookups go to `metrics` if given.
+    Older versions of near-duplicate transcripts are dropped before any API
+    call; their ids are appended to `skipped`.
+    """
     test_scripts_dir = "Test Scripts"
-    enhanced_data = []
     
     # Get list of docx files
     docx_files = [f for f in os.listdir(test_scripts_dir) if f.endswith('.docx')]
     
+    # Fingerprint every transcript and collect the ones without cached AI fields
+    transcripts = []
     for filename in docx_files:
         print(f"Processing {filename}...")
         
         file_path = os.path.join(test_scripts_dir, filename)
-        transcript_text = extract_text_from_docx(file_path)
-        
+        content_hash = file_content_hash(file_path) if cache else None
+        transcript_text = read_transcript(file_path, content_hash, cache, metrics)
         if not transcript_text:
             continue
-            
-        # Parse basic info from filename
-        file_info = parse_filename_info(filename)
         
-        # Use AI to extract enhanced data
-        ai_data = enhance_extraction_with_ai(transcript_text, filename)
-        
-        # Create enhanced episode data
-        episode_data = {
-            "id": filename.replace('.docx', ''),
-            "fileName": filename.replace('.docx', ''),
-            "date": file_info['date'] or (ai_data.get('date') if ai_data else None),
-            "series": file_info['series'] or (ai_data.get('series') if ai_data else ""),
-            "episodeNumber": file_info['episode_number'] or (ai_data.get('episode_number') if ai_data else ""),
-            "episodeTitle": ai_data.get('episode_title', '') if ai_data else '',
-            "hosts": ai_data.get('hosts', []) if ai_data else [],
-            "guests": ai_data.get('guests', []) if ai_data else [],
-            "guestWorkExperience": ai_data.get('guest_work_experience', []) if ai_data else [],
-            "keyTopics": ai_data.get('key_topics', []) if ai_data else [],
-            "notableQuotes": ai_data.get('notable_quotes', []) if ai_data else [],
-            "summary": ai_data.get('summary', '') if ai_data else '',
-            "transcript": transcript_text,
-            "audioLink": "",
-            "wordCount": len(transcript_text.split()) if transcript_text else 0,
-            "extractedAt": datetime.now().isoformat()
-        }
-        
-        enhanced_data.append(episode_data)
-        print(f"Processed {filename}")
+        ai_data = cache.get_fields(content_hash, "enhanced-ai", AI_EXTRACTOR_VERSION) if cache else None
+        if metrics and cache:
+            metrics.cache_lookup("enhanced-ai", ai_data is not None)
+        signature = cached_minhash(lambda: transcript_text, content_hash, cache)
+        transcripts.append([filename, content_hash, ai_data, signature, os.path.getmtime(file_path)])
     
-    return enhanced_data
-
-def merge_with_existing_data(enhanced_data):
-    """Merge enhanced data with existing extracted data"""
-    existing_file = "public/data/extracted_data.json"
+    # Keep only the newest version of re-delivered transcripts
+    groups = find_duplicates((item[0], item[3], version_key(item[0], item[4])) for item in transcripts)
+    report_duplicates(groups)
+    dropped = superseded(groups)
+    if skipped is not None:
+        skipped.extend(filename.replace('.docx', '') for filename in sorted(dropped))
+    transcripts = [item[:3] for item in transcripts if item[0] not in dropped]
+    to_extract = [i for i, item in enumerate(transcripts) if item[2] is None]
     
-    try:
-        with open(existing_file, 'r', encoding='utf-8') as f:
-            existing_data = json.load(f)
-    except:
-        existing_data = []
+    # Use AI to extract enhanced data (failed calls are not cached, so they are retried next run)
+    if to_extract:
+        print(f"Sending {len(to_extract)} transcript(s) to the API...")
+        jobs = (
+            (read_transcript(os.path.join(test_scripts_dir, transcripts[i][0]), transcripts[i][1], cache), transcripts[i][0])
+            for i in to_extract
+        )
+        for i, ai_data in zip(to_extract, asyncio.run(enhance_all_with_ai(jobs, client, metrics))):
+            transcripts[i][2] = ai_data
+            if cache and ai_data is not None:
+                cache.put_fields(transcripts[i][1], "enhanced-ai", AI_EXTRACTOR_VERSION, ai_data)
     
-    # Create a map of existing data by ID
-    existing_map = {item['id']: item for item in existing_data}
+    return [tuple(item) for item in transcripts]
+
+def merge_with_existing_data(enhancements, superseded_ids=(), cache=None):
+    """Merge enhanced data with existing extracted data
+
+    enhancements are the (filename, content hash, AI fields) of
+    process_test_scripts(). Streams the existing episode store and yields
+    merged episodes one at a time (existing order first, then new
+    episodes); each enhanced episode is built only when it is yielded, so
+    neither the corpus nor its transcripts are held in memory. Existing
+    episodes whose ids are in superseded_ids (older versions of a
+    transcript) are dropped.
+    """
+    test_scripts_dir = "Test Scripts"
+
+    def build(filename, content_hash, ai_data):
+        transcript_text = read_transcript(os.path.join(test_scripts_dir, filename), content_hash, cache)
+        print(f"Processed {filename}")
+        return build_enhanced_episode(filename, transcript_text, ai_data)
+
+    # Map enhancements by episode ID
+    enhanced_map = {filename.replace('.docx', ''): (filename, content_hash, ai_data)
+                    for filename, content_hash, ai_data in enhancements}
     
-    # Merge enhanced data
-    for enhanced_item in enhanced_data:
-        item_id = enhanced_item['id']
-        if item_id in existing_map:
+    # Merge enhanced data into existing items
+    for existing_item in iter_episodes(STORE_PATH):
+        if existing_item['id'] in superseded_ids:
+            continue
+        enhancement = enhanced_map.pop(existing_item['id'], None)
+        if enhancement:
+            enhanced_item = build(*enhancement)
             # Update existing item with enhanced data
-            existing_item = existing_map[item_id]
             existing_item.update({
                 'keyTopics': enhanced_item['keyTopics'],
                 'notableQuotes': enhanced_item['notableQuotes'],
                 'summary': enhanced_item['summary'],
                 'extractedAt': enhanced_item['extractedAt']
             })
-        else:
-            # Add new item
-            existing_data.append(enhanced_item)
+        yield existing_item
     
-    return existing_data
+    # Add new items
+    for enhancement in enhanced_map.values():
+        yield build(*enhancement)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract enhanced podcast data from the Test Scripts folder with AI")
+    parser.add_argument(
+        "--metrics", metavar="PATH",
+        help="write per-stage/per-file metrics (.prom/.txt: Prometheus text format, otherwise JSON)"
+    )
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     print("Starting enhanced podcast data extraction...")
+    metrics = Metrics("extract_enhanced_data") if args.metrics else None
     
     # Process test scripts
-    enhanced_data = process_test_scripts()
+    skipped = []
+    with ExtractionCache() as cache:
+        enhancements = process_test_scripts(cache, metrics=metrics, skipped=skipped)
+        print(f"Cache hits: {cache.hits}, misses: {cache.misses}")
     
-    # Merge with existing data
-    final_data = merge_with_existing_data(enhanced_data)
+        # Merge with existing data, writing each merged episode to the store as it is built
+        with EpisodeWriter(STORE_PATH) as writer:
+            for episode in merge_with_existing_data(enhancements, set(skipped), cache):
+                writer.write(episode)
     
-    # Save enhanced data
-    output_file = "public/data/extracted_data.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(final_data, f, indent=2, ensure_ascii=False)
+    # Save enhanced data: JSON export and index builds
+    output_file = LEGACY_JSON_PATH
+    run_finalizers(STORE_PATH, metrics=metrics)
     
-    print(f"Enhanced data saved to {output_file}")
-    print(f"Total episodes: {len(final_data)}")
+    print(f"Enhanced data saved to {STORE_PATH} and {output_file}")
+    print(f"Total episodes: {writer.count}")
+
+    if metrics:
+        metrics.count('episodes_written', writer.count)
+        metrics.write(args.metrics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
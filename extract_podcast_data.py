@@ -1,198 +1,259 @@
+import argparse
+import asyncio
+import io
 import os
 import json
-import openai
-from docx import Document
+import time
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime
-import re
+from corpus_stats import STATS_PATH
+from dedup import find_duplicates, report_duplicates, signatures_for_files, superseded
+from docx_text import iter_paragraphs
+from episode_store import LEGACY_JSON_PATH, STORE_PATH, EpisodeWriter
+from extraction_cache import ExtractionCache, file_content_hash
+from filename_info import parse_filename_info
+from chunked_extraction import extract_chunked
+from llm_client import LLMError, create_client
+from metrics import Metrics
+from pipeline import run_finalizers
+
+# Bump when extract_text_from_docx output changes so cached text is re-parsed
+TEXT_VERSION = "docx-xml-stripped-1"
+# Bump when the prompt or model changes so cached AI fields are re-extracted
+AI_EXTRACTOR_VERSION = "podcast-ai-2"
+# Bump when the prompt template changes so cached API responses are not reused
+PROMPT_VERSION = "podcast-prompt-2"
 
 # Set your OpenAI API key here
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # Loaded from environment
-openai.api_key = OPENAI_API_KEY
 
 def extract_text_from_docx(file_path):
     """Extract text content from DOCX file"""
-    doc = Document(file_path)
     text = []
-    for paragraph in doc.paragraphs:
-        if paragraph.text.strip():
-            text.append(paragraph.text.strip())
+    for paragraph in iter_paragraphs(file_path):
+        if paragraph.strip():
+            text.append(paragraph.strip())
     return '\n'.join(text)
 
-def parse_filename_info(filename):
-    """Parse date, series, and episode info from filename"""
-    # Remove extension
-    base_name = filename.replace('.docx', '').replace('.txt', '')
-
-    # Try to extract date (YYYYMMDD format)
-    date_match = re.search(r'(\d{8})', base_name)
-    date = None
-    if date_match:
-        date_str = date_match.group(1)
-        try:
-            date = datetime.strptime(date_str, '%Y%m%d').strftime('%Y-%m-%d')
-        except:
-            pass
-
-    # Try to extract series and episode number
-    # Pattern 1: Standard format like "20241021-cls-062-V1-TRX" or "20250204-MBS-0506-V1"
-    series_match = re.search(r'-([A-Z]+)-(\d+)', base_name, re.IGNORECASE)
-    series = ""
-    episode_number = ""
-
-    if series_match:
-        series = series_match.group(1).upper()
-        episode_number = series_match.group(2)
-    else:
-        # Pattern 2: "Present" format like "22_0322_Present_010-V1"
-        present_match = re.search(r'Present_(\d+)', base_name, re.IGNORECASE)
-        if present_match:
-            series = "Present"
-            episode_number = present_match.group(1)
-
-    return {
-        'date': date,
-        'series': series,
-        'episode_number': episode_number
-    }
-
-def extract_podcast_data_with_ai(transcript_text, filename):
-    """Use OpenAI to extract structured data from podcast transcript"""
-
-    prompt = f"""
-    Extract the following information from this podcast transcript and return it as valid JSON:
-
-    {{
-        "id": "{filename}",
-        "fileName": "{filename}",
-        "date": "YYYY-MM-DD format from filename or transcript",
-        "series": "podcast series name (e.g., CLS, PULSE, MBS, NIH, Present)",
-        "episodeNumber": "episode number if mentioned",
-        "episodeTitle": "full episode title",
-        "hosts": ["array of host names"],
-        "guests": ["array of guest names"],
-        "guestWorkExperience": [
-            {{
-                "name": "guest name",
-                "title": "job title",
-                "company": "company name"
-            }}
-        ],
-        "transcript": "full transcript text",
-        "audioLink": "",
-        "wordCount": word_count_number,
-        "extractedAt": "{datetime.now().isoformat()}"
-    }}
-
-    Rules:
-    1. Identify hosts vs guests based on who introduces the show or says "welcome to"
-    2. Extract guest work experience from introductions or conversations
-    3. For series name, look for the actual podcast name in the transcript (e.g., "My Best Shift podcast", "Present Navigating and Enduring Life Events", "Heidrick & Struggles Leadership Podcast", "PWC Pulse", "Next in Health")
-    4. IMPORTANT: If you see "Mya Shift" or similar, the correct name is "My Best Shift podcast"
-    5. IMPORTANT: Do NOT use "Unknown" as a series name - always extract the actual podcast name from the transcript
-    6. If series/episode info is in filename, use it, but verify against transcript content
-    7. Return only valid JSON, no extra text
-    8. If information is missing, use empty string or empty array
-
-    Transcript:
-    {transcript_text[:4000]}...
+async def extract_podcast_data_with_ai(client, transcript_text, filename):
+    """Use OpenAI to extract structured data from podcast transcript
+
+    The whole transcript is covered: it is split into windows that are
+    extracted concurrently and merged (see chunked_extraction).
     """
 
+    extracted_at = datetime.now().isoformat()
+
+    def build_messages(window, part, parts):
+        prompt = f"""
+        Extract the following information from this podcast transcript and return it as valid JSON:
+
+        {{
+            "id": "{filename}",
+            "fileName": "{filename}",
+            "date": "YYYY-MM-DD format from filename or transcript",
+            "series": "podcast series name (e.g., CLS, PULSE, MBS, NIH, Present)",
+            "episodeNumber": "episode number if mentioned",
+            "episodeTitle": "full episode title",
+            "hosts": ["array of host names"],
+            "guests": ["array of guest names"],
+            "guestWorkExperience": [
+                {{
+                    "name": "guest name",
+                    "title": "job title",
+                    "company": "company name"
+                }}
+            ],
+            "transcript": "",
+            "audioLink": "",
+            "wordCount": word_count_number,
+            "extractedAt": "{extracted_at}"
+        }}
+
+        Rules:
+        1. Identify hosts vs guests based on who introduces the show or says "welcome to"
+        2. Extract guest work experience from introductions or conversations
+        3. For series name, look for the actual podcast name in the transcript (e.g., "My Best Shift podcast", "Present Navigating and Enduring Life Events", "Heidrick & Struggles Leadership Podcast", "PWC Pulse", "Next in Health")
+        4. IMPORTANT: If you see "Mya Shift" or similar, the correct name is "My Best Shift podcast"
+        5. IMPORTANT: Do NOT use "Unknown" as a series name - always extract the actual podcast name from the transcript
+        6. If series/episode info is in filename, use it, but verify against transcript content
+        7. Return only valid JSON, no extra text
+        8. If information is missing, use empty string or empty array
+        9. This is part {part} of {parts} of the transcript: extract only what this part contains
+
+        Transcript (part {part} of {parts}):
+        {window}
+        """
+        return [
+            {"role": "system", "content": "You are a data extraction expert. Return only valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+
     try:
-        response = openai.ChatCompletion.create(
+        result = await extract_chunked(
+            client,
+            transcript_text,
+            build_messages,
+            PROMPT_VERSION,
+            cache_inputs=(filename,),
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a data extraction expert. Return only valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
             max_tokens=1500,
             temperature=0.1
         )
         
-        result = response.choices[0].message.content.strip()
+        return result
         
-        # Clean up response to ensure valid JSON
-        if result.startswith('```json'):
-            result = result[7:]
-        if result.endswith('```'):
-            result = result[:-3]
-            
-        return json.loads(result)
-        
-    except Exception as e:
+    except (LLMError, ValueError) as e:
         print(f"Error processing {filename}: {e}")
         return None
 
-def process_test_scripts():
-    """Process all DOCX files in Test Scripts folder"""
+async def _extract_file(client, cache, file_path, filename, metrics=None):
+    """Read one transcript and extract its episode data, or return None"""
+    base_name = filename.replace('.docx', '')
 
-    test_scripts_path = "Test Scripts"
-    output_file = "public/data/extracted_data.json"
+    try:
+        # Extract text from DOCX
+        content_hash = file_content_hash(file_path) if cache else None
+        transcript_text = cache.get_text(content_hash, TEXT_VERSION) if cache else None
+        if metrics and cache:
+            metrics.cache_lookup("text", transcript_text is not None)
+        if transcript_text is None:
+            with metrics.time('text', filename, os.path.getsize(file_path)) if metrics else nullcontext():
+                transcript_text = extract_text_from_docx(file_path)
+            if cache and transcript_text:
+                cache.put_text(content_hash, TEXT_VERSION, transcript_text)
 
-    if not os.path.exists(test_scripts_path):
-        print(f"Test Scripts folder not found at {test_scripts_path}")
-        return
+        if not transcript_text:
+            print(f"No text found in {filename}")
+            return None
 
-    extracted_data = []
+        # Parse filename for date, series, episode number
+        file_info = parse_filename_info(filename)
 
-    # Process each DOCX file
-    for filename in os.listdir(test_scripts_path):
-        if filename.endswith('.docx'):
-            print(f"Processing: {filename}")
+        # Extract data using AI (failed calls are not cached, so they are retried next run)
+        podcast_data = cache.get_fields(content_hash, "podcast-ai", AI_EXTRACTOR_VERSION) if cache else None
+        if metrics and cache:
+            metrics.cache_lookup("podcast-ai", podcast_data is not None)
+        if podcast_data is None:
+            started = time.perf_counter()
+            podcast_data = await extract_podcast_data_with_ai(client, transcript_text, base_name)
+            if metrics:
+                # CPU time is not attributable across awaits, so only wall time is kept
+                metrics.record('ai', time.perf_counter() - started, None, filename, len(transcript_text.encode('utf-8')))
+            if cache and podcast_data:
+                cache.put_fields(content_hash, "podcast-ai", AI_EXTRACTOR_VERSION, podcast_data)
 
-            file_path = os.path.join(test_scripts_path, filename)
-            base_name = filename.replace('.docx', '')
+        if not podcast_data:
+            print(f"✗ Failed to process {filename}")
+            return None
 
-            try:
-                # Extract text from DOCX
-                transcript_text = extract_text_from_docx(file_path)
+        # Add full transcript and word count
+        podcast_data['transcript'] = transcript_text
+        podcast_data['wordCount'] = len(transcript_text.split())
 
-                if not transcript_text:
-                    print(f"No text found in {filename}")
-                    continue
+        # Override with filename info if AI didn't extract it or if filename has better info
+        if file_info['series'] and not podcast_data.get('series'):
+            podcast_data['series'] = file_info['series']
+        if file_info['episode_number'] and not podcast_data.get('episodeNumber'):
+            podcast_data['episodeNumber'] = file_info['episode_number']
+        if file_info['date'] and not podcast_data.get('date'):
+            podcast_data['date'] = file_info['date']
 
-                # Parse filename for date, series, episode number
-                file_info = parse_filename_info(filename)
+        return podcast_data
 
-                # Extract data using AI
-                podcast_data = extract_podcast_data_with_ai(transcript_text, base_name)
+    except Exception as e:
+        print(f"Error processing {filename}: {e}")
+        return None
 
-                if podcast_data:
-                    # Add full transcript and word count
-                    podcast_data['transcript'] = transcript_text
-                    podcast_data['wordCount'] = len(transcript_text.split())
+async def _extract_files(test_scripts_path, cache, client, writer, extracted_data, metrics=None):
+    """Extract every DOCX file concurrently, writing episodes in directory order
 
-                    # Override with filename info if AI didn't extract it or if filename has better info
-                    if file_info['series'] and not podcast_data.get('series'):
-                        podcast_data['series'] = file_info['series']
-                    if file_info['episode_number'] and not podcast_data.get('episodeNumber'):
-                        podcast_data['episodeNumber'] = file_info['episode_number']
-                    if file_info['date'] and not podcast_data.get('date'):
-                        podcast_data['date'] = file_info['date']
+    At most client.concurrency * 4 files are in flight, so transcripts waiting
+    on the API do not pile up in memory. Older versions of near-duplicate
+    transcripts are skipped before any API call.
+    """
+    client = client or create_client()
+    max_in_flight = client.concurrency * 4
+    in_flight = deque()
 
-                    extracted_data.append(podcast_data)
-                    print(f"✓ Successfully processed {filename}")
-                else:
-                    print(f"✗ Failed to process {filename}")
+    docx_paths = [os.path.join(test_scripts_path, filename) for filename in os.listdir(test_scripts_path) if filename.endswith('.docx')]
+    groups = find_duplicates(signatures_for_files(docx_paths, lambda filename, content: extract_text_from_docx(io.BytesIO(content)), cache))
+    report_duplicates(groups)
+    skip = superseded(groups)
 
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-    
-    # Save extracted data
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    async def finish():
+        filename, task = in_flight.popleft()
+        podcast_data = await task
+        if podcast_data:
+            writer.write(podcast_data)
+            extracted_data.append({key: value for key, value in podcast_data.items() if key != 'transcript'})
+            print(f"✓ Successfully processed {filename}")
+
+    try:
+        for file_path in docx_paths:
+            if file_path not in skip:
+                filename = os.path.basename(file_path)
+                print(f"Processing: {filename}")
+                if len(in_flight) >= max_in_flight:
+                    await finish()
+                in_flight.append((filename, asyncio.create_task(_extract_file(client, cache, file_path, filename, metrics))))
+        while in_flight:
+            await finish()
+        print(f"AI requests: {client.stats['requests']}, retries: {client.stats['retries']}, failures: {client.stats['failures']}, cached responses: {client.stats['cache_hits']}")
+    finally:
+        if metrics:
+            metrics.record_llm(client)
+        client.close()
+
+def process_test_scripts(cache=None, client=None, metrics=None):
+    """Process all DOCX files in Test Scripts folder
+
+    When an ExtractionCache is given, unchanged files reuse their cached text
+    and AI fields, so only new or modified transcripts are sent to the API.
+    API calls run concurrently through the rate-limited LLM client. Timings
+    and cache lookups go to `metrics` if given.
+    """
+
+    test_scripts_path = "Test Scripts"
+    output_file = LEGACY_JSON_PATH
+
+    if not os.path.exists(test_scripts_path):
+        print(f"Test Scripts folder not found at {test_scripts_path}")
+        return
+
+    # Episode metadata for the summary; full records (with transcripts) are
+    # written to the store as they are produced instead of kept in memory
+    extracted_data = []
+
+    # Process each DOCX file
+    with EpisodeWriter(STORE_PATH) as writer:
+        asyncio.run(_extract_files(test_scripts_path, cache, client, writer, extracted_data, metrics))
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(extracted_data, f, indent=2, ensure_ascii=False)
+    # Save the legacy JSON array from the episode store, then the indexes
+    run_finalizers(STORE_PATH, metrics=metrics)
+    with open(STATS_PATH, 'r', encoding='utf-8') as f:
+        stats = json.load(f)
     
-    print(f"\n✓ Extraction complete! Saved {len(extracted_data)} episodes to {output_file}")
+    print(f"\n✓ Extraction complete! Saved {len(extracted_data)} episodes to {STORE_PATH} and {output_file}")
     
-    # Print summary
+    # Print summary (from the stats artifact just built, not by re-scanning the episodes)
     print(f"\nSummary:")
-    print(f"- Total episodes: {len(extracted_data)}")
-    print(f"- Total hosts: {len(set([host for ep in extracted_data for host in ep.get('hosts', [])]))}")
-    print(f"- Total guests: {len(set([guest for ep in extracted_data for guest in ep.get('guests', [])]))}")
-    print(f"- Series found: {set([ep.get('series', 'Unknown') for ep in extracted_data])}")
+    print(f"- Total episodes: {stats['totalEpisodes']}")
+    print(f"- Total hosts: {stats['totalHosts']}")
+    print(f"- Total guests: {stats['totalGuests']}")
+    print(f"- Series found: {set(stats['seriesBreakdown'])}")
+
+    if metrics:
+        metrics.count('episodes_written', len(extracted_data))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract podcast data from the Test Scripts folder with AI")
+    parser.add_argument(
+        "--metrics", metavar="PATH",
+        help="write per-stage/per-file metrics (.prom/.txt: Prometheus text format, otherwise JSON)"
+    )
+    args = parser.parse_args()
     print("Starting podcast data extraction...")
     print("Make sure to set your OpenAI API key in the script!")
     
@@ -201,4 +262,8 @@ if __name__ == "__main__":
         print("❌ Please set your OpenAI API key in the script first!")
         exit(1)
     
-    process_test_scripts()
\ No newline at end of file
+    metrics = Metrics("extract_podcast_data") if args.metrics else None
+    with ExtractionCache() as cache:
+        process_test_scripts(cache, metrics=metrics)
+    if metrics:
+        metrics.write(args.metrics)
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Persistent cache for transcript parsing and extraction results.
+
+Entries are keyed by the SHA-256 of the source file's bytes plus the version
+of the code that produced them, so a rerun only re-parses files that are new
+or changed, and bumping an extractor version invalidates just that
+extractor's entries. Parsed text and extracted fields are stored separately:
+changing the extraction rules does not force the DOCX files to be re-read.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+CACHE_PATH = "data/extraction_cache.sqlite"
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of bytes already in memory"""
+    return hashlib.sha256(data).hexdigest()
+
+def file_content_hash(file_path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """SQLite-backed store of parsed transcript text and extracted fields"""
+
+    def __init__(self, path=CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS texts (
+                content_hash TEXT NOT NULL,
+                text_version TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (content_hash, text_version)
+            );
+            CREATE TABLE IF NOT EXISTS extractions (
+                content_hash TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                extractor_version TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                PRIMARY KEY (content_hash, extractor, extractor_version)
+            );
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    def get_text(self, content_hash, text_version):
+        """Return cached transcript text, or None"""
+        row = self.conn.execute(
+            "SELECT text FROM texts WHERE content_hash = ? AND text_version = ?",
+            (content_hash, text_version)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_text(self, content_hash, text_version, text):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO texts (content_hash, text_version, text) VALUES (?, ?, ?)",
+            (content_hash, text_version, text)
+        )
+        self.conn.commit()
+
+    def get_fields(self, content_hash, extractor, extractor_version):
+        """Return cached extracted fields for one extractor, or None"""
+        row = self.conn.execute(
+            "SELECT fields FROM extractions WHERE content_hash = ? AND extractor = ? AND extractor_version = ?",
+            (content_hash, extractor, extractor_version)
+        ).fetchone()
+        if row:
+            self.hits += 1
+            return json.loads(row[0])
+        self.misses += 1
+        return None
+
+    def put_fields(self, content_hash, extractor, extractor_version, fields):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO extractions (content_hash, extractor, extractor_version, fields) VALUES (?, ?, ?, ?)",
+            (content_hash, extractor, extractor_version, json.dumps(fields, ensure_ascii=False))
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
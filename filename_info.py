@@ -0,0 +1,54 @@
+"""
+Episode metadata carried in transcript file names.
+
+    20241021-cls-062-V1-TRX.docx   -> 2024-10-21, CLS #062
+    22_0322_Present_010-V1.docx    -> Present #010
+"""
+
+import os
+import re
+from datetime import datetime
+
+TRANSCRIPT_EXTENSIONS = ('.docx', '.txt')
+
+def episode_id(filename):
+    """Return the episode id of a transcript file (its name without the extension)"""
+    base_name, extension = os.path.splitext(os.path.basename(filename))
+    return base_name if extension.lower() in TRANSCRIPT_EXTENSIONS else os.path.basename(filename)
+
+def parse_filename_info(filename):
+    """Parse date, series, and episode info from filename"""
+    # Remove extension
+    base_name = filename.replace('.docx', '').replace('.txt', '')
+
+    # Try to extract date (YYYYMMDD format)
+    date_match = re.search(r'(\d{8})', base_name)
+    date = None
+    if date_match:
+        date_str = date_match.group(1)
+        try:
+            date = datetime.strptime(date_str, '%Y%m%d').strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+
+    # Try to extract series and episode number
+    # Pattern 1: Standard format like "20241021-cls-062-V1-TRX" or "20250204-MBS-0506-V1"
+    series_match = re.search(r'-([A-Z]+)-(\d+)', base_name, re.IGNORECASE)
+    series = ""
+    episode_number = ""
+
+    if series_match:
+        series = series_match.group(1).upper()
+        episode_number = series_match.group(2)
+    else:
+        # Pattern 2: "Present" format like "22_0322_Present_010-V1"
+        present_match = re.search(r'Present_(\d+)', base_name, re.IGNORECASE)
+        if present_match:
+            series = "Present"
+            episode_number = present_match.group(1)
+
+    return {
+        'date': date,
+        'series': series,
+        'episode_number': episode_number
+    }
@@ -0,0 +1,158 @@
+"""
+Resumable bulk rewrites of one Firestore field.
+
+Documents are read a page at a time in document-id order with a field mask,
+so only the field being migrated is downloaded. Changed values are written
+with batched writes (at most 500 operations, and kept under the request
+size limit), and up to `max_concurrent_batches` commits run at once in a
+thread pool. A checkpoint file records the id of the last document whose
+page is fully committed; an interrupted run picks up after it.
+
+The runner only uses the basic client surface (collection().select()
+.order_by().start_after().limit().stream(), batch().update()/commit()), so
+it works the same against production, the Firestore emulator (set
+FIRESTORE_EMULATOR_HOST) or an in-memory fake.
+"""
+
+import json
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+CHECKPOINT_PATH = "data/firestore_migrations.json"
+
+# Firestore limits: 500 writes per batch and 10 MiB per request
+MAX_BATCH_OPERATIONS = 500
+MAX_BATCH_BYTES = 9 * 1024 * 1024
+
+def load_checkpoint(name, path=CHECKPOINT_PATH):
+    """Return the saved state of a migration, or a fresh one"""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f).get(name)
+        if state:
+            return state
+    return {"last_id": None, "scanned": 0, "updated": 0, "completed": False}
+
+def save_checkpoint(name, state, path=CHECKPOINT_PATH):
+    """Atomically record the state of one migration"""
+    states = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            states = json.load(f)
+    states[name] = state
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(states, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _split_batches(updates, max_operations, max_bytes):
+    """Group (reference, value) updates into batches within the operation and size limits"""
+    batch = []
+    size = 0
+    for reference, value in updates:
+        value_size = len(value.encode('utf-8')) if isinstance(value, str) else len(json.dumps(value))
+        if batch and (len(batch) >= max_operations or size + value_size > max_bytes):
+            yield batch
+            batch = []
+            size = 0
+        batch.append((reference, value))
+        size += value_size
+    if batch:
+        yield batch
+
+def run_field_migration(db, name, transform, collection="episodes", field="transcript",
+                        page_size=MAX_BATCH_OPERATIONS, max_concurrent_batches=8,
+                        checkpoint_path=CHECKPOINT_PATH, restart=False, on_update=None):
+    """Rewrite `field` of every document in `collection` with transform(value)
+
+    transform returns the new value, or None to leave the document alone.
+    It should be idempotent: commits that finished after the last
+    checkpoint are repeated when an interrupted run is resumed.
+    `name` identifies the migration in the checkpoint file; a completed
+    migration is not run again unless restart=True. on_update(doc_id) is
+    called for each document once its batch has committed. Returns the
+    final checkpoint state.
+    """
+    state = {"last_id": None, "scanned": 0, "updated": 0, "completed": False} if restart \
+        else load_checkpoint(name, checkpoint_path)
+    if state["completed"]:
+        print(f"Migration '{name}' already completed ({state['updated']} of {state['scanned']} documents updated)")
+        return state
+    if state["last_id"]:
+        print(f"Resuming migration '{name}' after document {state['last_id']}")
+
+    collection_ref = db.collection(collection)
+    executor = ThreadPoolExecutor(max_workers=max_concurrent_batches)
+    # Pages in read order: (last doc id, docs scanned, [(future, doc ids)])
+    pending = deque()
+    # Commits submitted and not yet finished, across all pages
+    in_flight = set()
+
+    def commit(batch):
+        write = db.batch()
+        for reference, value in batch:
+            write.update(reference, {field: value})
+        write.commit()
+
+    def finish_page():
+        """Wait for the oldest page's commits, then advance the checkpoint past it"""
+        last_id, scanned, commits = pending.popleft()
+        for future, doc_ids in commits:
+            future.result()
+            in_flight.discard(future)
+            state["updated"] += len(doc_ids)
+            if on_update:
+                for doc_id in doc_ids:
+                    on_update(doc_id)
+        state["last_id"] = last_id
+        state["scanned"] += scanned
+        save_checkpoint(name, state, checkpoint_path)
+
+    try:
+        last_id = state["last_id"]
+        while True:
+            query = collection_ref.select([field]).order_by("__name__")
+            if last_id:
+                query = query.start_after({"__name__": last_id})
+            page = list(query.limit(page_size).stream())
+            if not page:
+                break
+
+            updates = []
+            for snapshot in page:
+                data = snapshot.to_dict() or {}
+                new_value = transform(data.get(field))
+                if new_value is not None and new_value != data.get(field):
+                    updates.append((snapshot.reference, new_value))
+            last_id = page[-1].id
+
+            commits = []
+            for batch in _split_batches(updates, MAX_BATCH_OPERATIONS, MAX_BATCH_BYTES):
+                # Bound the number of commits in flight before every submit,
+                # including commits of the page being written
+                while len(in_flight) >= max_concurrent_batches:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    in_flight.difference_update(done)
+                future = executor.submit(commit, batch)
+                in_flight.add(future)
+                commits.append((future, [reference.id for reference, _ in batch]))
+            pending.append((last_id, len(page), commits))
+            while pending and all(future.done() for future, _ in pending[0][2]):
+                finish_page()
+
+            if len(page) < page_size:
+                break
+
+        while pending:
+            finish_page()
+    finally:
+        executor.shutdown(wait=True)
+
+    state["completed"] = True
+    save_checkpoint(name, state, checkpoint_path)
+    print(f"Migration '{name}' complete: updated {state['updated']} of {state['scanned']} documents")
+    return state
@@ -7,6 +7,7 @@ To: Speaker: [00:00:23] text
 import firebase_admin
 from firebase_admin import credentials, firestore
 import re
+from firestore_migration import run_field_migration
 
 # Initialize Firebase
 cred = credentials.Certificate({
@@ -37,29 +38,31 @@ def reformat_transcript(transcript):
     
     return re.sub(pattern, replace_func, transcript)
 
-def fix_all_transcripts():
-    """Update all episode transcripts in Firestore"""
-    episodes_ref = db.collection('episodes')
-    docs = episodes_ref.stream()
-    
-    count = 0
-    fixed = 0
-    
-    for doc in docs:
-        count += 1
-        episode = doc.to_dict()
-        transcript = episode.get('transcript', '')
-        
-        # Check if transcript needs fixing (has [timestamp] Speaker: format)
-        if re.search(r'\[\d{2}:\d{2}:\d{2}\]\s*[^:\n]+:', transcript):
-            reformatted = reformat_transcript(transcript)
-            
-            # Update Firestore
-            doc.reference.update({'transcript': reformatted})
-            fixed += 1
-            print(f"✓ Fixed: {episode.get('episodeTitle', doc.id)}")
+def reformat_if_needed(transcript):
+    """Return the reformatted transcript, or None if it is already in the new format"""
+    # Check if transcript needs fixing (has [timestamp] Speaker: format)
+    if transcript and re.search(r'\[\d{2}:\d{2}:\d{2}\]\s*[^:\n]+:', transcript):
+        return reformat_transcript(transcript)
+    return None
+
+def fix_all_transcripts(restart=False):
+    """Update all episode transcripts in Firestore
+
+    Runs as a resumable batched migration: only the transcript field is
+    read, changed transcripts are written in parallel batches of up to 500,
+    and a rerun after a failure continues from the last committed page.
+    """
+    state = run_field_migration(
+        db,
+        "transcripts-speaker-before-timestamp",
+        reformat_if_needed,
+        collection='episodes',
+        field='transcript',
+        restart=restart,
+        on_update=lambda doc_id: print(f"✓ Fixed: {doc_id}")
+    )
     
-    print(f"\n✅ Complete! Fixed {fixed} of {count} episodes")
+    print(f"\n✅ Complete! Fixed {state['updated']} of {state['scanned']} episodes")
 
 if __name__ == "__main__":
     print("⚠️  This script requires Firebase Admin SDK credentials")
@@ -0,0 +1,268 @@
+"""
+Asynchronous chat-completion client for the AI extraction scripts.
+
+Requests run concurrently up to a fixed limit and pass through two token
+buckets, one for requests per minute and one for tokens per minute, so a
+large backlog runs at the provider's rate limit instead of one round trip at
+a time. Rate-limit (429), server (5xx) and network errors and timeouts are
+retried with exponential backoff and jitter, honouring Retry-After.
+
+The client talks to a backend object with a single `chat(request, timeout)`
+coroutine. OpenAICompatibleBackend posts to any OpenAI-compatible
+/chat/completions endpoint (set OPENAI_BASE_URL to point it at a local fake
+server); CallableBackend wraps a plain function for stub models. With a
+ResponseCache attached, requests that name their prompt version and inputs
+are answered from disk when the same request was made before.
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from response_cache import ResponseCache, response_cache_key
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# Rough characters-per-token ratio used to reserve tokens before a request
+CHARS_PER_TOKEN = 4
+
+class LLMError(Exception):
+    """A request that failed permanently or ran out of retries"""
+
+class RetryableError(LLMError):
+    """A failure worth retrying (rate limit, server error, network error)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` units per minute
+
+    Waiters are served in arrival order. The bucket may go into debt when
+    a request turns out to use more than was reserved; later callers then
+    wait for it to refill.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # A request larger than the bucket waits for a full bucket
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, amount):
+        """Take (or give back, if negative) tokens after the fact"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+class OpenAICompatibleBackend:
+    """POST requests to an OpenAI-compatible /chat/completions endpoint
+
+    Blocking HTTP calls run in a dedicated thread pool sized to the client's
+    concurrency, so they never queue behind other executor work.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_workers=8):
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip('/') + "/chat/completions"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _post(self, request, timeout):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        http_request = urllib.request.Request(
+            self.url, data=json.dumps(request).encode('utf-8'), headers=headers, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(http_request, timeout=timeout) as response:
+                body = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode('utf-8', 'replace')[:200]
+            if e.code in (408, 409, 429) or e.code >= 500:
+                retry_after = e.headers.get('Retry-After')
+                try:
+                    retry_after = float(retry_after) if retry_after else None
+                except ValueError:
+                    retry_after = None
+                raise RetryableError(f"HTTP {e.code}: {detail}", retry_after)
+            raise LLMError(f"HTTP {e.code}: {detail}")
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise RetryableError(f"{type(e).__name__}: {e}")
+
+        text = body["choices"][0]["message"]["content"]
+        usage = body.get("usage") or {}
+        return text, usage.get("total_tokens")
+
+    async def chat(self, request, timeout):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._post, request, timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+class CallableBackend:
+    """Backend built from a function taking the request dict and returning text
+
+    The function may be sync or async; it can raise RetryableError to
+    exercise the retry path.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    async def chat(self, request, timeout):
+        result = self.fn(request)
+        if inspect.isawaitable(result):
+            result = await result
+        return result, None
+
+    def close(self):
+        pass
+
+def estimate_tokens(messages, max_tokens=0):
+    """Estimate the tokens a request will use: prompt characters / 4 plus the completion budget"""
+    return sum(len(message["content"]) for message in messages) // CHARS_PER_TOKEN + max_tokens
+
+def parse_json_reply(text):
+    """Parse a JSON reply, tolerating a surrounding ```json code fence"""
+    text = text.strip()
+    if text.startswith('```json'):
+        text = text[7:]
+    elif text.startswith('```'):
+        text = text[3:]
+    if text.endswith('```'):
+        text = text[:-3]
+    return json.loads(text)
+
+class LLMClient:
+    """Concurrent, rate-limited chat-completion client with retries"""
+
+    def __init__(self, backend, concurrency=8, requests_per_minute=500, tokens_per_minute=200000,
+                 max_retries=5, timeout=60, backoff_base=1.0, backoff_max=60.0, response_cache=None):
+        self.backend = backend
+        self.response_cache = response_cache
+        self.concurrency = concurrency
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "tokens": 0, "cache_hits": 0}
+        # Seconds taken by each successful API request, for latency percentiles
+        self.latencies = []
+
+    def _backoff(self, attempt, retry_after):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        # Full jitter keeps retried requests from arriving in lockstep
+        delay = random.uniform(0, delay)
+        return max(delay, retry_after or 0)
+
+    async def complete(self, messages, model="gpt-3.5-turbo", max_tokens=1500, temperature=0.1,
+                       prompt_version=None, inputs=None, parse=None):
+        """Return the reply for one chat request, raising LLMError on failure
+
+        With `parse` (e.g. parse_json_reply) the parsed reply is returned, and
+        a reply that fails to parse raises instead of being cached. When a
+        response cache is attached and both prompt_version and inputs (the
+        strings the prompt was rendered from) are given, a cached reply is
+        returned without touching the rate limits or the backend.
+        """
+        request = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        cache_key = None
+        if self.response_cache is not None and prompt_version is not None and inputs is not None:
+            cache_key = response_cache_key(model, {"max_tokens": max_tokens, "temperature": temperature}, prompt_version, inputs)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return parse(cached) if parse else cached
+        text = await self._send(request)
+        result = parse(text) if parse else text
+        if cache_key is not None:
+            self.response_cache.put(cache_key, text)
+        return result
+
+    async def _send(self, request):
+        reserved = estimate_tokens(request["messages"], request["max_tokens"])
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.request_bucket.acquire()
+                await self.token_bucket.acquire(reserved)
+                self.stats["requests"] += 1
+                started = time.perf_counter()
+                try:
+                    text, used = await asyncio.wait_for(self.backend.chat(request, self.timeout), self.timeout)
+                except (RetryableError, asyncio.TimeoutError) as e:
+                    if attempt == self.max_retries:
+                        self.stats["failures"] += 1
+                        raise LLMError(f"giving up after {attempt + 1} attempts: {e or 'timed out'}") from e
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(self._backoff(attempt, getattr(e, 'retry_after', None)))
+                    continue
+                except LLMError:
+                    self.stats["failures"] += 1
+                    raise
+                self.latencies.append(time.perf_counter() - started)
+                if used is not None:
+                    self.token_bucket.adjust(used - reserved)
+                self.stats["tokens"] += used if used is not None else reserved
+                return text
+
+    def close(self):
+        self.backend.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+def create_client(backend=None, response_cache=None):
+    """Build an LLMClient configured from the environment
+
+    OPENAI_API_KEY and OPENAI_BASE_URL select the endpoint; LLM_CONCURRENCY,
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE and LLM_TIMEOUT tune the
+    limits. Unless LLM_RESPONSE_CACHE=0, responses are cached in
+    data/llm_responses.sqlite (LLM_CACHE_MAX_MB and LLM_CACHE_TTL_DAYS set
+    its size limit and expiry).
+    """
+    concurrency = int(os.getenv("LLM_CONCURRENCY", "8"))
+    if backend is None:
+        backend = OpenAICompatibleBackend(max_workers=concurrency)
+    if response_cache is None and os.getenv("LLM_RESPONSE_CACHE", "1") != "0":
+        response_cache = ResponseCache(
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024),
+            ttl=float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+        )
+    return LLMClient(
+        backend,
+        concurrency=concurrency,
+        requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500")),
+        tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000")),
+        timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+        response_cache=response_cache,
+    )
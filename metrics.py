@@ -0,0 +1,228 @@
+"""
+Run metrics for the extraction scripts.
+
+A Metrics object collects wall-clock and CPU time and bytes processed per
+stage and per file, cache hits and misses, and API request counts, tokens
+and latencies, and writes them as a JSON report or in the Prometheus text
+format (per-file rows are only in the JSON report). profile_call() runs one
+function under cProfile and dumps the stats for `python -m pstats`.
+
+    python pipeline.py --metrics data/metrics.json
+    python pipeline.py --metrics data/metrics.prom
+    python pipeline.py --profile "Test Scripts/20250204-MBS-0506-V1.docx"
+"""
+
+import cProfile
+import json
+import math
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_PATH = "data/metrics.json"
+PROFILE_PATH = "data/profile.pstats"
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def _summary(values):
+    ordered = sorted(values)
+    return {f"p{round(q * 100)}": percentile(ordered, q) for q in QUANTILES}
+
+class Metrics:
+    """Thread-safe collector of per-stage and per-file timings and counters"""
+
+    def __init__(self, name="extraction"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._started_at = datetime.now().isoformat()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        # stage -> {'runs', 'wall', 'cpu', 'bytes', 'walls': [per-run wall]}
+        self.stages = {}
+        # file id -> stage -> {'wall', 'cpu', 'bytes'}
+        self.files = {}
+        # cache name -> [hits, misses]
+        self.caches = {}
+        self.counters = {}
+        self.llm = None
+
+    def record(self, stage, wall, cpu=None, item=None, nbytes=0):
+        """Record one run of a stage
+
+        cpu is None when it cannot be measured (e.g. across awaits); nbytes
+        is the size of the input the stage processed.
+        """
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {'runs': 0, 'wall': 0.0, 'cpu': 0.0, 'bytes': 0, 'walls': []}
+            entry['runs'] += 1
+            entry['wall'] += wall
+            # CPU time is reported as null for stages where it was not measured
+            entry['cpu'] = None if cpu is None or entry['cpu'] is None else entry['cpu'] + cpu
+            entry['bytes'] += nbytes
+            entry['walls'].append(wall)
+            if item is not None:
+                row = self.files.setdefault(item, {}).setdefault(stage, {'wall': 0.0, 'cpu': 0.0, 'bytes': 0})
+                row['wall'] += wall
+                row['cpu'] = None if cpu is None or row['cpu'] is None else row['cpu'] + cpu
+                row['bytes'] += nbytes
+
+    @contextmanager
+    def time(self, stage, item=None, nbytes=0):
+        """Time a block of synchronous code; CPU time is that of the current thread"""
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - wall, time.thread_time() - cpu, item, nbytes)
+
+    def cache_lookup(self, cache, hit):
+        with self._lock:
+            counts = self.caches.setdefault(cache, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_llm(self, client):
+        """Take the request counts, tokens and latencies of an LLMClient"""
+        with self._lock:
+            self.llm = {
+                **client.stats,
+                'latencies': list(client.latencies),
+            }
+        cache = getattr(client, 'response_cache', None)
+        if cache is not None:
+            with self._lock:
+                self.caches['llm_responses'] = [cache.hits, cache.misses]
+
+    def report(self):
+        """Return the metrics as a JSON-serializable dict"""
+        with self._lock:
+            stages = {}
+            for stage, entry in self.stages.items():
+                stages[stage] = {
+                    'runs': entry['runs'],
+                    'wall_seconds': round(entry['wall'], 6),
+                    'cpu_seconds': entry['cpu'] if entry['cpu'] is None else round(entry['cpu'], 6),
+                    'bytes': entry['bytes'],
+                    'wall_seconds_per_run': {key: round(value, 6) for key, value in _summary(entry['walls']).items()},
+                }
+            caches = {
+                cache: {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None}
+                for cache, (hits, misses) in self.caches.items()
+            }
+            llm = None
+            if self.llm is not None:
+                llm = {key: value for key, value in self.llm.items() if key != 'latencies'}
+                llm['latency_seconds'] = {key: value and round(value, 6) for key, value in _summary(self.llm['latencies']).items()}
+            files = {
+                item: {stage: {key: round(value, 6) if isinstance(value, float) else value for key, value in row.items()}
+                       for stage, row in rows.items()}
+                for item, rows in self.files.items()
+            }
+            return {
+                'name': self.name,
+                'started_at': self._started_at,
+                'wall_seconds': round(time.perf_counter() - self._wall_start, 6),
+                'cpu_seconds': round(time.process_time() - self._cpu_start, 6),
+                'stages': stages,
+                'caches': caches,
+                'llm': llm,
+                'counters': dict(self.counters),
+                'files': files,
+            }
+
+    def to_prometheus(self):
+        """Return the aggregate metrics in the Prometheus text exposition format"""
+        report = self.report()
+        with self._lock:
+            walls = {stage: sorted(entry['walls']) for stage, entry in self.stages.items()}
+            latencies = sorted(self.llm['latencies']) if self.llm else []
+        job = _label_value(report['name'])
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            if not samples:
+                return
+            lines.append(f"# HELP podcast_{name} {help_text}")
+            lines.append(f"# TYPE podcast_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join([f'job="{job}"'] + [f'{key}="{_label_value(v)}"' for key, v in labels])
+                lines.append(f"podcast_{name}{{{label_text}}} {_number(value)}")
+
+        metric("run_wall_seconds", "gauge", "Wall-clock time of the run", [((), report['wall_seconds'])])
+        metric("run_cpu_seconds", "gauge", "CPU time of the run process", [((), report['cpu_seconds'])])
+        stages = report['stages']
+        metric("stage_runs_total", "counter", "Stage runs", [((('stage', s),), e['runs']) for s, e in stages.items()])
+        metric("stage_cpu_seconds_total", "counter", "CPU time per stage",
+               [((('stage', s),), e['cpu_seconds']) for s, e in stages.items() if e['cpu_seconds'] is not None])
+        metric("stage_bytes_total", "counter", "Bytes processed per stage", [((('stage', s),), e['bytes']) for s, e in stages.items()])
+        samples = []
+        for stage, values in walls.items():
+            samples += [((('stage', stage), ('quantile', str(q))), percentile(values, q)) for q in QUANTILES]
+        metric("stage_wall_seconds", "summary", "Wall-clock time per stage run", samples)
+        for stage, entry in stages.items():
+            label_text = f'job="{job}",stage="{_label_value(stage)}"'
+            lines.append(f"podcast_stage_wall_seconds_sum{{{label_text}}} {_number(entry['wall_seconds'])}")
+            lines.append(f"podcast_stage_wall_seconds_count{{{label_text}}} {entry['runs']}")
+        metric("cache_hits_total", "counter", "Cache hits", [((('cache', c),), e['hits']) for c, e in report['caches'].items()])
+        metric("cache_misses_total", "counter", "Cache misses", [((('cache', c),), e['misses']) for c, e in report['caches'].items()])
+        if report['llm']:
+            for key in ('requests', 'retries', 'failures', 'tokens', 'cache_hits'):
+                metric(f"llm_{key}_total", "counter", f"LLM API {key.replace('_', ' ')}", [((), report['llm'].get(key, 0))])
+            metric("llm_request_seconds", "summary", "LLM API request latency",
+                   [((('quantile', str(q)),), percentile(latencies, q)) for q in QUANTILES])
+            lines.append(f'podcast_llm_request_seconds_sum{{job="{job}"}} {_number(sum(latencies))}')
+            lines.append(f'podcast_llm_request_seconds_count{{job="{job}"}} {len(latencies)}')
+        for name, value in report['counters'].items():
+            metric(f"{name}_total", "counter", name.replace('_', ' ').capitalize(), [((), value)])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path=METRICS_PATH):
+        """Write the report; paths ending in .prom or .txt get the Prometheus format, others JSON"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+        print(f"Metrics written to {path}")
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value):
+    if value is None:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def profile_call(func, *args, path=PROFILE_PATH, limit=25, **kwargs):
+    """Run func(*args, **kwargs) under cProfile, dump the stats to path and print the top entries"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(limit)
+        print(f"Profile written to {path} (inspect with: python -m pstats {path})")
@@ -0,0 +1,317 @@
+"""
+Person index: hosts and guests resolved to stable person ids across episodes.
+
+Names in the episode store are free text from regexes or the LLM, so one
+person shows up as "Yolanda Seals-Coffield", "Yolanda Seals Coffield" and
+"yolanda seals coffield". normalize_name() folds case, diacritics,
+punctuation, honorifics and suffixes; names with the same normal form are
+the same person. Remaining variants (typos, initials, nicknames and
+shortened first names) are matched fuzzily, but only against people
+sharing a blocking key (a prefix of the last name, or the first name plus
+the last initial), so resolution does not compare all pairs. Last names
+must be equal up to a typo: "John Smith" and "John Smithson" are two people.
+
+Person ids are derived from the normal form of the first spelling seen and
+kept in data/people.json with every known alias, so a person keeps their id
+across rebuilds. The same file holds the index: per person the episodes
+they appear in with their role, and the companies and titles from the
+guests' work experience. PersonIndex answers name and id lookups with dict
+lookups.
+
+    python person_index.py --build
+    python person_index.py "Yolanda Seals Coffield"
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from episode_store import STORE_PATH, iter_episodes
+
+PEOPLE_PATH = "data/people.json"
+
+# Minimum difflib ratio between normal forms for a fuzzy match
+FUZZY_THRESHOLD = 0.88
+# Minimum difflib ratio between two last names (typos only: Smith is not Smithson)
+LAST_NAME_THRESHOLD = 0.8
+# A first name may be shortened by at most this many letters (Marcie/Marc, Daniel/Dan)
+MAX_FIRST_NAME_TRIM = 3
+
+_HONORIFICS = {"dr", "mr", "mrs", "ms", "miss", "mx", "prof", "sir", "dame"}
+_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "phd", "md", "mba", "cpa", "esq"}
+# Nicknames whose full form is not a short extension of them
+_NICKNAMES = {
+    "bill": ("william",), "will": ("william",), "bob": ("robert",), "rob": ("robert",), "dick": ("richard",),
+    "rick": ("richard",), "jim": ("james",), "jimmy": ("james",), "mike": ("michael",), "chris": ("christopher",),
+    "tom": ("thomas",), "tony": ("anthony",), "steve": ("steven", "stephen"), "joe": ("joseph",),
+    "jon": ("jonathan",), "nick": ("nicholas",), "matt": ("matthew",), "andy": ("andrew",), "drew": ("andrew",),
+    "ben": ("benjamin",), "alex": ("alexander", "alexandra"), "sam": ("samuel", "samantha"),
+    "liz": ("elizabeth",), "beth": ("elizabeth",), "betty": ("elizabeth",), "kate": ("katherine", "catherine"),
+    "katie": ("katherine", "catherine"), "cathy": ("catherine",), "jenny": ("jennifer",), "jen": ("jennifer",),
+    "peggy": ("margaret",), "maggie": ("margaret",), "sue": ("susan",), "patty": ("patricia",),
+    "trish": ("patricia",), "becky": ("rebecca",), "debbie": ("deborah",), "vicky": ("victoria",),
+}
+_NON_WORD_RE = re.compile(r"[^\w\s]|_")
+_SPACE_RE = re.compile(r"\s+")
+
+def normalize_name(name):
+    """Return the normal form of a person's name ('' if nothing is left)
+
+    "Dr. José  Núñez-García, Jr." -> "jose nunez garcia"
+    """
+    if not isinstance(name, str):
+        return ''
+    name = name.strip()
+    # "Last, First" -> "First Last" (but not "Name, Jr.")
+    if name.count(',') == 1:
+        last, first = (part.strip() for part in name.split(','))
+        if first and _NON_WORD_RE.sub(' ', first).strip().lower() not in _SUFFIXES:
+            name = f"{first} {last}"
+    decomposed = unicodedata.normalize('NFKD', name)
+    name = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    tokens = _SPACE_RE.sub(' ', _NON_WORD_RE.sub(' ', name)).split()
+    while tokens and tokens[0] in _HONORIFICS:
+        tokens.pop(0)
+    while len(tokens) > 1 and tokens[-1] in _SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+def looks_like_name(name):
+    """False for fragments the rule-based extractor picks up ("to the", "your host")"""
+    words = name.split() if isinstance(name, str) else []
+    return bool(words) and all(word[:1].isupper() or not word[:1].isalpha() for word in words)
+
+def person_id(normal):
+    """The id of a new person, derived from the normal form of their name"""
+    return "p-" + hashlib.blake2b(normal.encode('utf-8'), digest_size=5).hexdigest()
+
+def blocking_keys(normal):
+    """Keys that any plausible variant of this name shares with it"""
+    tokens = normal.split()
+    if len(tokens) < 2:
+        return [f"1:{normal}"]
+    first, last = tokens[0], tokens[-1]
+    return [f"L:{last[:4]}", f"F:{first[:4]}:{last[0]}"]
+
+def _compatible(a, b):
+    """True if two first (or middle) names can be the same person's
+
+    Equal, an initial, a known nickname (Bill/William), or a short prefix
+    (Marc/Marcie, Dan/Daniel; not Chris/Christina).
+    """
+    if a == b:
+        return True
+    if len(a) == 1 or len(b) == 1:
+        return a[0] == b[0]
+    if b in _NICKNAMES.get(a, ()) or a in _NICKNAMES.get(b, ()):
+        return True
+    short, long = sorted((a, b), key=len)
+    return len(short) >= 3 and long.startswith(short) and len(long) - len(short) <= MAX_FIRST_NAME_TRIM
+
+def _same_last_name(a, b):
+    """True if two last names are equal or differ by a typo (never a prefix match)"""
+    if a == b:
+        return True
+    if len(a) == 1 or len(b) == 1:
+        return False
+    return _ratio(a, b, LAST_NAME_THRESHOLD) >= LAST_NAME_THRESHOLD
+
+def _ratio(a, b, threshold):
+    """difflib ratio of a and b, or 0.0 as soon as its upper bounds fall below threshold"""
+    matcher = difflib.SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+        return 0.0
+    return matcher.ratio()
+
+def name_similarity(a, b, threshold=FUZZY_THRESHOLD):
+    """Similarity in [0, 1] of two normal forms (0.0 if below threshold)"""
+    if a == b:
+        return 1.0
+    ta, tb = a.split(), b.split()
+    if len(ta) < 2 or len(tb) < 2 or not _same_last_name(ta[-1], tb[-1]):
+        return 0.0
+    if _compatible(ta[0], tb[0]):
+        # Same first name up to initials and nicknames; middle names must not conflict
+        middle_a, middle_b = ta[1:-1], tb[1:-1]
+        if middle_a and middle_b and not _compatible(middle_a[0], middle_b[0]):
+            return 0.0
+        # An initial for a last name ("J. S.") is too weak to match on
+        if len(ta[-1]) > 1:
+            return 0.95
+    return _ratio(a, b, threshold)
+
+class PersonResolver:
+    """Resolve names to person ids, reusing the ids and aliases of an earlier index"""
+
+    def __init__(self, aliases=None, threshold=FUZZY_THRESHOLD):
+        self.threshold = threshold
+        # normal form -> person id
+        self.aliases = dict(aliases or {})
+        # blocking key -> {person id: [normal forms]}
+        self._blocks = {}
+        # person id -> normal form of the first spelling seen
+        self._first = {}
+        self._ids = set(self.aliases.values())
+        for normal, pid in self.aliases.items():
+            self._add_to_blocks(normal, pid)
+
+    def _add_to_blocks(self, normal, pid):
+        self._first.setdefault(pid, normal)
+        for key in blocking_keys(normal):
+            self._blocks.setdefault(key, {}).setdefault(pid, []).append(normal)
+
+    def resolve(self, name):
+        """Return the person id of a name, creating a person if it matches nobody; None if not a name"""
+        normal = normalize_name(name)
+        if not normal:
+            return None
+        pid = self.aliases.get(normal)
+        if pid is not None:
+            return pid
+        best, best_score = None, self.threshold
+        for key in blocking_keys(normal):
+            for candidate, normals in self._blocks.get(key, {}).items():
+                score = max(name_similarity(normal, other, self.threshold) for other in normals)
+                # The first spelling must match too, so a vague alias such as
+                # "J Smith" cannot chain "John Smith" and "Jane Smith" together
+                if score >= best_score and (best is None or score > best_score) and \
+                        name_similarity(normal, self._first[candidate], self.threshold) >= self.threshold:
+                    best, best_score = candidate, score
+        pid = best
+        if pid is None:
+            pid = person_id(normal)
+            suffix = 2
+            while pid in self._ids:
+                pid = f"{person_id(normal)}-{suffix}"
+                suffix += 1
+            self._ids.add(pid)
+        self.aliases[normal] = pid
+        self._add_to_blocks(normal, pid)
+        return pid
+
+def _load(path):
+    if not os.path.exists(path):
+        return {'people': {}, 'aliases': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def build_person_index(episodes, path=PEOPLE_PATH):
+    """Resolve every host and guest in episodes and write the person index; returns the person count
+
+    Aliases (and so ids) from an existing index at path are kept.
+    """
+    resolver = PersonResolver(_load(path).get('aliases'))
+    people = {}
+    spellings = {}
+    # person id -> {(episode id, role)} already listed, so a repeat is a set lookup
+    appearances = {}
+
+    def person(name):
+        pid = resolver.resolve(name)
+        if pid is None:
+            return None, None
+        entry = people.get(pid)
+        if entry is None:
+            entry = people[pid] = {'name': name, 'aliases': [], 'episodes': [], 'companies': [], 'titles': []}
+            spellings[pid] = {}
+            appearances[pid] = set()
+        spellings[pid][name] = spellings[pid].get(name, 0) + 1
+        return pid, entry
+
+    # Names are resolved in store order, so a new person's id comes from the
+    # first spelling seen
+    for episode in episodes:
+        episode_id = episode.get('id')
+        for role, names in (('host', episode.get('hosts')), ('guest', episode.get('guests'))):
+            for name in names or ():
+                if not looks_like_name(name):
+                    continue
+                pid, entry = person(name.strip())
+                if pid and (episode_id, role) not in appearances[pid]:
+                    appearances[pid].add((episode_id, role))
+                    entry['episodes'].append({'id': episode_id, 'role': role})
+        for experience in episode.get('guestWorkExperience') or ():
+            name = experience.get('name') if isinstance(experience, dict) else None
+            if not looks_like_name(name):
+                continue
+            pid, entry = person(name.strip())
+            if pid is None:
+                continue
+            for field, key in (('company', 'companies'), ('title', 'titles')):
+                value = (experience.get(field) or '').strip()
+                if value and value not in entry[key]:
+                    entry[key].append(value)
+
+    for pid, entry in people.items():
+        # Display the most common spelling; the others are aliases
+        ordered = sorted(spellings[pid].items(), key=lambda item: (-item[1], item[0]))
+        entry['name'] = ordered[0][0]
+        entry['aliases'] = [spelling for spelling, _ in ordered[1:]]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'people': people, 'aliases': resolver.aliases}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+    return len(people)
+
+class PersonIndex:
+    """Lookups in the person index written by build_person_index()"""
+
+    def __init__(self, path=PEOPLE_PATH):
+        data = _load(path)
+        self.people = data['people']
+        self.aliases = data['aliases']
+
+    def __len__(self):
+        return len(self.people)
+
+    def person_id(self, name):
+        """Return the id of the person with this name (any known spelling), or None"""
+        return self.aliases.get(normalize_name(name))
+
+    def get(self, name_or_id):
+        """Return the index entry of a person by id or name, or None"""
+        entry = self.people.get(name_or_id)
+        if entry is None:
+            pid = self.person_id(name_or_id)
+            entry = self.people.get(pid) if pid else None
+        return entry
+
+    def episodes_of(self, name_or_id, role=None):
+        """Return the ids of the episodes a person appears in, optionally only as 'host' or 'guest'"""
+        entry = self.get(name_or_id)
+        if entry is None:
+            return []
+        return list(dict.fromkeys(seen['id'] for seen in entry['episodes'] if role is None or seen['role'] == role))
+
+def build_person_index_from_store(store_path=STORE_PATH, path=PEOPLE_PATH):
+    """Rebuild the person index from the episode store"""
+    count = build_person_index(iter_episodes(store_path), path)
+    print(f"Person index: {count} people written to {path}")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the host/guest person index")
+    parser.add_argument("name", nargs="*", help="a person's name or id")
+    parser.add_argument("--build", action="store_true", help=f"rebuild {PEOPLE_PATH} from {STORE_PATH}")
+    args = parser.parse_args()
+
+    if args.build:
+        build_person_index_from_store()
+    if args.name:
+        index = PersonIndex()
+        query = ' '.join(args.name)
+        entry = index.get(query)
+        if entry is None:
+            print(f"No person matching {query!r}")
+            return
+        print(json.dumps({'id': index.person_id(query) or query, **entry}, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
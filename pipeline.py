@@ -0,0 +1,472 @@
+"""
+Streaming extraction pipeline: one read and one write per episode.
+
+A run is a list of stages. A stage is a function of the episode record that
+returns the fields it adds, and names the stages whose fields it reads
+(`after`). For each record, stages that do not depend on each other run
+concurrently: coroutine stages (AI extraction) on the event loop, the others
+in a thread pool. Records stream through in source order with a bounded
+number in flight, each finished record is assembled and written to the
+episode store once, and the finalizers (JSON export, index builds) run once
+at the end.
+
+Stages with a `version` are cached in the ExtractionCache by the source
+file's content hash; the cache key also covers the versions of the stages
+they depend on, so bumping one stage re-runs it and everything downstream.
+Fields whose names start with "_" are working state and are not written.
+Before a run, older versions of near-duplicate source transcripts are found
+with dedup.py and skipped, so they never reach the AI stage.
+
+    python pipeline.py               # full refresh from Test Scripts
+    python pipeline.py --no-ai       # rule-based fields only
+    python pipeline.py --metrics data/metrics.json
+"""
+
+import argparse
+import asyncio
+import inspect
+import io
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from change_manifest import build_change_manifest_from_store
+from columnar_store import build_columnar_store_from_store
+from corpus_stats import build_stats_from_store
+from dedup import find_duplicates, report_duplicates, signatures_for_files, superseded
+from docx_text import iter_paragraphs
+from episode_store import LEGACY_JSON_PATH, STORE_PATH, EpisodeWriter, export_json_array
+from extraction_cache import CACHE_PATH, ExtractionCache, content_hash
+from filename_info import TRANSCRIPT_EXTENSIONS, episode_id, parse_filename_info
+from metrics import Metrics, profile_call
+from person_index import build_person_index_from_store
+from related_episodes import build_related_from_store
+from search_index import build_index_from_store
+from segment_index import build_segment_store_from_store
+
+TEST_SCRIPTS_DIR = "Test Scripts"
+
+# Bump when the text stage's output changes so cached text is re-parsed
+TEXT_VERSION = "docx-xml-1"
+
+class Stage:
+    """One step of the pipeline
+
+    func(episode) returns a dict of fields to add, or None to add nothing
+    (None is not cached); it may be a coroutine function. It must only read
+    the source fields and fields produced by the stages named in `after`.
+    A stage with a version should only depend on stages with versions.
+    """
+
+    def __init__(self, name, func, after=(), version=None):
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+        self.version = version
+        self.is_async = inspect.iscoroutinefunction(func)
+
+class StageError(Exception):
+    """A stage failed for one record"""
+
+    def __init__(self, stage, error):
+        super().__init__(f"{stage}: {type(error).__name__}: {error}")
+        self.stage = stage
+
+def _ordered(stages):
+    """Return stages sorted so every stage comes after the ones it depends on"""
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"duplicate stage name {stage.name!r}")
+        by_name[stage.name] = stage
+    ordered = []
+    state = {}
+
+    def visit(stage, path):
+        if state.get(stage.name) == 'done':
+            return
+        if state.get(stage.name) == 'visiting':
+            raise ValueError(f"stage dependency cycle: {' -> '.join(path + [stage.name])}")
+        state[stage.name] = 'visiting'
+        for name in stage.after:
+            if name not in by_name:
+                raise ValueError(f"stage {stage.name!r} depends on unknown stage {name!r}")
+            visit(by_name[name], path + [stage.name])
+        state[stage.name] = 'done'
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage, [])
+    return ordered
+
+class Pipeline:
+    """Run records through stages and write each finished episode to the store
+
+    With workers=0 the synchronous stages run on the event loop thread (one
+    record at a time), e.g. so that cProfile sees them. When a Metrics
+    object is given, every stage run, source read, store write, finalizer
+    and cache lookup is recorded in it.
+    """
+
+    def __init__(self, stages, build=None, finalizers=(), cache=None, workers=4, max_in_flight=None, metrics=None):
+        self.stages = _ordered(stages)
+        self.build = build
+        self.finalizers = list(finalizers)
+        self.cache = cache
+        self.workers = workers
+        self.max_in_flight = max_in_flight or max(1, workers * 4)
+        self.metrics = metrics
+        self.failures = []
+        self.cache_hits = 0
+        # A stage's cache key includes the versions of everything it depends on
+        self._cache_versions = {}
+        for stage in self.stages:
+            if stage.version is not None:
+                upstream = [self._cache_versions.get(name) or '' for name in stage.after]
+                self._cache_versions[stage.name] = '|'.join([stage.version] + upstream)
+
+    async def _run_stage(self, stage, episode, dependencies, executor):
+        """Run one stage for one record once its dependencies are done; return its fields"""
+        if dependencies:
+            await asyncio.gather(*dependencies)
+        cache_version = self._cache_versions.get(stage.name) if self.cache else None
+        source_hash = episode.get('_content_hash')
+        if cache_version and source_hash:
+            fields = self.cache.get_fields(source_hash, stage.name, cache_version)
+            if self.metrics:
+                self.metrics.cache_lookup(f"stage:{stage.name}", fields is not None)
+            if fields is not None:
+                self.cache_hits += 1
+                episode.update(fields)
+                return fields
+        try:
+            if stage.is_async:
+                started = time.perf_counter()
+                fields = await stage.func(episode)
+                # CPU time is not attributable across awaits
+                wall, cpu = time.perf_counter() - started, None
+            elif executor:
+                fields, wall, cpu = await asyncio.get_running_loop().run_in_executor(executor, _timed_call, stage.func, episode)
+            else:
+                fields, wall, cpu = _timed_call(stage.func, episode)
+        except Exception as e:
+            raise StageError(stage.name, e) from e
+        if self.metrics:
+            self.metrics.record(stage.name, wall, cpu, episode.get('id'), episode.get('_source_bytes', 0))
+        if fields:
+            episode.update(fields)
+            if cache_version and source_hash:
+                self.cache.put_fields(source_hash, stage.name, cache_version, fields)
+        return fields
+
+    async def _run_record(self, episode, executor):
+        """Run all stages for one record and return it with fields in a fixed order
+
+        Fields come in source order, then in stage order, however the
+        concurrent stages happened to finish.
+        """
+        keys = list(episode)
+        tasks = {}
+        for stage in self.stages:
+            dependencies = [tasks[name] for name in stage.after]
+            tasks[stage.name] = asyncio.ensure_future(self._run_stage(stage, episode, dependencies, executor))
+        # Stages that depend on a failed stage fail with its error
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        for fields in results:
+            if fields:
+                keys.extend(fields)
+        return {key: episode[key] for key in dict.fromkeys(keys)}
+
+    async def _run(self, records, writer, on_episode):
+        executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers else None
+        in_flight = deque()
+        metrics = self.metrics
+
+        async def finish():
+            record_id, task = in_flight.popleft()
+            try:
+                episode = await task
+            except StageError as e:
+                self.failures.append({"id": record_id, "stage": e.stage, "error": str(e)})
+                print(f"Failed {record_id}: {e}")
+                return
+            if self.build:
+                episode = self.build(episode)
+            episode = {key: value for key, value in episode.items() if not key.startswith('_')}
+            if metrics:
+                with metrics.time('write', record_id):
+                    writer.write(episode)
+            else:
+                writer.write(episode)
+            if on_episode:
+                on_episode(episode)
+
+        records = iter(records)
+        try:
+            while True:
+                if metrics:
+                    wall, cpu = time.perf_counter(), time.thread_time()
+                record = next(records, None)
+                if record is None:
+                    break
+                if metrics:
+                    metrics.record('read', time.perf_counter() - wall, time.thread_time() - cpu,
+                                   record.get('id'), record.get('_source_bytes', 0))
+                if len(in_flight) >= self.max_in_flight:
+                    await finish()
+                in_flight.append((record.get('id'), asyncio.ensure_future(self._run_record(record, executor))))
+            while in_flight:
+                await finish()
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+            if executor:
+                executor.shutdown(wait=True)
+
+    def run(self, records, store_path=STORE_PATH, on_episode=None):
+        """Run every record through the stages, replace the store with the results and finalize
+
+        records may be any iterable of dicts (it may read from the store being
+        replaced: the store is swapped in only when the run completes).
+        Returns the number of episodes written.
+        """
+        with EpisodeWriter(store_path) as writer:
+            asyncio.run(self._run(records, writer, on_episode))
+        if self.metrics:
+            self.metrics.count('episodes_written', writer.count)
+            self.metrics.count('episodes_failed', len(self.failures))
+            self.metrics.count('store_bytes', os.path.getsize(store_path))
+        self.finalize(store_path)
+        return writer.count
+
+    async def process(self, records, on_episode=None):
+        """Run records through the stages and return the finished episodes
+
+        The store is not touched and the finalizers do not run. A coroutine,
+        so a long-running caller keeps one event loop (and LLM client) across
+        batches.
+        """
+        episodes = _EpisodeList()
+        await self._run(records, episodes, on_episode)
+        return list(episodes)
+
+    def finalize(self, store_path=STORE_PATH):
+        """Run the finalizers on the store"""
+        run_finalizers(store_path, self.finalizers, self.metrics)
+
+class _EpisodeList(list):
+    """Collects finished episodes in place of an EpisodeWriter"""
+
+    def write(self, episode):
+        self.append(episode)
+
+def _timed_call(func, episode):
+    """Call a synchronous stage and return (fields, wall seconds, thread CPU seconds)"""
+    wall, cpu = time.perf_counter(), time.thread_time()
+    fields = func(episode)
+    return fields, time.perf_counter() - wall, time.thread_time() - cpu
+
+def read_transcript_file(path):
+    """Return the source record of one transcript file
+
+    The file is read once here; the text stage parses the bytes and the
+    cache is keyed by their hash.
+    """
+    filename = os.path.basename(path)
+    with open(path, 'rb') as f:
+        content = f.read()
+    return {
+        "id": episode_id(filename),
+        "fileName": episode_id(filename),
+        "_filename": filename,
+        "_content": content,
+        "_content_hash": content_hash(content),
+        "_source_bytes": len(content),
+    }
+
+def transcript_paths(directory=TEST_SCRIPTS_DIR):
+    """The transcript files in a folder, in filename order"""
+    return [
+        os.path.join(directory, filename)
+        for filename in sorted(os.listdir(directory))
+        if filename.lower().endswith(TRANSCRIPT_EXTENSIONS)
+    ]
+
+def iter_transcript_files(directory=TEST_SCRIPTS_DIR, skip=()):
+    """Yield a source record for each transcript file, in filename order, except the paths in skip"""
+    for path in transcript_paths(directory):
+        if path not in skip:
+            yield read_transcript_file(path)
+
+def source_text(filename, content):
+    """The transcript text of a .docx or .txt file's bytes"""
+    if filename.lower().endswith('.txt'):
+        return content.decode('utf-8-sig')
+    return '\n'.join(iter_paragraphs(io.BytesIO(content)))
+
+def transcript_text(episode):
+    """Text stage: the transcript of a .docx or .txt source record"""
+    text = source_text(episode['_filename'], episode['_content'])
+    if not text.strip():
+        raise ValueError("no text extracted")
+    return {"transcript": text, "wordCount": len(text.split())}
+
+def filename_metadata(episode):
+    """Filename stage: date, series and episode number"""
+    file_info = parse_filename_info(episode['_filename'])
+    return {"date": file_info['date'], "series": file_info['series'], "episodeNumber": file_info['episode_number']}
+
+def export_legacy_json(store_path):
+    export_json_array(store_path, LEGACY_JSON_PATH)
+
+# JSON export and index builds, run once after the store is written
+DEFAULT_FINALIZERS = (
+    export_legacy_json, build_index_from_store, build_segment_store_from_store, build_columnar_store_from_store,
+    build_stats_from_store, build_person_index_from_store, build_related_from_store,
+    build_change_manifest_from_store,
+)
+
+def run_finalizers(store_path=STORE_PATH, finalizers=DEFAULT_FINALIZERS, metrics=None):
+    """Run finalizers on the store in order, timing each in metrics if given
+
+    Every entry point that writes the store calls this, so a new artifact is
+    registered once, in DEFAULT_FINALIZERS.
+    """
+    for finalize in finalizers:
+        if metrics:
+            with metrics.time(f"finalize:{finalize.__name__}"):
+                finalize(store_path)
+        else:
+            finalize(store_path)
+
+def refresh_stages(client=None, tagger=None):
+    """The stages of a full refresh; AI extraction is included when a client is given"""
+    from enhance_existing_data import find_quotes, summarize, tag_topics
+    from extract_core_data import CORE_EXTRACTOR_VERSION, rule_fields
+    from quote_miner import QuoteMiner
+    from topic_tagger import TopicTagger
+
+    tagger = tagger or TopicTagger.from_file()
+    miner = QuoteMiner()
+    stages = [
+        Stage("text", transcript_text, version=TEXT_VERSION),
+        Stage("filename", filename_metadata),
+        Stage("rules", rule_fields, after=["text"], version=CORE_EXTRACTOR_VERSION),
+        Stage("topics", lambda episode: tag_topics(episode, tagger), after=["text"]),
+        Stage("quotes", lambda episode: find_quotes(episode, miner), after=["rules"]),
+        Stage("summary", summarize, after=["rules", "topics"]),
+    ]
+    if client:
+        from extract_enhanced_data import AI_EXTRACTOR_VERSION, enhance_extraction_with_ai
+
+        async def ai_fields(episode):
+            # A failed call adds nothing (and is not cached, so it is retried
+            # next run); the rule-based fields are used instead
+            ai_data = await enhance_extraction_with_ai(client, episode['transcript'], episode['_filename'])
+            return {"_ai": ai_data} if ai_data else None
+
+        stages.append(Stage("ai", ai_fields, after=["text"], version=AI_EXTRACTOR_VERSION))
+    return stages
+
+def build_refreshed_episode(episode):
+    """Assemble the stored record; AI fields take precedence over the rule-based ones"""
+    ai_data = episode.get('_ai') or {}
+    return {
+        "id": episode['id'],
+        "fileName": episode['fileName'],
+        "date": episode['date'] or ai_data.get('date'),
+        "series": episode['series'] or ai_data.get('series', ""),
+        "episodeNumber": episode['episodeNumber'] or ai_data.get('episode_number', ""),
+        "episodeTitle": episode['episodeTitle'],
+        "hosts": episode['hosts'],
+        "guests": episode['guests'],
+        "guestWorkExperience": episode['guestWorkExperience'],
+        "keyTopics": ai_data.get('key_topics') or episode['keyTopics'],
+        "notableQuotes": ai_data.get('notable_quotes') or episode['notableQuotes'],
+        "summary": ai_data.get('summary') or episode['summary'],
+        "transcript": episode['transcript'],
+        "audioLink": "",
+        "wordCount": episode['wordCount'],
+        "extractedAt": datetime.now().isoformat(),
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract, enhance and index every transcript in one pass")
+    parser.add_argument("--source", default=TEST_SCRIPTS_DIR, help=f"transcript folder (default: {TEST_SCRIPTS_DIR})")
+    parser.add_argument("--no-ai", action="store_true", help="skip AI extraction (rule-based fields only)")
+    parser.add_argument("--no-cache", action="store_true", help=f"recompute every stage instead of reusing {CACHE_PATH}")
+    parser.add_argument("--workers", type=int, default=4, help="threads for the non-AI stages (default: 4)")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="process older versions of near-duplicate transcripts too")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write per-stage/per-file metrics (.prom/.txt: Prometheus text format, otherwise JSON)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="run one transcript file under cProfile (the store is not touched)")
+    return parser.parse_args()
+
+def profile_file(path, client=None, cache=None):
+    """Run every stage for one transcript file under cProfile, writing to a throwaway store"""
+    pipeline = Pipeline(refresh_stages(client), build=build_refreshed_episode, cache=cache, workers=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_call(pipeline.run, [read_transcript_file(path)], os.path.join(tmp, "episodes.ndjson"))
+
+def main():
+    args = parse_args()
+    client = None
+    if not args.no_ai:
+        from llm_client import create_client
+        client = create_client()
+    cache = None if args.no_cache else ExtractionCache()
+    if args.profile:
+        try:
+            profile_file(args.profile, client, cache)
+        finally:
+            if client:
+                client.close()
+            if cache:
+                cache.close()
+        return
+
+    metrics = Metrics("pipeline") if args.metrics else None
+    skip = set()
+    if not args.keep_duplicates:
+        # Older versions of re-delivered transcripts are dropped before any stage (or API call) runs
+        groups = find_duplicates(signatures_for_files(transcript_paths(args.source), source_text, cache))
+        report_duplicates(groups)
+        skip = superseded(groups)
+        if metrics:
+            metrics.count('duplicates_skipped', len(skip))
+    pipeline = Pipeline(
+        refresh_stages(client),
+        build=build_refreshed_episode,
+        finalizers=DEFAULT_FINALIZERS,
+        cache=cache,
+        workers=max(1, args.workers),
+        metrics=metrics,
+    )
+    try:
+        count = pipeline.run(iter_transcript_files(args.source, skip), on_episode=lambda episode: print(f"Processed {episode['id']}"))
+    finally:
+        if client:
+            print(f"AI requests: {client.stats['requests']}, retries: {client.stats['retries']}, failures: {client.stats['failures']}, cached responses: {client.stats['cache_hits']}")
+            if metrics:
+                metrics.record_llm(client)
+            client.close()
+        if cache:
+            cache.close()
+    if metrics:
+        metrics.write(args.metrics)
+
+    print(f"Refreshed {count} episodes in {STORE_PATH} and {LEGACY_JSON_PATH} ({pipeline.cache_hits} stage results from cache)")
+    if pipeline.failures:
+        print(f"Failed: {len(pipeline.failures)}")
+        for failure in pipeline.failures:
+            print(f"  {failure['id']}: {failure['error']}")
+
+if __name__ == "__main__":
+    main()
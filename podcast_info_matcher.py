@@ -0,0 +1,285 @@
+"""
+Compiled, single-scan extraction of title, hosts/guests and work experience.
+
+The original extract_podcast_info ran sixteen separate regexes over the full
+transcript, and its two `.*?` work-experience patterns backtracked across
+whole paragraphs (minutes per transcript). Here a single compiled anchor
+regex finds every keyword of interest in one pass ("welcome to", "I'm",
+" podcast", CEO, Director, ...). Title and name patterns are then checked only
+at their anchors, and each work-experience match is resolved from the
+positions of the job-title anchors on its line (and the "at <Company>"
+anchors) with bisect lookups instead of lazy wildcards.
+
+The results are the same as the original patterns. The one intentional
+difference is that names keep the order they first appear in the transcript
+instead of set order, which made the host/guest split vary between runs.
+"""
+
+from bisect import bisect_left
+import re
+
+_ROLE_KEYWORDS = r"CEO|CTO|CFO|VP|Vice President|President|Director|Manager|Chief|Senior|Principal"
+
+# One zero-width alternative per anchor so overlapping anchors are all
+# reported; the group that matched identifies the anchor (keeping group names
+# rather than matched text, since IGNORECASE matching can change its length
+# under lower()). "welcome to " is listed before "welcome " and also counts
+# as a "welcome " anchor.
+_ANCHOR_RE = re.compile(
+    r"(?=(?P<welcome_to>welcome to )"
+    r"|(?P<this_is>this is )"
+    r"|(?P<listening_to>you're listening to )"
+    r"|(?P<podcast> podcast)"
+    r"|(?P<i_m>i'm )"
+    r"|(?P<my_name_is>my name is )"
+    r"|(?P<i_am>i am )"
+    r"|(?P<joined_by>joined by )"
+    r"|(?P<with_us_today>with us today )"
+    r"|(?P<welcome>welcome )"
+    r"|(?P<guest>guest )"
+    rf"|(?P<role>{_ROLE_KEYWORDS}))",
+    re.IGNORECASE
+)
+
+# Anchors that introduce a name, and where the name starts relative to the anchor
+_NAME_ANCHOR_OFFSETS = {
+    'i_m': len("i'm "),
+    'my_name_is': len("my name is "),
+    'this_is': len("this is "),
+    'i_am': len("i am "),
+    'joined_by': len("joined by "),
+    'with_us_today': len("with us today "),
+    'welcome': len("welcome "),
+    'welcome_to': len("welcome "),
+    'guest': len("guest "),
+}
+
+# Anchors that start a "<anchor>(.+?) podcast" title pattern, by title priority
+_TITLE_PODCAST_ANCHORS = {
+    'welcome_to': 0,
+    'this_is': 2,
+    'listening_to': 3,
+}
+
+_NAME_RE = re.compile(r"[A-Z][a-z]+ [A-Z][a-z]+", re.IGNORECASE)
+_PODCAST_RE = re.compile(r" podcast", re.IGNORECASE)
+
+_LETTERS_RE = re.compile(r"[a-z]+", re.IGNORECASE)
+_LAST_WORD_RE = re.compile(r"[a-z]+\s*$", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+_NON_SPACE_RE = re.compile(r"\S")
+_AT_COMPANY_RE = re.compile(r"(?=at [a-z][a-z])", re.IGNORECASE)
+
+def _line_bounds(text, pos):
+    """Return (start, end) of the line containing pos"""
+    start = text.rfind('\n', 0, pos) + 1
+    end = text.find('\n', pos)
+    return start, (len(text) if end == -1 else end)
+
+def _company_and_role(text, e, role_starts, role_ends, last_words):
+    """Resolve `.*?([A-Z][A-Z][A-Z]|[A-Z][a-z]+\\s+[A-Z][a-z]+).*?(<role>)` at e
+
+    Returns (company, role, match_end) or None. The company can start at any
+    word (or word tail) on e's line; it is accepted as soon as a role keyword
+    starts after it on the line where the company ends. last_words caches
+    the final word of each line, keyed by line end.
+    """
+    line_start, line_end = _line_bounds(text, e)
+    i = bisect_left(role_starts, e)
+    if i == len(role_starts) or role_starts[i] >= line_end:
+        # No role ahead on this line: only a two-word company whose whitespace
+        # runs onto the next line can still reach one
+        if line_end not in last_words:
+            found = _LAST_WORD_RE.search(text, line_start, line_end)
+            last_words[line_end] = (found.start(), found.start() + len(found.group().rstrip())) if found else None
+        last_word = last_words[line_end]
+        words = [(max(last_word[0], e), last_word[1])] if last_word and last_word[1] > e else []
+    else:
+        words = (word.span() for word in _LETTERS_RE.finditer(text, e, line_end))
+
+    for p, a in words:
+        # Three letters, then the first role at or after them on this line
+        if a - p >= 3:
+            i = bisect_left(role_starts, p + 3)
+            if i < len(role_starts) and role_starts[i] < line_end:
+                return text[p:p + 3], text[role_starts[i]:role_ends[i]], role_ends[i]
+        # Two words separated by whitespace, which may cross into the next line
+        if a - p >= 2:
+            space = _SPACE_RE.match(text, a)
+            second = space and _LETTERS_RE.match(text, space.end())
+            if second and len(second.group()) >= 2:
+                b, c = second.span()
+                second_line_end = _line_bounds(text, b)[1]
+                i = bisect_left(role_starts, c)
+                if i < len(role_starts) and role_starts[i] < second_line_end:
+                    return text[p:c], text[role_starts[i]:role_ends[i]], role_ends[i]
+                # Backtracking shortens the second word so it ends right
+                # where the last role keyword on its line begins
+                j = bisect_left(role_starts, second_line_end) - 1
+                if j >= 0 and role_starts[j] >= b + 2:
+                    return text[p:role_starts[j]], text[role_starts[j]:role_ends[j]], role_ends[j]
+    return None
+
+def _role_and_company(text, e, role_starts, role_ends, at_starts):
+    """Resolve `.*?(<role>).*?at ([A-Z][a-z]+)` at e
+
+    Returns (role, company, match_end) or None: the first role on e's line
+    that is followed by an "at <Company>" on the same line.
+    """
+    line_start, line_end = _line_bounds(text, e)
+    k = bisect_left(at_starts, line_end) - 1
+    if k < 0 or at_starts[k] < e:
+        return None
+    last_at = at_starts[k]
+    i = bisect_left(role_starts, e)
+    while i < len(role_starts) and role_starts[i] < line_end:
+        if role_ends[i] <= last_at:
+            at = at_starts[bisect_left(at_starts, role_ends[i])]
+            company = _LETTERS_RE.match(text, at + 3)
+            return text[role_starts[i]:role_ends[i]], company.group(), company.end()
+        i += 1
+    return None
+
+def _find_work_experience(text, resolve, line_may_match):
+    """Emulate re.findall(r"([A-Z][a-z]+ [A-Z][a-z]+)<rest>", text, re.I)
+
+    `resolve(e)` matches the rest of the pattern after a name ending at e and
+    returns (group2, group3, match_end) or None. The name's second word is
+    tried longest first, as the regex engine would; if no length works, every
+    start inside the first word fails the same way, so the search resumes at
+    the second word.
+    """
+    matches = []
+    pos = 0
+    while True:
+        name = _NAME_RE.search(text, pos)
+        if not name:
+            return matches
+        start = name.start()
+        line_end = _line_bounds(text, start)[1]
+        if not line_may_match(start, line_end):
+            pos = line_end + 1
+            continue
+        second_word = text.index(' ', start) + 1
+        for e in range(name.end(), second_word + 1, -1):
+            rest = resolve(e)
+            if rest:
+                matches.append((text[start:e], rest[0], rest[1]))
+                pos = rest[2]
+                break
+        else:
+            pos = second_word
+
+def extract_podcast_info(transcript_text):
+    """Extract podcast information from transcript text"""
+    text = transcript_text
+
+    # Title candidates by pattern priority: "Welcome to X podcast",
+    # "Welcome to X.", "This is X podcast", "You're listening to X podcast",
+    # "X podcast"
+    titles = [None] * 5
+    names = {}
+    name_ends = {}
+    role_starts = []
+    role_ends = []
+    line_start = line_end = -1
+
+    for match in _ANCHOR_RE.finditer(text):
+        kind = match.lastgroup
+        pos = match.start()
+        if pos >= line_end:
+            line_start, line_end = _line_bounds(text, pos)
+
+        if kind == 'role':
+            role_starts.append(pos)
+            role_ends.append(match.end(kind))
+            continue
+
+        if titles[0] is None:
+            if kind in _TITLE_PODCAST_ANCHORS and titles[_TITLE_PODCAST_ANCHORS[kind]] is None:
+                group_start = match.end(kind)
+                found = _PODCAST_RE.search(text, group_start + 1, line_end)
+                if found:
+                    titles[_TITLE_PODCAST_ANCHORS[kind]] = text[group_start:found.start()].strip()
+            if kind == 'welcome_to' and titles[1] is None:
+                group_start = match.end(kind)
+                period = text.find('.', group_start + 1, line_end)
+                if period != -1:
+                    titles[1] = text[group_start:period].strip()
+            elif kind == 'podcast' and titles[4] is None and pos > line_start:
+                titles[4] = text[line_start:pos].strip()
+
+        offset = _NAME_ANCHOR_OFFSETS.get(kind)
+        if offset is not None:
+            pattern_kind = 'welcome' if kind == 'welcome_to' else kind
+            # Like re.findall, matches of one pattern never overlap
+            if pos < name_ends.get(pattern_kind, 0):
+                continue
+            found = _NAME_RE.match(text, pos + offset)
+            if found:
+                name_ends[pattern_kind] = found.end()
+                name = found.group()
+                if len(name.split()) == 2:  # First and last name
+                    names.setdefault(name, None)
+
+    episode_title = next((title for title in titles if title is not None), "")
+
+    # Try to distinguish hosts from guests based on context
+    # This is a simplified approach - in practice, you'd need more sophisticated logic
+    names_list = list(names)
+    if len(names_list) >= 2:
+        hosts = names_list[:2]  # Assume first 2 are hosts
+        guests = names_list[2:]  # Rest are guests
+    else:
+        hosts = names_list
+        guests = []
+
+    # Extract work experience (look for title and company patterns)
+    work_experience = []
+    at_starts = [found.start() for found in _AT_COMPANY_RE.finditer(text)] if role_starts else []
+
+    def role_ahead(start, end):
+        i = bisect_left(role_starts, start)
+        return i < len(role_starts) and role_starts[i] < end
+
+    def role_on_this_or_next_line(start, line_end):
+        # A two-word company can run onto the next non-blank line
+        if role_ahead(start, line_end):
+            return True
+        next_text = _NON_SPACE_RE.search(text, line_end)
+        return bool(next_text) and role_ahead(*_line_bounds(text, next_text.start()))
+
+    def role_and_at_ahead(start, line_end):
+        i = bisect_left(at_starts, start)
+        return role_ahead(start, line_end) and i < len(at_starts) and at_starts[i] < line_end
+
+    pattern_matches = []
+    last_words = {}
+    if role_starts:
+        pattern_matches = [
+            _find_work_experience(
+                text, lambda e: _company_and_role(text, e, role_starts, role_ends, last_words), role_on_this_or_next_line
+            ),
+            _find_work_experience(
+                text, lambda e: _role_and_company(text, e, role_starts, role_ends, at_starts), role_and_at_ahead
+            ),
+        ]
+
+    for matches in pattern_matches:
+        for found in matches:
+            name = found[0]
+            title = found[1] if 'CEO' in found[1] or 'VP' in found[1] else found[2]
+            company = found[2] if 'CEO' in found[1] or 'VP' in found[1] else found[1]
+
+            work_experience.append({
+                'name': name,
+                'title': title,
+                'company': company
+            })
+
+    return {
+        'episode_title': episode_title,
+        'hosts': hosts,
+        'guests': guests,
+        'work_experience': work_experience
+    }
@@ -0,0 +1,228 @@
+"""
+Notable quote mining from transcripts, without API calls.
+
+A transcript is split into speaker lines and each line into sentences in
+one pass. Speaker labels are recognised with or without timestamps
+("Jane Doe: text", "[00:01:02] Jane Doe: text", "**Jane Doe**: text"); a
+line without a label continues the previous speaker. Every sentence of a
+usable length is scored with cheap features:
+
+    length      8-45 words, best between 12 and 30
+    quotation   the speaker quotes something ("...", “...”)
+    markers     rhetorical phrases ("the key is", "I always say", "never")
+    rarity      mean IDF of its words across the sentences of the same
+                transcript, so sentences made of the episode's recurring
+                small talk lose to ones that say something specific
+    fillers     "um", "uh", "you know" count against it
+    speaker     guests score a little higher than hosts, whose turns are
+                mostly questions and introductions
+
+Rarity only depends on the transcript itself, so an episode's quotes are
+the same whatever else is (or was) in the corpus, and re-running the miner
+over an unchanged episode never changes its quotes. Sentences are scored in
+a second pass, once the transcript's term frequencies are known; the best
+QUOTES_PER_EPISODE are kept in a bounded min-heap, and rarity is skipped for
+sentences that cannot beat the heap's minimum. Each quote is attributed to
+the speaker of its turn, expanded to the full host or guest name when the
+label is a first or last name.
+
+    python quote_miner.py 20250204-MBS-0506-V1
+"""
+
+import argparse
+import heapq
+import math
+import re
+from episode_store import STORE_PATH, iter_episodes
+from person_index import normalize_name
+from search_index import tokenize
+from segment_index import format_timestamp
+
+QUOTES_PER_EPISODE = 3
+MIN_WORDS = 8
+MAX_WORDS = 45
+
+# Feature weights; rarity is scaled to [0, 1] before weighting
+LENGTH_WEIGHT = 1.0
+QUOTATION_WEIGHT = 1.0
+MARKER_WEIGHT = 0.6
+RARITY_WEIGHT = 2.0
+FILLER_PENALTY = 0.4
+QUESTION_PENALTY = 0.5
+GUEST_BONUS = 0.3
+
+# Optional timestamp, a label of up to five capitalized words (or **bold**), a
+# colon, optional timestamp
+_LINE_RE = re.compile(
+    r"[\s\u200b]*(?:\[(\d{1,2}):(\d{2}):(\d{2})\][\s\u200b]*)?"
+    r"(?:\*\*([^*\n]{1,60})\*\*|([A-Z][\w.'’-]*(?: [A-Z][\w.'’-]*){0,4}))?"
+    r"(?:\s*\([^)\n]{0,40}\))?\s*(:)?\s*(?:\[(\d{1,2}):(\d{2}):(\d{2})\]\s*)?"
+)
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+[\"”’')]*|$)")
+_TIMESTAMP_RE = re.compile(r"\[\d{1,2}:\d{2}(?::\d{2})?\]")
+_QUOTATION_RE = re.compile(r"[\"“”]")
+# Rhetorical markers and fillers in one pattern, so a sentence is scanned
+# once; it is matched against lowercased text (faster than IGNORECASE)
+_PHRASE_RE = re.compile(
+    r"\b(?:(?P<filler>um+|uh+|you know|i mean|kind of|sort of)|"
+    r"the (?:key|secret|truth|lesson|problem|point|goal) (?:is|was)|i always (?:say|tell)|"
+    r"what i (?:learned|tell)|the (?:best|biggest|hardest|most important)|never|always|"
+    r"you (?:have|need) to|you can(?:no|')t|it'?s not about|is all about|the difference between|"
+    r"if you want|remember)\b"
+)
+
+def iter_lines(transcript):
+    """Yield (seconds, speaker label, text) for each non-empty line, in one pass
+
+    The label is '' until the first labelled line; seconds is the last
+    timestamp seen at or before the start of the line's text.
+    """
+    speaker = ''
+    seconds = 0
+    for line in transcript.split('\n'):
+        m = _LINE_RE.match(line)
+        label = m.group(4) or m.group(5)
+        if m.group(6) and label:
+            speaker = label.strip()
+            start = m.end()
+        else:
+            # No speaker label; keep any leading timestamp and read the rest as text
+            start = line.index(']', m.end(3)) + 1 if m.group(1) else 0
+        for first in (1, 7):
+            if m.group(first) and (first == 1 or m.group(6)):
+                seconds = max(seconds, int(m.group(first)) * 3600 + int(m.group(first + 1)) * 60 + int(m.group(first + 2)))
+        text = line[start:]
+        if text.strip(' \t\u200b'):
+            yield seconds, speaker, text
+        for mark in _TIMESTAMP_RE.finditer(text):
+            parts = [int(part) for part in mark.group().strip('[]').split(':')]
+            if len(parts) == 2:
+                parts.insert(0, 0)
+            seconds = max(seconds, parts[0] * 3600 + parts[1] * 60 + parts[2])
+
+def _length_score(words):
+    if 12 <= words <= 30:
+        return 1.0
+    return 0.5 if words < 12 else 1.0 - (words - 30) / (MAX_WORDS - 30 + 1)
+
+def resolve_speaker(label, hosts=(), guests=()):
+    """The full host or guest name a speaker label refers to (the label itself if none or several match)"""
+    normal = normalize_name(label)
+    if not normal:
+        return label
+    matches = []
+    for name in list(hosts or ()) + list(guests or ()):
+        tokens = normalize_name(name).split()
+        if tokens and (normal == ' '.join(tokens) or normal in (tokens[0], tokens[-1])):
+            matches.append(name)
+    matches = list(dict.fromkeys(matches))
+    return matches[0] if len(matches) == 1 else label
+
+class QuoteMiner:
+    """Score transcript sentences and keep the best few per episode"""
+
+    def __init__(self, limit=QUOTES_PER_EPISODE):
+        self.limit = limit
+
+    def _cheap_score(self, sentence, lower, words, is_guest):
+        """Score of everything but rarity for a sentence (and its lowercase form) of words words"""
+        score = LENGTH_WEIGHT * _length_score(words)
+        if _QUOTATION_RE.search(sentence):
+            score += QUOTATION_WEIGHT
+        markers = 0
+        for match in _PHRASE_RE.finditer(lower):
+            if match.lastgroup == 'filler':
+                score -= FILLER_PENALTY
+            else:
+                markers += 1
+        score += MARKER_WEIGHT * min(2, markers)
+        if sentence.endswith('?'):
+            score -= QUESTION_PENALTY
+        if is_guest:
+            score += GUEST_BONUS
+        return score
+
+    def _candidates(self, episode):
+        """Yield (start, speaker, is_guest, sentence, word count) for each sentence of a usable length"""
+        hosts = episode.get('hosts') or []
+        guests = episode.get('guests') or []
+        guest_names = {normalize_name(name) for name in guests}
+        speakers = {}
+        for start, label, text in iter_lines(episode.get('transcript') or ''):
+            resolved = speakers.get(label)
+            if resolved is None:
+                speaker = resolve_speaker(label, hosts, guests) or 'Unknown'
+                resolved = speakers[label] = (speaker, normalize_name(speaker) in guest_names)
+            speaker, is_guest = resolved
+            if '[' in text:
+                text = _TIMESTAMP_RE.sub(' ', text)
+            for match in _SENTENCE_RE.finditer(text):
+                words = match.group().split()
+                if MIN_WORDS <= len(words) <= MAX_WORDS:
+                    yield start, speaker, is_guest, ' '.join(words).strip('"“”\'’ '), len(words)
+
+    def mine(self, episode):
+        """Return the best quotes of an episode as [{'quote', 'speaker', 'timestamp'}], best first"""
+        # First pass: cheap scores, and in how many sentences each term occurs
+        candidates = []
+        sentence_freqs = {}
+        seen = set()
+        for start, speaker, is_guest, sentence, words in self._candidates(episode):
+            lower = sentence.lower()
+            if lower in seen:
+                continue
+            seen.add(lower)
+            tokens = tokenize(lower)
+            for token in set(tokens):
+                sentence_freqs[token] = sentence_freqs.get(token, 0) + 1
+            candidates.append((self._cheap_score(sentence, lower, words, is_guest), start, speaker, sentence, tokens))
+
+        # Rarity is the mean IDF over the transcript's sentences, scaled by
+        # the IDF of a term seen in no sentence
+        count = len(candidates)
+        max_idf = math.log(count + 1) + 1
+        idf = {}
+        heap = []
+        for order, (score, start, speaker, sentence, tokens) in enumerate(candidates):
+            # Rarity can add at most RARITY_WEIGHT; skip it when even that
+            # cannot get the sentence into a full heap
+            if len(heap) == self.limit and score + RARITY_WEIGHT <= heap[0][0]:
+                continue
+            if tokens:
+                total = 0.0
+                for token in tokens:
+                    value = idf.get(token)
+                    if value is None:
+                        value = idf[token] = math.log((count + 1) / (sentence_freqs[token] + 1)) + 1
+                    total += value
+                score += RARITY_WEIGHT * total / len(tokens) / max_idf
+            # Earlier sentences win ties: a larger -order pops later.
+            # Orders are unique, so the rest of the item is never compared
+            item = (score, -order, start, speaker, sentence)
+            if len(heap) < self.limit:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        return [
+            {'quote': sentence, 'speaker': speaker, 'timestamp': format_timestamp(start)}
+            for _, _, start, speaker, sentence in sorted(heap, reverse=True)
+        ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the notable quotes mined from episodes in the store")
+    parser.add_argument("episode_id", nargs="*", help="episode ids (default: every episode)")
+    parser.add_argument("--limit", type=int, default=QUOTES_PER_EPISODE,
+                        help=f"quotes per episode (default: {QUOTES_PER_EPISODE})")
+    args = parser.parse_args()
+
+    miner = QuoteMiner(limit=args.limit)
+    wanted = set(args.episode_id)
+    for episode in iter_episodes(STORE_PATH):
+        if wanted and episode.get('id') not in wanted:
+            continue
+        print(f"\n{episode.get('id')}:")
+        for quote in miner.mine(episode):
+            print(f"  [{quote['timestamp']}] {quote['speaker']}: {quote['quote']}")
+
+if __name__ == "__main__":
+    main()
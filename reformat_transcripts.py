@@ -1,36 +1,236 @@
+"""
+Reformat transcripts to put the speaker name before the timestamp.
+
+    [00:00:23] Marcie: Welcome to...   ->   Marcie: [00:00:23] Welcome to...
+
+reformat_lines() does this in one pass over an iterable of lines, holding
+only the current line (plus any blank lines a match is still spanning), so
+multi-hour transcripts are processed in constant memory and linear time.
+Its output is identical to formatTranscript() in app/api/extract/route.ts:
+the timestamp/speaker swap, then paragraphs ("\\n\\n"-separated) that start
+with a bare timestamp get the previous paragraph's speaker. The JavaScript
+regex semantics are followed exactly, including `\\s*` running across
+newlines and JavaScript's definition of whitespace.
+
+Usage: python reformat_transcripts.py [input.txt output.txt]
+"""
+
 import re
+import sys
 
-def reformat_transcript(transcript):
+# JavaScript's \s (and String.prototype.trim) whitespace set, which differs
+# from Python's
+_JS_SPACE_CHARS = (
+    "\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006"
+    "\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+)
+_JS_SPACE = "[" + re.escape(_JS_SPACE_CHARS) + "]"
+
+# formatTranscript step 1: /\[(\d{2}:\d{2}:\d{2})\]\s*([^:\n]+):\s*/g -> '$2: [$1] '
+_TIMESTAMP_RE = re.compile(r"\[([0-9]{2}:[0-9]{2}:[0-9]{2})\]")
+_SWAP_RE = re.compile(r"\[([0-9]{2}:[0-9]{2}:[0-9]{2})\]" + _JS_SPACE + r"*([^:\n]+):" + _JS_SPACE + "*")
+_ALL_SPACE_RE = re.compile(_JS_SPACE + "*")
+
+# formatTranscript step 2: /^\[(\d{2}:\d{2}:\d{2})\]/ and /^([^:\[]+):/
+_LEADING_TIMESTAMP_RE = re.compile(r"\[[0-9]{2}:[0-9]{2}:[0-9]{2}\]")
+_TIMESTAMP_LENGTH = len("[00:00:00]")
+_SPEAKER_END_RE = re.compile(r"[:\[]")
+
+def reformat_transcript_regex(transcript):
     """
     Reformat transcript to have speaker name before timestamp.
-    
+
     Input format:
     [00:00:23] Marcie: Welcome to...
-    
+
     Output format:
     Marcie: [00:00:23] Welcome to...
+
+    This is the original whole-string regex version, kept for comparison
+    in benchmarks/bench_reformat_transcripts.py. Its lazy DOTALL body
+    rescans the rest of the transcript for every match.
     """
-    
+
     # Pattern: [timestamp] Speaker: text
     pattern = r'\[(\d{2}:\d{2}:\d{2})\]\s*([^:]+):\s*(.+?)(?=\n\[|\Z)'
-    
+
     def replace_func(match):
         timestamp = match.group(1)
         speaker = match.group(2).strip()
         text = match.group(3).strip()
         return f"{speaker}: [{timestamp}] {text}"
-    
+
     # Apply the transformation
     reformatted = re.sub(pattern, replace_func, transcript, flags=re.DOTALL)
-    
+
     return reformatted
 
-# Test with the example
-test_input = """[00:00:23] Marcie: Welcome to CEO actions, day of understanding, real talk dialogue podcast. I'm Marci Mara Comey. This series aims to inspire inclusive behaviors and a sense of belonging through powerful and provocative dialogue. While the terms equity and equality may sound similar, the implementation of one versus the other can lead to dramatically different outcomes for marginalized people.
+def iter_lines(text):
+    """Yield the lines of text, keeping their "\\n" (only "\\n" ends a line)"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            if start < len(text):
+                yield text[start:]
+            return
+        yield text[start:end + 1]
+        start = end + 1
+
+def _swap_timestamps(lines):
+    """Step 1: rewrite "[ts] Speaker: " as "Speaker: [ts] ", yielding output chunks
+
+    A match can only run past the end of a line through whitespace (after
+    the timestamp or after the colon), so the next line is read into the
+    buffer only while the text after a timestamp, or after a match, is all
+    whitespace.
+    """
+    lines = iter(lines)
+    buffer = ''
+    pos = 0
+    exhausted = False
+    out = []
+    while True:
+        if pos >= len(buffer):
+            if out:
+                yield ''.join(out)
+                out = []
+            if exhausted:
+                return
+            line = next(lines, None)
+            buffer = line or ''
+            pos = 0
+            exhausted = line is None
+            continue
+        candidate = _TIMESTAMP_RE.search(buffer, pos)
+        if candidate is None:
+            out.append(buffer[pos:])
+            pos = len(buffer)
+            continue
+        start = candidate.start()
+        if start > pos:
+            out.append(buffer[pos:start])
+        if exhausted or not _ALL_SPACE_RE.fullmatch(buffer, candidate.end()):
+            match = _SWAP_RE.match(buffer, start)
+            if not match or match.end() < len(buffer) or exhausted:
+                if match:
+                    out.append(f"{match.group(2)}: [{match.group(1)}] ")
+                    pos = match.end()
+                else:
+                    out.append('[')
+                    pos = start + 1
+                continue
+        # The match could continue on the next line
+        line = next(lines, None)
+        exhausted = line is None
+        buffer = buffer[start:] + (line or '')
+        pos = 0
+
+def _fill_speakers(chunks):
+    """Step 2: prefix paragraphs that start with a bare timestamp with the last speaker
+
+    Paragraphs are the pieces of text.split('\\n\\n'). Text streams straight
+    through; only the first few characters of a paragraph are held back, and
+    the characters up to its first ':' or '[' are kept while looking for a
+    "Speaker:" prefix.
+    """
+    last_speaker = None
+    head = ''            # start of the current paragraph, until the prefix is decided
+    decided = False
+    name_parts = None    # text of a possible "Speaker:" prefix, while still looking for its end
+
+    def scan(text):
+        nonlocal name_parts, last_speaker
+        end = _SPEAKER_END_RE.search(text)
+        if end is None:
+            name_parts.append(text)
+            return
+        if text[end.start()] == ':':
+            name_parts.append(text[:end.start()])
+            name = ''.join(name_parts)
+            if name:
+                last_speaker = name.strip(_JS_SPACE_CHARS)
+        name_parts = None
+
+    def feed(text, final=False):
+        """Pass paragraph text through, returning what can be emitted now"""
+        nonlocal head, decided, name_parts
+        if decided:
+            if name_parts is not None:
+                scan(text)
+            return text
+        head += text
+        if len(head) < _TIMESTAMP_LENGTH and not final:
+            return ''
+        decided = True
+        out, head = head, ''
+        # An empty speaker name is falsy in JavaScript too
+        if last_speaker and _LEADING_TIMESTAMP_RE.match(out):
+            return f"{last_speaker}: {out}"
+        name_parts = []
+        scan(out)
+        return out
+
+    def end_paragraph(text):
+        nonlocal decided, name_parts
+        out = feed(text, final=True)
+        decided = False
+        name_parts = None
+        return out
+
+    carry = ''           # a trailing "\n" that may pair with the next chunk
+    for chunk in chunks:
+        text = carry + chunk
+        carry = ''
+        pos = 0
+        separator = text.find('\n\n')
+        while separator != -1:
+            out = end_paragraph(text[pos:separator])
+            yield out + '\n\n' if out else '\n\n'
+            pos = separator + 2
+            separator = text.find('\n\n', pos)
+        if text.endswith('\n') and pos < len(text):
+            # Might be the first half of a "\n\n" split across chunks
+            carry = '\n'
+            text = text[:-1]
+        out = feed(text[pos:]) if pos < len(text) else ''
+        if out:
+            yield out
+    out = end_paragraph(carry)
+    if out:
+        yield out
+
+def reformat_lines(lines):
+    """Reformat an iterable of transcript lines, yielding output text chunks
+
+    Lines keep their line endings, as read from a file; ''.join() of the
+    chunks is the reformatted transcript.
+    """
+    return _fill_speakers(_swap_timestamps(lines))
+
+def reformat_transcript(transcript):
+    """Reformat a transcript string the same way as formatTranscript() in route.ts"""
+    return ''.join(reformat_lines(iter_lines(transcript)))
+
+def reformat_file(input_path, output_path):
+    """Reformat a transcript file line by line without loading it into memory"""
+    # newline='' keeps "\r\n" as-is, as the TypeScript version would see it
+    with open(input_path, 'r', encoding='utf-8', newline='') as source, \
+            open(output_path, 'w', encoding='utf-8', newline='') as target:
+        for chunk in reformat_lines(source):
+            target.write(chunk)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        reformat_file(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+
+    # Test with the example
+    test_input = """[00:00:23] Marcie: Welcome to CEO actions, day of understanding, real talk dialogue podcast. I'm Marci Mara Comey. This series aims to inspire inclusive behaviors and a sense of belonging through powerful and provocative dialogue. While the terms equity and equality may sound similar, the implementation of one versus the other can lead to dramatically different outcomes for marginalized people.
 
 [00:00:45] During this conversation, we will be joined by a variety of voices."""
 
-print("Input:")
-print(test_input)
-print("\nOutput:")
-print(reformat_transcript(test_input))
+    print("Input:")
+    print(test_input)
+    print("\nOutput:")
+    print(reformat_transcript(test_input))
@@ -0,0 +1,431 @@
+"""
+Related episodes from local TF-IDF + truncated SVD vectors, with an LSH index.
+
+Every episode (title, key topics and transcript) becomes a TF-IDF vector
+over the corpus vocabulary, reduced to DIMENSIONS dense dimensions by a
+randomized truncated SVD, all with NumPy and no network. The unit-length
+vectors are stored as one raw float32 matrix (data/episode_vectors.f32)
+that readers memory-map, so cosine similarity is a dot product.
+
+Offline, the RELATED_COUNT most similar episodes of every episode are
+computed exactly with blocked matrix products and written to
+public/data/related.json. At query time RelatedIndex answers "related to
+this episode" from that table, and "similar to this text or vector" with a
+random-hyperplane LSH index (LSH_TABLES tables of LSH_BITS sign bits): only
+episodes sharing a bucket with the query are scored. The LSH tables are
+rebuilt from the mapped vectors on load, which takes milliseconds.
+
+New episodes are folded into the existing SVD basis: their vector is
+appended to the matrix, their neighbours come from the LSH index, and they
+are inserted into the related lists of the episodes they beat. Only when
+episodes change or disappear, or more than REFIT_FRACTION of the corpus is
+new, is the vocabulary and basis refitted from scratch.
+
+    python related_episodes.py --build
+    python related_episodes.py 20250204-MBS-0506-V1
+    python related_episodes.py --query "supply chain leadership"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from collections import Counter
+import numpy as np
+from episode_store import STORE_PATH, iter_episodes
+from search_index import tokenize
+
+RELATED_PATH = "public/data/related.json"
+MODEL_PATH = "data/related_model.npz"
+META_PATH = "data/related_meta.json"
+VECTORS_PATH = "data/episode_vectors.f32"
+
+DIMENSIONS = 128
+MAX_TERMS = 20000
+RELATED_COUNT = 10
+LSH_TABLES = 8
+LSH_BITS = 10
+# Refit the vocabulary and SVD basis when more than this fraction of the corpus is new
+REFIT_FRACTION = 0.25
+SEED = 0
+
+# Rows per block in the blocked matrix products
+_BLOCK_ROWS = 512
+# Below this many matrix cells the SVD is computed exactly
+_EXACT_SVD_CELLS = 4_000_000
+
+def _episode_text(episode):
+    return '\n'.join([episode.get('episodeTitle') or '', ' '.join(episode.get('keyTopics') or []), episode.get('transcript') or ''])
+
+def _text_digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+def _write_atomic(path, write):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def _tf_weights(counts):
+    return 1 + np.log(counts)
+
+class _SparseRows:
+    """Rows of a sparse matrix in coordinate form (rows ascending), densified a block at a time"""
+
+    def __init__(self, rows, columns, values, shape):
+        self.rows = rows
+        self.columns = columns
+        self.values = values
+        self.shape = shape
+
+    def blocks(self):
+        for start in range(0, self.shape[0], _BLOCK_ROWS):
+            stop = min(start + _BLOCK_ROWS, self.shape[0])
+            lo, hi = np.searchsorted(self.rows, [start, stop])
+            block = np.zeros((stop - start, self.shape[1]), dtype=np.float32)
+            block[self.rows[lo:hi] - start, self.columns[lo:hi]] = self.values[lo:hi]
+            yield start, stop, block
+
+    def dot(self, matrix):
+        """self @ matrix"""
+        result = np.empty((self.shape[0], matrix.shape[1]), dtype=np.float32)
+        for start, stop, block in self.blocks():
+            result[start:stop] = block @ matrix
+        return result
+
+    def tdot(self, matrix):
+        """self.T @ matrix"""
+        result = np.zeros((self.shape[1], matrix.shape[1]), dtype=np.float32)
+        for start, stop, block in self.blocks():
+            result += block.T @ matrix[start:stop]
+        return result
+
+def _truncated_svd(matrix, dimensions):
+    """The top right singular vectors of a _SparseRows matrix, as a (dimensions x terms) array"""
+    rows, terms = matrix.shape
+    if rows * terms <= _EXACT_SVD_CELLS:
+        dense = matrix.dot(np.eye(terms, dtype=np.float32))
+        return np.linalg.svd(dense, full_matrices=False)[2][:dimensions]
+    # Randomized range finder with two power iterations (Halko et al.)
+    rng = np.random.default_rng(SEED)
+    sketch = matrix.dot(rng.standard_normal((terms, dimensions + 10)).astype(np.float32))
+    for _ in range(2):
+        basis = np.linalg.qr(sketch)[0]
+        basis = np.linalg.qr(matrix.tdot(basis))[0]
+        sketch = matrix.dot(basis)
+    basis = np.linalg.qr(sketch)[0]
+    return np.linalg.svd(matrix.tdot(basis).T, full_matrices=False)[2][:dimensions]
+
+class _Model:
+    """Vocabulary, IDF weights, SVD basis and LSH hyperplanes"""
+
+    def __init__(self, terms, idf, components, planes):
+        self.terms = list(terms)
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        self.idf = idf
+        self.components = components
+        self.planes = planes
+
+    @property
+    def dimensions(self):
+        return self.components.shape[0]
+
+    def tfidf(self, counts):
+        """(columns, values) of the unit-length TF-IDF vector of a term Counter"""
+        columns = [self.term_index[term] for term in counts if term in self.term_index]
+        if not columns:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        columns = np.array(columns, dtype=np.int64)
+        frequencies = np.array([counts[self.terms[column]] for column in columns], dtype=np.float32)
+        values = _tf_weights(frequencies) * self.idf[columns]
+        return columns, values / np.linalg.norm(values)
+
+    def vector(self, counts):
+        """Unit-length dense vector of a term Counter (all zeros if it shares no terms)"""
+        columns, values = self.tfidf(counts)
+        return _normalize(self.components[:, columns] @ values).astype(np.float32)
+
+    def signatures(self, vectors):
+        """LSH bucket keys of vectors, one column per table"""
+        bits = (np.atleast_2d(vectors) @ self.planes.T > 0).reshape(-1, LSH_TABLES, LSH_BITS)
+        return bits.astype(np.int64) @ (1 << np.arange(LSH_BITS, dtype=np.int64))
+
+    def save(self, path):
+        _write_atomic(path, lambda f: np.savez(
+            f, terms=np.array(self.terms, dtype=str), idf=self.idf, components=self.components, planes=self.planes))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['terms'].tolist(), data['idf'], data['components'], data['planes'])
+
+def fit_model(episode_terms, term_names, dimensions=DIMENSIONS):
+    """Fit a _Model to a corpus; returns (model, episode vectors)
+
+    episode_terms holds one (term ids, counts) pair of arrays per episode,
+    with ids indexing term_names.
+    """
+    count = len(episode_terms)
+    all_ids = np.concatenate([ids for ids, _ in episode_terms]) if episode_terms else np.zeros(0, dtype=np.int64)
+    document_frequency = np.bincount(all_ids, minlength=len(term_names))
+    del all_ids
+    # Terms of a single episode cannot relate two episodes; terms in most episodes do not discriminate
+    usable = (document_frequency >= 2) & ((document_frequency <= count // 2) if count >= 10 else True)
+    candidates = np.flatnonzero(usable)
+    if len(candidates) > MAX_TERMS:
+        candidates = candidates[np.argsort(-document_frequency[candidates], kind='stable')[:MAX_TERMS]]
+    chosen = sorted(candidates.tolist(), key=lambda term: term_names[term])
+    terms = [term_names[term] for term in chosen]
+    remap = np.full(len(term_names), -1, dtype=np.int64)
+    remap[chosen] = np.arange(len(chosen))
+    idf = (np.log((1 + count) / (1 + document_frequency[chosen])) + 1).astype(np.float32)
+
+    rows, columns, values = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.float32)]
+    for row, (ids, counts) in enumerate(episode_terms):
+        row_columns = remap[ids]
+        kept = row_columns >= 0
+        row_columns = row_columns[kept]
+        row_values = _tf_weights(counts[kept]) * idf[row_columns]
+        norm = np.linalg.norm(row_values)
+        rows.append(np.full(len(row_columns), row, dtype=np.int64))
+        columns.append(row_columns)
+        values.append(row_values / norm if norm else row_values)
+    matrix = _SparseRows(np.concatenate(rows), np.concatenate(columns), np.concatenate(values), (count, len(terms)))
+
+    components = np.zeros((0, len(terms)), dtype=np.float32)
+    if count and terms:
+        components = _truncated_svd(matrix, min(dimensions, count, len(terms))).astype(np.float32)
+    rng = np.random.default_rng(SEED)
+    planes = rng.standard_normal((LSH_TABLES * LSH_BITS, len(components))).astype(np.float32)
+    vectors = _normalize(matrix.dot(components.T)).astype(np.float32)
+    return _Model(terms, idf, components, planes), vectors
+
+def _top_related(vectors, limit):
+    """[(rows, scores)] of the most similar other rows of each row, computed exactly in blocks"""
+    count = len(vectors)
+    limit = min(limit, count - 1)
+    result = []
+    for start in range(0, count, _BLOCK_ROWS):
+        block = vectors[start:start + _BLOCK_ROWS] @ vectors.T
+        block[np.arange(len(block)), np.arange(start, start + len(block))] = -np.inf
+        if limit <= 0:
+            result.extend(([], []) for _ in block)
+            continue
+        top = np.argpartition(-block, limit - 1, axis=1)[:, :limit]
+        for row, candidates in zip(block, top):
+            ordered = candidates[np.argsort(-row[candidates], kind='stable')]
+            result.append((ordered, row[ordered]))
+    return result
+
+def _related_entries(ids, rows, scores):
+    entries = [{'id': ids[row], 'score': round(float(score), 4)} for row, score in zip(rows, scores)]
+    return [entry for entry in entries if entry['score'] > 0]
+
+def build_related_index(episodes, related_path=RELATED_PATH, model_path=MODEL_PATH, meta_path=META_PATH,
+                        vectors_path=VECTORS_PATH):
+    """Fit the model to episodes and write the vectors and related table; returns the episode count"""
+    ids, digests = [], []
+    # Term counts are kept as compact arrays over a provisional vocabulary
+    term_ids = {}
+    episode_terms = []
+    for episode in episodes:
+        text = _episode_text(episode)
+        ids.append(str(episode.get('id', '')))
+        digests.append(_text_digest(text))
+        counts = Counter(tokenize(text))
+        episode_terms.append((
+            np.fromiter((term_ids.setdefault(term, len(term_ids)) for term in counts), dtype=np.int64, count=len(counts)),
+            np.fromiter(counts.values(), dtype=np.float32, count=len(counts)),
+        ))
+    model, vectors = fit_model(episode_terms, list(term_ids))
+    del episode_terms
+    related = {
+        episode_id: _related_entries(ids, rows, scores)
+        for episode_id, (rows, scores) in zip(ids, _top_related(vectors, RELATED_COUNT))
+    }
+    model.save(model_path)
+    _write_atomic(vectors_path, lambda f: f.write(np.ascontiguousarray(vectors).tobytes()))
+    _save_tables(ids, digests, model.dimensions, related, related_path, meta_path)
+    return len(ids)
+
+def _save_tables(ids, digests, dimensions, related, related_path, meta_path):
+    _write_atomic(related_path, lambda f: f.write(json.dumps(related, ensure_ascii=False).encode('utf-8')))
+    # The meta file goes last: it records how many rows of the vector file are valid
+    meta = {'ids': ids, 'digests': digests, 'dimensions': dimensions}
+    _write_atomic(meta_path, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+
+class IncompleteIndexError(Exception):
+    """The vector file does not hold a vector for every indexed episode"""
+
+class RelatedIndex:
+    """Related-episode lookups over the files written by build_related_index()"""
+
+    def __init__(self, related_path=RELATED_PATH, model_path=MODEL_PATH, meta_path=META_PATH,
+                 vectors_path=VECTORS_PATH):
+        self.paths = (related_path, model_path, meta_path, vectors_path)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(related_path, 'r', encoding='utf-8') as f:
+            self.related_table = json.load(f)
+        self.model = _Model.load(model_path)
+        self.ids = meta['ids']
+        self.digests = meta['digests']
+        self.row_of = {episode_id: row for row, episode_id in enumerate(self.ids)}
+        self._map_vectors()
+        self._tables = [{} for _ in range(LSH_TABLES)]
+        for row, keys in enumerate(self.model.signatures(self.vectors).tolist() if len(self.ids) else []):
+            for table, key in zip(self._tables, keys):
+                table.setdefault(key, []).append(row)
+
+    def _map_vectors(self):
+        shape = (len(self.ids), self.model.dimensions)
+        size = os.path.getsize(self.paths[3])
+        if size < shape[0] * shape[1] * np.dtype(np.float32).itemsize:
+            raise IncompleteIndexError(f"{self.paths[3]} holds fewer vectors than the {shape[0]} indexed episodes")
+        if shape[0] and shape[1]:
+            self.vectors = np.memmap(self.paths[3], dtype=np.float32, mode='r', shape=shape)
+        else:
+            self.vectors = np.zeros(shape, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def related(self, episode_id, limit=RELATED_COUNT):
+        """The precomputed most related episodes of an episode as [{'id', 'score'}]"""
+        return self.related_table.get(episode_id, [])[:limit]
+
+    def candidates(self, vector):
+        """Rows sharing an LSH bucket with vector"""
+        found = set()
+        for table, key in zip(self._tables, self.model.signatures(vector)[0].tolist()):
+            found.update(table.get(key, ()))
+        return found
+
+    def nearest(self, vector, limit=RELATED_COUNT, exclude=None):
+        """[(row, score)] of the rows most similar to vector, scored among its LSH candidates
+
+        Falls back to scoring every row when the buckets hold too few candidates.
+        """
+        rows = self.candidates(vector)
+        rows.discard(exclude)
+        if len(rows) < limit:
+            rows = set(range(len(self.ids))) - {exclude}
+        if not rows:
+            return []
+        rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        rows.sort()
+        scores = self.vectors[rows] @ vector
+        order = np.argsort(-scores, kind='stable')[:limit]
+        return [(int(rows[i]), float(scores[i])) for i in order if scores[i] > 0]
+
+    def search(self, text, limit=RELATED_COUNT):
+        """Episodes most similar to a piece of text as [{'id', 'score'}]"""
+        matches = self.nearest(self.model.vector(Counter(tokenize(text))), limit)
+        return _related_entries(self.ids, *zip(*matches)) if matches else []
+
+    def add(self, episode, save=True):
+        """Fold a new episode into the index without refitting; returns its related episodes"""
+        text = _episode_text(episode)
+        episode_id = str(episode.get('id', ''))
+        if episode_id in self.row_of:
+            raise ValueError(f"episode {episode_id} is already indexed; rebuild to update it")
+        vector = self.model.vector(Counter(tokenize(text)))
+        matches = self.nearest(vector, RELATED_COUNT)
+
+        row = len(self.ids)
+        with open(self.paths[3], 'ab') as f:
+            # Rows past the saved ids were left by a run that stopped before
+            # saving; drop them so the new row lines up with its id
+            f.truncate(row * self.model.dimensions * np.dtype(np.float32).itemsize)
+            f.write(vector.tobytes())
+        self.ids.append(episode_id)
+        self.digests.append(_text_digest(text))
+        self.row_of[episode_id] = row
+        self._map_vectors()
+        for table, key in zip(self._tables, self.model.signatures(vector)[0].tolist()):
+            table.setdefault(key, []).append(row)
+
+        entries = self.related_table[episode_id] = _related_entries(self.ids, *zip(*matches)) if matches else []
+        # The new episode joins the lists of the neighbours it is closer to than their last entry
+        for other, score in matches:
+            other_list = self.related_table.setdefault(self.ids[other], [])
+            if len(other_list) < RELATED_COUNT or score > other_list[-1]['score']:
+                other_list.append({'id': episode_id, 'score': round(score, 4)})
+                other_list.sort(key=lambda entry: -entry['score'])
+                del other_list[RELATED_COUNT:]
+        if save:
+            self.save()
+        return entries
+
+    def save(self):
+        related_path, _, meta_path, _ = self.paths
+        _save_tables(self.ids, self.digests, self.model.dimensions, self.related_table, related_path, meta_path)
+
+def build_related_from_store(store_path=STORE_PATH, related_path=RELATED_PATH, model_path=MODEL_PATH,
+                             meta_path=META_PATH, vectors_path=VECTORS_PATH):
+    """Bring the related-episode index up to date with the episode store
+
+    New episodes are added incrementally; the index is refitted when
+    episodes changed or were removed, or too many are new.
+    """
+    paths = (related_path, model_path, meta_path, vectors_path)
+    index = None
+    if all(os.path.exists(path) for path in paths):
+        try:
+            index = RelatedIndex(*paths)
+        except IncompleteIndexError as e:
+            print(f"Related episodes: {e}; refitting")
+    new_episodes = []
+    seen = set()
+    refit = index is None
+    if index is not None:
+        for episode in iter_episodes(store_path):
+            episode_id = str(episode.get('id', ''))
+            seen.add(episode_id)
+            row = index.row_of.get(episode_id)
+            if row is None:
+                new_episodes.append(episode)
+            elif index.digests[row] != _text_digest(_episode_text(episode)):
+                refit = True
+                break
+        if not refit:
+            removed = len(seen) - len(new_episodes) < len(index)
+            refit = removed or len(new_episodes) > REFIT_FRACTION * len(index)
+    if refit:
+        count = build_related_index(iter_episodes(store_path), *paths)
+        print(f"Related episodes: {count} episodes indexed in {related_path}")
+        return count
+    for episode in new_episodes:
+        index.add(episode, save=False)
+    if new_episodes:
+        index.save()
+    print(f"Related episodes: {len(new_episodes)} new episode(s) added, {len(index)} indexed in {related_path}")
+    return len(index)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the related-episodes index")
+    parser.add_argument("episode_id", nargs="?", help="print the episodes related to this one")
+    parser.add_argument("--build", action="store_true", help=f"update the index from {STORE_PATH}")
+    parser.add_argument("--query", help="print the episodes most similar to this text")
+    parser.add_argument("--limit", type=int, default=RELATED_COUNT, help=f"results to print (default: {RELATED_COUNT})")
+    args = parser.parse_args()
+
+    if args.build:
+        build_related_from_store()
+    if args.episode_id or args.query:
+        index = RelatedIndex()
+        results = index.related(args.episode_id, args.limit) if args.episode_id else index.search(args.query, args.limit)
+        if not results:
+            print("No related episodes found")
+        for entry in results:
+            print(f"{entry['score']:.3f}  {entry['id']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Persistent cache of chat-completion responses.
+
+Responses are keyed by a hash of the model, the request parameters, the
+prompt template version and the input text the prompt was built from (not
+the rendered prompt, which can contain per-run values such as timestamps).
+Rerunning an extractor after a code change that leaves the prompt alone is
+then answered from local disk without any API calls. Entries expire after a
+TTL, and the least recently used entries are evicted once the stored
+responses exceed a size limit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+RESPONSE_CACHE_PATH = "data/llm_responses.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+def response_cache_key(model, params, prompt_version, inputs):
+    """Return the cache key for a request: SHA-256 over its identifying parts
+
+    `inputs` is a sequence of strings the prompt was rendered from.
+    """
+    digest = hashlib.sha256()
+    header = json.dumps([model, params, prompt_version, len(inputs)], sort_keys=True)
+    digest.update(header.encode('utf-8'))
+    for text in inputs:
+        # Length-prefix each input so different splits never collide
+        encoded = text.encode('utf-8')
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+class ResponseCache:
+    """SQLite-backed LRU cache of response texts with a TTL"""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL_SECONDS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at);
+        """)
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached response text, or None if missing or expired"""
+        row = self.conn.execute(
+            "SELECT response, size, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row and self.ttl is not None and row[2] + self.ttl < now:
+            self._delete(key, row[1])
+            row = None
+        if not row:
+            self.misses += 1
+            return None
+        self.conn.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, response):
+        size = len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+            (key, response, size, now, now)
+        )
+        self.total_bytes += size - (old[0] if old else 0)
+        self._evict()
+        self.conn.commit()
+
+    def _delete(self, key, size):
+        self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.conn.commit()
+        self.total_bytes -= size
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        if self.ttl is not None:
+            self.conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used_at")
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
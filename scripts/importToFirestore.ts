@@ -1,20 +1,35 @@
 /**
  * Script to import podcast data from JSON file to Firestore
  * 
- * This script reads the extracted_data.json file and uploads all episodes
- * to Firestore using batch writes for efficiency.
+ * This script reads the extracted_data.json file and uploads episodes to
+ * Firestore using batch writes for efficiency.
+ *
+ * When the Python pipeline has written a change manifest
+ * (public/data/changes.json, see change_manifest.py), only the deltas since
+ * the last sync are written: added episodes in full, modified episodes with
+ * just the fields of their changed field groups (so a topics-only change
+ * does not re-upload the transcript), and deleted episodes are removed.
+ * After a successful sync the manifest's fingerprints are recorded in
+ * data/firestore_sync.json as the baseline of the next manifest.
+ *
+ * Set FIRESTORE_EMULATOR_HOST (e.g. localhost:8080) to sync to the local
+ * Firestore emulator instead of the project.
  * 
- * Usage: npx tsx scripts/importToFirestore.ts
+ * Usage: npx tsx scripts/importToFirestore.ts [--full] [--dry-run]
+ *   --full     upload every episode, ignoring the manifest's added and modified
+ *              lists (episodes it lists as deleted are still removed)
+ *   --dry-run  print what would be written without touching Firestore
  */
 
 import { initializeApp } from 'firebase/app';
 import {
   getFirestore,
+  connectFirestoreEmulator,
   collection,
   writeBatch,
   doc,
-  getDocs,
-  query
+  deleteField,
+  getCountFromServer
 } from 'firebase/firestore';
 import * as fs from 'fs';
 import * as path from 'path';
@@ -34,11 +49,24 @@ const firebaseConfig = {
 const app = initializeApp(firebaseConfig);
 const db = getFirestore(app);
 
+if (process.env.FIRESTORE_EMULATOR_HOST) {
+  const [host, port] = process.env.FIRESTORE_EMULATOR_HOST.split(':');
+  connectFirestoreEmulator(db, host, Number(port) || 8080);
+}
+
 // Collection name for episodes
 const COLLECTION_NAME = 'episodes';
 
-// Firestore batch write limit is 500 operations
+// Firestore batch write limit is 500 operations and 10 MiB per request
 const BATCH_SIZE = 500;
+const BATCH_BYTES = 9 * 1024 * 1024;
+
+// Written by change_manifest.py; the sync state records what was last uploaded
+const MANIFEST_PATH = path.join(process.cwd(), 'public', 'data', 'changes.json');
+const SYNC_STATE_PATH = path.join(process.cwd(), 'data', 'firestore_sync.json');
+
+const FULL = process.argv.includes('--full');
+const DRY_RUN = process.argv.includes('--dry-run');
 
 interface Episode {
   id: string;
@@ -63,6 +91,27 @@ interface Episode {
   summary?: string;
 }
 
+interface ChangeManifest {
+  generatedAt: string;
+  since: string | null;
+  added: string[];
+  modified: Array<{
+    id: string;
+    groups: string[];
+    fields: string[];
+  }>;
+  deleted: string[];
+  // episode id -> field group -> [fingerprint, field names]
+  fingerprints: Record<string, Record<string, [string, string[]]>>;
+}
+
+interface WriteOperation {
+  id: string;
+  kind: 'set' | 'merge' | 'delete';
+  data?: Record<string, unknown>;
+  bytes: number;
+}
+
 /**
  * Load episodes from JSON file
  */
@@ -80,40 +129,148 @@ function loadEpisodesFromJSON(): Episode[] {
   return episodes;
 }
 
+/**
+ * Load the change manifest, or null if there is none or it is older than the JSON file
+ */
+function loadChangeManifest(): ChangeManifest | null {
+  if (!fs.existsSync(MANIFEST_PATH)) {
+    console.log('No change manifest found; uploading every episode');
+    return null;
+  }
+  const jsonPath = path.join(process.cwd(), 'public', 'data', 'extracted_data.json');
+  if (fs.statSync(MANIFEST_PATH).mtimeMs < fs.statSync(jsonPath).mtimeMs) {
+    console.log('⚠️  Change manifest is older than the JSON file; uploading every episode');
+    return null;
+  }
+  const manifest: ChangeManifest = JSON.parse(fs.readFileSync(MANIFEST_PATH, 'utf-8'));
+  console.log(`✓ Loaded change manifest (changes since ${manifest.since || 'before the first sync'})`);
+  return manifest;
+}
+
+/**
+ * Record the uploaded fingerprints as the baseline of the next change manifest
+ */
+function saveSyncState(manifest: ChangeManifest): void {
+  fs.mkdirSync(path.dirname(SYNC_STATE_PATH), { recursive: true });
+  const tmpPath = `${SYNC_STATE_PATH}.tmp`;
+  fs.writeFileSync(tmpPath, JSON.stringify({
+    syncedAt: new Date().toISOString(),
+    manifestGeneratedAt: manifest.generatedAt,
+    fingerprints: manifest.fingerprints,
+  }));
+  fs.renameSync(tmpPath, SYNC_STATE_PATH);
+}
+
 /**
  * Check if collection already has data
  */
 async function checkExistingData(): Promise<number> {
-  const episodesRef = collection(db, COLLECTION_NAME);
-  const q = query(episodesRef);
-  const snapshot = await getDocs(q);
-  return snapshot.size;
+  // A count aggregation, so no documents (and transcripts) are downloaded
+  const snapshot = await getCountFromServer(collection(db, COLLECTION_NAME));
+  return snapshot.data().count;
+}
+
+function setOperation(episode: Episode): WriteOperation {
+  const data = {
+    ...episode,
+    // Add server timestamp for tracking
+    uploadedAt: new Date().toISOString(),
+  };
+  return { id: episode.id, kind: 'set', data, bytes: JSON.stringify(data).length };
+}
+
+/**
+ * The writes that bring Firestore up to date: every episode, or only the manifest's changes
+ */
+function planWrites(episodes: Episode[], manifest: ChangeManifest | null, full: boolean): WriteOperation[] {
+  if (!manifest || full) {
+    const operations = episodes.map(setOperation);
+    // Deletions are applied in full mode too, so the manifest's
+    // fingerprints are a correct baseline once the upload succeeds
+    manifest?.deleted.forEach((id) => {
+      operations.push({ id, kind: 'delete', bytes: 0 });
+    });
+    return operations;
+  }
+  const byId = new Map(episodes.map((episode) => [episode.id, episode]));
+  const operations: WriteOperation[] = [];
+
+  manifest.added.forEach((id) => {
+    const episode = byId.get(id);
+    if (episode) {
+      operations.push(setOperation(episode));
+    }
+  });
+
+  manifest.modified.forEach(({ id, fields }) => {
+    const episode = byId.get(id) as unknown as Record<string, unknown> | undefined;
+    if (!episode) {
+      return;
+    }
+    const data: Record<string, unknown> = {
+      extractedAt: episode.extractedAt,
+      uploadedAt: new Date().toISOString(),
+    };
+    fields.forEach((field) => {
+      // Fields no longer in the episode are removed from the document
+      data[field] = field in episode ? episode[field] : deleteField();
+    });
+    const bytes = fields.reduce((total, field) => total + (JSON.stringify(episode[field]) || '').length, 0);
+    operations.push({ id, kind: 'merge', data, bytes });
+  });
+
+  manifest.deleted.forEach((id) => {
+    operations.push({ id, kind: 'delete', bytes: 0 });
+  });
+
+  return operations;
+}
+
+/**
+ * Split writes into batches within the operation and size limits
+ */
+function splitBatches(operations: WriteOperation[]): WriteOperation[][] {
+  const batches: WriteOperation[][] = [];
+  let current: WriteOperation[] = [];
+  let size = 0;
+  operations.forEach((operation) => {
+    if (current.length && (current.length >= BATCH_SIZE || size + operation.bytes > BATCH_BYTES)) {
+      batches.push(current);
+      current = [];
+      size = 0;
+    }
+    current.push(operation);
+    size += operation.bytes;
+  });
+  if (current.length) {
+    batches.push(current);
+  }
+  return batches;
 }
 
 /**
- * Upload episodes to Firestore in batches
+ * Write episodes to Firestore in batches
  */
-async function uploadEpisodes(episodes: Episode[]): Promise<void> {
-  const totalEpisodes = episodes.length;
-  const batches = Math.ceil(totalEpisodes / BATCH_SIZE);
+async function uploadEpisodes(operations: WriteOperation[]): Promise<void> {
+  const batches = splitBatches(operations);
+  const totalBytes = operations.reduce((total, operation) => total + operation.bytes, 0);
 
-  console.log(`\nUploading ${totalEpisodes} episodes in ${batches} batch(es)...`);
+  console.log(`\nWriting ${operations.length} episode(s) (~${(totalBytes / 1024).toFixed(0)} KB) in ${batches.length} batch(es)...`);
 
-  for (let i = 0; i < batches; i++) {
+  for (let i = 0; i < batches.length; i++) {
     const batch = writeBatch(db);
-    const start = i * BATCH_SIZE;
-    const end = Math.min(start + BATCH_SIZE, totalEpisodes);
-    const batchEpisodes = episodes.slice(start, end);
-
-    console.log(`\nBatch ${i + 1}/${batches}: Processing episodes ${start + 1} to ${end}`);
-
-    batchEpisodes.forEach((episode) => {
-      const docRef = doc(db, COLLECTION_NAME, episode.id);
-      batch.set(docRef, {
-        ...episode,
-        // Add server timestamp for tracking
-        uploadedAt: new Date().toISOString(),
-      });
+
+    console.log(`\nBatch ${i + 1}/${batches.length}: ${batches[i].length} episode(s)`);
+
+    batches[i].forEach((operation) => {
+      const docRef = doc(db, COLLECTION_NAME, operation.id);
+      if (operation.kind === 'delete') {
+        batch.delete(docRef);
+      } else if (operation.kind === 'merge') {
+        batch.set(docRef, operation.data!, { merge: true });
+      } else {
+        batch.set(docRef, operation.data!);
+      }
     });
 
     try {
@@ -168,11 +325,15 @@ async function main() {
   try {
     console.log('🚀 Starting Firestore import process...\n');
 
+    const manifest = loadChangeManifest();
+
     // Check if data already exists
-    const existingCount = await checkExistingData();
-    if (existingCount > 0) {
-      console.log(`⚠️  Warning: Collection '${COLLECTION_NAME}' already contains ${existingCount} documents.`);
-      console.log('This script will overwrite existing documents with the same ID.\n');
+    if ((!manifest || FULL) && !DRY_RUN) {
+      const existingCount = await checkExistingData();
+      if (existingCount > 0) {
+        console.log(`⚠️  Warning: Collection '${COLLECTION_NAME}' already contains ${existingCount} documents.`);
+        console.log('This script will overwrite existing documents with the same ID.\n');
+      }
     }
 
     // Load episodes from JSON
@@ -181,11 +342,34 @@ async function main() {
     // Display summary before upload
     displaySummary(episodes);
 
+    const operations = planWrites(episodes, manifest, FULL);
+    if (manifest && FULL) {
+      console.log(`Full upload: ${episodes.length} episode(s), ${manifest.deleted.length} deleted since the last sync`);
+    } else if (manifest) {
+      const transcripts = manifest.modified.filter((entry) => entry.groups.includes('transcript')).length;
+      console.log(`Changes: ${manifest.added.length} added, ${manifest.modified.length} modified (${transcripts} with transcript changes), ${manifest.deleted.length} deleted`);
+    }
+
+    if (DRY_RUN) {
+      operations.forEach((operation) => {
+        const fields = operation.data ? Object.keys(operation.data).join(', ') : '';
+        console.log(`  ${operation.kind} ${operation.id} ${fields}`);
+      });
+      console.log('\nDry run: nothing was written.');
+      process.exit(0);
+    }
+
     // Upload to Firestore
-    await uploadEpisodes(episodes);
+    await uploadEpisodes(operations);
+
+    // Without an up-to-date manifest there are no fingerprints to record;
+    // the next manifest then still covers everything since the last baseline
+    if (manifest) {
+      saveSyncState(manifest);
+    }
 
     console.log('\n✅ Import completed successfully!');
-    console.log(`\nAll ${episodes.length} episodes have been uploaded to Firestore.`);
+    console.log(`\n${operations.length} episode write(s) committed to Firestore.`);
     console.log(`Collection: ${COLLECTION_NAME}`);
     console.log(`Project: ${firebaseConfig.projectId}\n`);
 
@@ -0,0 +1,273 @@
+"""
+Inverted full-text index over the episode store with BM25 ranking.
+
+The index covers each episode's transcript, title, hosts, guests and key
+topics (matches in the short fields count extra) and is written to a single
+compact file: the term dictionary and per-document lengths as packed arrays,
+and per-term postings as varint-encoded doc-id deltas, term frequencies and
+the character offset of the term's first occurrence in the transcript (for
+snippets). SearchIndex loads only that file, so queries are answered without
+reading any transcripts.
+
+    python search_index.py --build
+    python search_index.py "supply chain leadership"
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import sys
+from array import array
+from collections import Counter
+from bisect import bisect_left
+from episode_store import STORE_PATH, iter_episodes
+
+INDEX_PATH = "data/search_index.bin"
+
+_MAGIC = b"BM25IDX1"
+_TOKEN_RE = re.compile(r"\w+")
+
+# Term frequency multipliers per field (BM25F-style)
+FIELD_WEIGHTS = {
+    'episodeTitle': 3,
+    'guests': 3,
+    'hosts': 2,
+    'keyTopics': 2,
+    'transcript': 1,
+}
+
+# Very common words are not indexed
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i if in is it its of on or so
+that the their there they this to was we were what with you your
+""".split())
+
+K1 = 1.2
+B = 0.75
+
+def tokenize(text):
+    """Lowercase word tokens of text, without stopwords"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+def _term_counts(text):
+    """Counter of the non-stopword tokens of text"""
+    counts = Counter(_TOKEN_RE.findall(text.lower()))
+    for stopword in STOPWORDS.intersection(counts):
+        del counts[stopword]
+    return counts
+
+def _first_offsets(text):
+    """Map each lowercase token to the character offset of its first occurrence"""
+    positions = [match.start() for match in _TOKEN_RE.finditer(text)]
+    tokens = ' '.join(_TOKEN_RE.findall(text)).lower().split(' ')
+    # Built back to front so each token keeps its earliest offset
+    return dict(zip(reversed(tokens), reversed(positions)))
+
+def _field_text(value):
+    if isinstance(value, list):
+        return ' '.join(str(item) for item in value)
+    return value or ''
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varints(data, pos, end):
+    """Decode all varints in data[pos:end]"""
+    values = []
+    value = shift = 0
+    for byte in data[pos:end]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _read_array(typecode, data, count):
+    values = array(typecode)
+    values.frombytes(data[:count * values.itemsize])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+def build_index(episodes, path=INDEX_PATH):
+    """Build the index file from an iterable of episodes and return the document count
+
+    Episodes are consumed one at a time; only the postings are kept in memory.
+    """
+    doc_ids = []
+    doc_lengths = array('I')
+    # term -> [postings bytes, last doc number, document frequency]
+    postings = {}
+
+    for doc, episode in enumerate(episodes):
+        doc_ids.append(str(episode.get('id', '')))
+        frequencies = {}
+        length = 0
+        for field, weight in FIELD_WEIGHTS.items():
+            counts = _term_counts(_field_text(episode.get(field)))
+            length += weight * sum(counts.values())
+            for term, count in counts.items():
+                frequencies[term] = frequencies.get(term, 0) + weight * count
+        doc_lengths.append(length)
+
+        # Character offset of each term's first occurrence, for snippets
+        first_offsets = _first_offsets(episode.get('transcript') or '')
+
+        for term, frequency in frequencies.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = [bytearray(), 0, 0]
+            out = entry[0]
+            for value in (doc - entry[1], frequency, first_offsets.get(term, -1) + 1):
+                if value < 0x80:
+                    out.append(value)
+                else:
+                    _write_varint(out, value)
+            entry[1] = doc
+            entry[2] += 1
+
+    terms = sorted(postings)
+    doc_freqs = array('I', (postings[term][2] for term in terms))
+    posting_offsets = array('Q', [0])
+    for term in terms:
+        posting_offsets.append(posting_offsets[-1] + len(postings[term][0]))
+
+    ids_blob = '\n'.join(doc_ids).encode('utf-8')
+    terms_blob = '\n'.join(terms).encode('utf-8')
+    header = json.dumps({
+        "doc_count": len(doc_ids),
+        "term_count": len(terms),
+        "avg_doc_length": (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0,
+        "field_weights": FIELD_WEIGHTS,
+        "ids_bytes": len(ids_blob),
+        "terms_bytes": len(terms_blob),
+    }).encode('utf-8')
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(len(header).to_bytes(4, 'little'))
+        f.write(header)
+        f.write(ids_blob)
+        f.write(_little_endian(doc_lengths))
+        f.write(terms_blob)
+        f.write(_little_endian(doc_freqs))
+        f.write(_little_endian(posting_offsets))
+        for term in terms:
+            f.write(postings[term][0])
+    os.replace(tmp_path, path)
+    return len(doc_ids)
+
+class SearchIndex:
+    """Read-only BM25 index loaded from a file written by build_index()"""
+
+    def __init__(self, path=INDEX_PATH):
+        with open(path, 'rb') as f:
+            data = memoryview(f.read())
+        if data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a search index")
+        pos = len(_MAGIC)
+        header_length = int.from_bytes(data[pos:pos + 4], 'little')
+        pos += 4
+        header = json.loads(bytes(data[pos:pos + header_length]))
+        pos += header_length
+
+        doc_count = header["doc_count"]
+        term_count = header["term_count"]
+        self.avg_doc_length = header["avg_doc_length"] or 1.0
+
+        self.doc_ids = str(data[pos:pos + header["ids_bytes"]], 'utf-8').split('\n') if doc_count else []
+        pos += header["ids_bytes"]
+        self.doc_lengths = _read_array('I', data[pos:], doc_count)
+        pos += doc_count * self.doc_lengths.itemsize
+        self.terms = str(data[pos:pos + header["terms_bytes"]], 'utf-8').split('\n') if term_count else []
+        pos += header["terms_bytes"]
+        self.doc_freqs = _read_array('I', data[pos:], term_count)
+        pos += term_count * self.doc_freqs.itemsize
+        self.posting_offsets = _read_array('Q', data[pos:], term_count + 1)
+        pos += (term_count + 1) * self.posting_offsets.itemsize
+        self._postings = data[pos:]
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def postings(self, term):
+        """Return [(doc number, weighted term frequency, first transcript offset or -1), ...]"""
+        i = bisect_left(self.terms, term)
+        if i == len(self.terms) or self.terms[i] != term:
+            return []
+        values = _read_varints(self._postings, self.posting_offsets[i], self.posting_offsets[i + 1])
+        result = []
+        doc = 0
+        for j in range(0, len(values), 3):
+            doc += values[j]
+            result.append((doc, values[j + 1], values[j + 2] - 1))
+        return result
+
+    def search(self, query, limit=10):
+        """Return the best matches for query, most relevant first
+
+        Each result is {'id', 'score', 'snippet_offset'}; snippet_offset is the
+        character offset in the transcript of the earliest query term match,
+        or -1 if the terms only matched other fields.
+        """
+        doc_count = len(self.doc_ids)
+        scores = {}
+        offsets = {}
+        for term in set(tokenize(query)):
+            postings = self.postings(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for doc, frequency, offset in postings:
+                norm = K1 * (1 - B + B * self.doc_lengths[doc] / self.avg_doc_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+                if offset >= 0 and (doc not in offsets or offset < offsets[doc]):
+                    offsets[doc] = offset
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {'id': self.doc_ids[doc], 'score': round(score, 4), 'snippet_offset': offsets.get(doc, -1)}
+            for doc, score in best
+        ]
+
+def build_index_from_store(store_path=STORE_PATH, index_path=INDEX_PATH):
+    """Rebuild the search index from the episode store"""
+    count = build_index(iter_episodes(store_path), index_path)
+    print(f"Search index: {count} episodes indexed in {index_path}")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the episode search index")
+    parser.add_argument("query", nargs="*", help="search terms")
+    parser.add_argument("--build", action="store_true", help=f"rebuild {INDEX_PATH} from {STORE_PATH}")
+    parser.add_argument("--limit", type=int, default=10, help="number of results (default: 10)")
+    args = parser.parse_args()
+
+    if args.build:
+        build_index_from_store()
+    if args.query:
+        index = SearchIndex()
+        for result in index.search(' '.join(args.query), args.limit):
+            print(f"{result['score']:8.3f}  {result['id']}  (offset {result['snippet_offset']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Timestamp/speaker segment tables for random access into transcripts.
+
+A transcript is split into speaker turns, recognising the formats found in
+the corpus:
+
+    **Jane Doe** (Guest): [00:01:02] text
+    [00:01:02] Jane Doe: text
+    Jane Doe: [00:01:02] text
+    Jane Doe: text             (no timestamp: the last time carries forward)
+    [00:01:30] text            (same speaker, new timestamp)
+
+Paragraphs without a speaker or timestamp continue the current turn. Each
+turn is stored as one row of four parallel arrays: start time in seconds,
+speaker index, and the byte offset and length of its text (after the
+speaker label) in the UTF-8 transcript. Every timestamp in the text,
+including minute markers in the middle of a turn, is also kept as a
+(seconds, byte offset) time mark. Times are carried forward and never
+decrease, so "jump to 00:34:10" is two bisects (time mark, then the turn
+containing it), and turns are grouped by speaker so "all turns by X" is a
+slice.
+
+All tables are kept in one file (data/segments.bin) with a directory of
+episode ids; SegmentStore decodes a table only when it is asked for.
+
+    python segment_index.py --build
+    python segment_index.py --check "Test Scripts"/*.docx
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_right
+from episode_store import STORE_PATH, iter_episodes
+
+SEGMENTS_PATH = "data/segments.bin"
+
+_MAGIC = b"SEGTAB01"
+
+# Leading whitespace may include zero-width spaces left by the transcription tool
+_BOLD_SPEAKER_RE = re.compile(
+    r"[\s\u200b]*\*\*([^*\n]+)\*\*(?:\s*\([^)\n]*\))?\s*:\s*(?:\[(\d{1,2}):(\d{2}):(\d{2})\]\s*)?"
+)
+_TIMESTAMP_FIRST_RE = re.compile(r"[\s\u200b]*\[(\d{1,2}):(\d{2}):(\d{2})\]\s*(?:([^:\n]{1,60}):\s*)?")
+_SPEAKER_FIRST_RE = re.compile(r"[\s\u200b]*([^:\n\[\]]{1,60}):\s*\[(\d{1,2}):(\d{2}):(\d{2})\]\s*")
+# A bare "Name:" label, as in quote_miner: one to five capitalised words
+_SPEAKER_LABEL_RE = re.compile(r"[\s\u200b]*([A-Z][\w.'’-]*(?: [A-Z][\w.'’-]*){0,4})(?:\s*\([^)\n]{0,40}\))?\s*:\s*")
+_TIMESTAMP_RE = re.compile(r"\[(\d{1,2}):(\d{2}):(\d{2})\]")
+
+def _seconds(hours, minutes, seconds):
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+def format_timestamp(seconds):
+    """Format seconds as HH:MM:SS"""
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def parse_timestamp(value):
+    """Parse "HH:MM:SS", "MM:SS" or a number of seconds"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    seconds = 0
+    for part in value.strip('[] ').split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+def _parse_line(line):
+    """Return (speaker or None, start seconds or None, content start) for one line"""
+    m = _BOLD_SPEAKER_RE.match(line)
+    if m:
+        seconds = _seconds(*m.group(2, 3, 4)) if m.group(2) else None
+        return m.group(1).strip(), seconds, m.end()
+    m = _TIMESTAMP_FIRST_RE.match(line)
+    if m:
+        speaker = m.group(4).strip() if m.group(4) else None
+        return speaker, _seconds(*m.group(1, 2, 3)), m.end()
+    m = _SPEAKER_FIRST_RE.match(line)
+    if m:
+        return m.group(1).strip(), _seconds(*m.group(2, 3, 4)), m.end()
+    m = _SPEAKER_LABEL_RE.match(line)
+    if m:
+        return m.group(1), None, m.end()
+    return None, None, 0
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _read_array(typecode, data, pos, count):
+    values = array(typecode)
+    end = pos + count * values.itemsize
+    values.frombytes(data[pos:end])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values, end
+
+class SegmentTable:
+    """Speaker turns of one transcript as parallel arrays"""
+
+    def __init__(self, speakers, starts, speaker_ids, offsets, lengths, mark_seconds, mark_offsets):
+        self.speakers = speakers
+        self.starts = starts
+        self.speaker_ids = speaker_ids
+        self.offsets = offsets
+        self.lengths = lengths
+        self.mark_seconds = mark_seconds
+        self.mark_offsets = mark_offsets
+        # Turn numbers grouped by speaker: by_speaker[speaker_starts[k]:speaker_starts[k + 1]]
+        counts = [0] * (len(speakers) + 1)
+        for speaker_id in speaker_ids:
+            counts[speaker_id + 1] += 1
+        for k in range(len(speakers)):
+            counts[k + 1] += counts[k]
+        self.speaker_starts = counts
+        fill = counts[:-1]
+        self.by_speaker = array('I', bytes(4 * len(speaker_ids)))
+        for turn, speaker_id in enumerate(speaker_ids):
+            self.by_speaker[fill[speaker_id]] = turn
+            fill[speaker_id] += 1
+
+    @classmethod
+    def from_transcript(cls, transcript):
+        speakers = []
+        speaker_index = {}
+        starts = array('I')
+        speaker_ids = array('H')
+        offsets = array('I')
+        lengths = array('I')
+        mark_seconds = array('I')
+        mark_offsets = array('I')
+
+        speaker = ''
+        last_time = 0
+        byte_pos = 0
+        for line in transcript.split('\n'):
+            line_bytes = len(line.encode('utf-8'))
+            if line.strip():
+                name, seconds, content_start = _parse_line(line)
+                content_offset = byte_pos + len(line[:content_start].encode('utf-8'))
+                marks = [(m.start(), _seconds(*m.groups())) for m in _TIMESTAMP_RE.finditer(line)]
+                for position, mark in marks:
+                    mark_seconds.append(max(mark_seconds[-1], mark) if mark_seconds else mark)
+                    if position < content_start:
+                        # A timestamp in the speaker label sets the turn's start
+                        # time and points at the start of its text
+                        last_time = max(last_time, mark)
+                        mark_offsets.append(content_offset)
+                    else:
+                        mark_offsets.append(byte_pos + len(line[:position].encode('utf-8')))
+                if name is None and seconds is None and offsets:
+                    # Continuation paragraph of the current turn
+                    lengths[-1] = byte_pos + line_bytes - offsets[-1]
+                else:
+                    if name is not None:
+                        speaker = name
+                    if speaker not in speaker_index:
+                        speaker_index[speaker] = len(speakers)
+                        speakers.append(speaker)
+                    starts.append(last_time)
+                    speaker_ids.append(speaker_index[speaker])
+                    offsets.append(content_offset)
+                    lengths.append(byte_pos + line_bytes - content_offset)
+                for position, mark in marks:
+                    if position >= content_start:
+                        last_time = max(last_time, mark)
+            byte_pos += line_bytes + 1
+        return cls(speakers, starts, speaker_ids, offsets, lengths, mark_seconds, mark_offsets)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def at_time(self, timestamp):
+        """Return the number of the turn being spoken at timestamp ("00:34:10" or seconds)"""
+        if not self.starts:
+            return None
+        seconds = parse_timestamp(timestamp)
+        if self.mark_seconds:
+            # The last time mark at or before the timestamp, then the turn holding it
+            mark = bisect_right(self.mark_seconds, seconds) - 1
+            if mark >= 0:
+                return max(0, bisect_right(self.offsets, self.mark_offsets[mark]) - 1)
+        return max(0, bisect_right(self.starts, seconds) - 1)
+
+    def offset_at_time(self, timestamp):
+        """Return the byte offset of the last time mark at or before timestamp, or None"""
+        mark = bisect_right(self.mark_seconds, parse_timestamp(timestamp)) - 1
+        return self.mark_offsets[mark] if mark >= 0 else None
+
+    def turns_by(self, speaker):
+        """Return the turn numbers spoken by speaker (exact name), in order"""
+        try:
+            k = self.speakers.index(speaker)
+        except ValueError:
+            return []
+        return list(self.by_speaker[self.speaker_starts[k]:self.speaker_starts[k + 1]])
+
+    def segment(self, turn):
+        return {
+            'start': self.starts[turn],
+            'speaker': self.speakers[self.speaker_ids[turn]],
+            'offset': self.offsets[turn],
+            'length': self.lengths[turn],
+        }
+
+    def text(self, transcript_bytes, turn):
+        """Return the text of one turn, given the UTF-8 encoded transcript"""
+        offset = self.offsets[turn]
+        return transcript_bytes[offset:offset + self.lengths[turn]].decode('utf-8')
+
+    def iter_turns(self, transcript):
+        """Yield (start seconds, speaker, text) for each turn of transcript"""
+        data = transcript.encode('utf-8')
+        for turn in range(len(self)):
+            yield self.starts[turn], self.speakers[self.speaker_ids[turn]], self.text(data, turn)
+
+    def render(self, transcript):
+        """Render transcript as "Speaker: [HH:MM:SS] text" turns from the table, without re-parsing"""
+        return '\n\n'.join(
+            f"{speaker}: [{format_timestamp(start)}] {text}" if speaker else f"[{format_timestamp(start)}] {text}"
+            for start, speaker, text in self.iter_turns(transcript)
+        )
+
+    def to_bytes(self):
+        speakers = '\n'.join(self.speakers).encode('utf-8')
+        return b''.join([
+            len(self).to_bytes(4, 'little'),
+            len(self.mark_seconds).to_bytes(4, 'little'),
+            len(self.speakers).to_bytes(4, 'little'),
+            len(speakers).to_bytes(4, 'little'),
+            speakers,
+            _little_endian(self.starts),
+            _little_endian(self.speaker_ids),
+            _little_endian(self.offsets),
+            _little_endian(self.lengths),
+            _little_endian(self.mark_seconds),
+            _little_endian(self.mark_offsets),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data):
+        count = int.from_bytes(data[0:4], 'little')
+        mark_count = int.from_bytes(data[4:8], 'little')
+        speaker_count = int.from_bytes(data[8:12], 'little')
+        speakers_length = int.from_bytes(data[12:16], 'little')
+        pos = 16 + speakers_length
+        speakers = str(data[16:pos], 'utf-8').split('\n') if speaker_count else []
+        starts, pos = _read_array('I', data, pos, count)
+        speaker_ids, pos = _read_array('H', data, pos, count)
+        offsets, pos = _read_array('I', data, pos, count)
+        lengths, pos = _read_array('I', data, pos, count)
+        mark_seconds, pos = _read_array('I', data, pos, mark_count)
+        mark_offsets, pos = _read_array('I', data, pos, mark_count)
+        return cls(speakers, starts, speaker_ids, offsets, lengths, mark_seconds, mark_offsets)
+
+def build_segment_store(episodes, path=SEGMENTS_PATH):
+    """Write the segment tables of all episodes to one file and return the episode count"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    # Tables are written first; the directory of (offset, length) per episode
+    # id goes at the end, so only one table is held in memory at a time
+    entries = {}
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        pos = len(_MAGIC)
+        for episode in episodes:
+            table = SegmentTable.from_transcript(episode.get('transcript') or '')
+            data = table.to_bytes()
+            entries[str(episode.get('id', ''))] = [pos, len(data)]
+            f.write(data)
+            pos += len(data)
+        directory_data = json.dumps(entries).encode('utf-8')
+        f.write(directory_data)
+        f.write(len(directory_data).to_bytes(8, 'little'))
+    os.replace(tmp_path, path)
+    return len(entries)
+
+class SegmentStore:
+    """Read access to the segment tables written by build_segment_store()"""
+
+    def __init__(self, path=SEGMENTS_PATH):
+        with open(path, 'rb') as f:
+            self._data = memoryview(f.read())
+        if self._data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a segment store")
+        directory_length = int.from_bytes(self._data[-8:], 'little')
+        self._entries = json.loads(bytes(self._data[-8 - directory_length:-8]))
+
+    def __contains__(self, episode_id):
+        return episode_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, episode_id):
+        """Return the SegmentTable of an episode, or None"""
+        entry = self._entries.get(episode_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        return SegmentTable.from_bytes(self._data[offset:offset + length])
+
+def build_segment_store_from_store(store_path=STORE_PATH, segments_path=SEGMENTS_PATH):
+    """Rebuild the segment store from the episode store"""
+    count = build_segment_store(iter_episodes(store_path), segments_path)
+    print(f"Segment tables: {count} episodes written to {segments_path}")
+    return count
+
+def labelled_lines(transcript):
+    """(start byte, end byte, speaker) of each line that starts with a "Name:" label
+
+    Found by splitting each line at its first colon rather than with the
+    parser's patterns, so check_segments() compares two independent reads.
+    """
+    labelled = []
+    byte_pos = 0
+    for line in transcript.split('\n'):
+        line_bytes = len(line.encode('utf-8'))
+        head = _TIMESTAMP_RE.sub('', line, count=1).strip(' \t\u200b*')
+        label, colon, _ = head.partition(':')
+        label = label.replace('**', '').strip()
+        words = label.split()
+        if colon and 0 < len(words) <= 5 and all(word[0].isupper() for word in words):
+            labelled.append((byte_pos, byte_pos + line_bytes, label))
+        byte_pos += line_bytes + 1
+    return labelled
+
+def check_segments(transcript):
+    """Return the problems (an empty list if none) between a transcript's segment table and its labelled lines
+
+    Every labelled line must start a turn of its speaker. The other turns
+    are the text before the first label and lines that start with a
+    timestamp only.
+    """
+    table = SegmentTable.from_transcript(transcript)
+    problems = []
+    turns = set()
+    for start, end, speaker in labelled_lines(transcript):
+        turn = bisect_right(table.offsets, end) - 1
+        if turn < 0 or table.offsets[turn] < start:
+            problems.append(f"{speaker!r} at byte {start} does not start a turn")
+        elif table.speakers[table.speaker_ids[turn]] != speaker:
+            problems.append(f"{speaker!r} at byte {start} starts a turn of {table.speakers[table.speaker_ids[turn]]!r}")
+        else:
+            turns.add(turn)
+    data = transcript.encode('utf-8')
+    for turn in range(len(table)):
+        if turn in turns or turn == 0:
+            continue
+        line_start = data.rfind(b'\n', 0, table.offsets[turn]) + 1
+        if not _TIMESTAMP_FIRST_RE.match(data[line_start:table.offsets[turn] + 1].decode('utf-8', 'replace')):
+            problems.append(f"turn {turn} at byte {table.offsets[turn]} has no label or timestamp")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the segment tables or check the parser against transcripts")
+    parser.add_argument("--build", action="store_true", help=f"rebuild {SEGMENTS_PATH} from {STORE_PATH}")
+    parser.add_argument("--check", nargs="+", metavar="FILE",
+                        help="check that every labelled line of these .docx/.txt transcripts becomes a turn")
+    args = parser.parse_args()
+
+    if args.build:
+        build_segment_store_from_store()
+    failed = False
+    for path in args.check or []:
+        if path.lower().endswith('.docx'):
+            from docx_text import iter_paragraphs
+            transcript = '\n'.join(iter_paragraphs(path))
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                transcript = f.read()
+        problems = check_segments(transcript)
+        table = SegmentTable.from_transcript(transcript)
+        print(f"{'FAIL' if problems else 'ok'}  {path}: {len(table)} turns, "
+              f"{len(labelled_lines(transcript))} labelled lines, {len(table.speakers)} speakers")
+        for problem in problems:
+            print(f"  {problem}")
+        failed = failed or bool(problems)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Extractive episode summaries with TextRank, computed locally.
+
+The transcript is split into sentences (speaker labels and timestamps
+removed) and each sentence becomes a TF-IDF vector over its non-stopword
+terms, with IDF taken across the sentences of the same transcript. The
+vectors are kept as a sparse matrix X in coordinate form (row, column and
+value arrays), rows normalized to unit length, so sentence similarity is
+S = X Xᵀ. TextRank ranks sentences by power iteration over that graph;
+S r is computed as X (Xᵀ r) with two np.bincount products, so S is never
+built and each iteration costs O(non-zeros) even for very long
+transcripts. The top SUMMARY_SENTENCES sentences, skipping near-repeats,
+are returned in transcript order.
+
+It needs no API calls, so it is the summary when AI extraction is disabled,
+fails or is rate limited. summarize_episodes() runs batches of episodes in
+worker processes.
+
+    python summarizer.py [--workers 4] [episode_id ...]
+"""
+
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from episode_store import STORE_PATH, iter_episodes
+from quote_miner import iter_lines
+from search_index import tokenize
+
+SUMMARY_SENTENCES = 3
+MIN_WORDS = 6
+MAX_WORDS = 60
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+# A candidate sharing this fraction of its terms with a chosen sentence is a repeat
+REPEAT_OVERLAP = 0.6
+# Episodes sent to each worker process at a time
+BATCH_SIZE = 8
+
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+[\"”’')]*|$)")
+_TIMESTAMP_RE = re.compile(r"\[\d{1,2}:\d{2}(?::\d{2})?\]")
+
+def split_sentences(transcript):
+    """The sentences of a transcript worth ranking, without speaker labels and timestamps"""
+    sentences = []
+    for _, _, text in iter_lines(transcript):
+        if '[' in text:
+            text = _TIMESTAMP_RE.sub(' ', text)
+        for match in _SENTENCE_RE.finditer(text):
+            words = match.group().split()
+            if MIN_WORDS <= len(words) <= MAX_WORDS:
+                sentences.append(' '.join(words))
+    return sentences
+
+def tfidf_matrix(token_lists):
+    """Return (rows, columns, values, term count) of the row-normalized TF-IDF matrix of tokenized sentences"""
+    vocabulary = {}
+    rows, columns, counts = [], [], []
+    for row, tokens in enumerate(token_lists):
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for token, count in frequencies.items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+            counts.append(count)
+    rows = np.array(rows, dtype=np.int64)
+    columns = np.array(columns, dtype=np.int64)
+    document_frequency = np.bincount(columns, minlength=len(vocabulary))
+    idf = np.log((len(token_lists) + 1) / (document_frequency + 1)) + 1
+    values = np.array(counts, dtype=np.float64) * idf[columns]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(token_lists)))
+    values /= np.where(norms > 0, norms, 1)[rows]
+    return rows, columns, values, len(vocabulary)
+
+def textrank(rows, columns, values, sentence_count, term_count):
+    """TextRank scores of the sentences of a TF-IDF matrix (without self-similarity)"""
+    n = sentence_count
+
+    def similarity_times(vector):
+        # (X Xᵀ - I) vector: rows are unit length, so the diagonal of X Xᵀ is 1
+        # (0 for sentences without terms, which have no entries)
+        projected = np.bincount(columns, weights=values * vector[rows], minlength=term_count)
+        result = np.bincount(rows, weights=values * projected[columns], minlength=n)
+        return result - vector * has_terms
+
+    has_terms = (np.bincount(rows, minlength=n) > 0).astype(np.float64)
+    degree = similarity_times(np.ones(n))
+    connected = degree > 1e-12
+    inverse_degree = np.where(connected, 1 / np.where(connected, degree, 1), 0)
+    scores = np.full(n, 1 / n)
+    for _ in range(MAX_ITERATIONS):
+        # Sentences without neighbours spread their score evenly
+        dangling = scores[~connected].sum() / n
+        updated = (1 - DAMPING) / n + DAMPING * (similarity_times(scores * inverse_degree) + dangling)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+def summarize_transcript(transcript, sentences=SUMMARY_SENTENCES):
+    """Return an extractive summary of a transcript ('' if it has no usable sentences)"""
+    candidates = split_sentences(transcript or '')
+    if not candidates:
+        return ''
+    token_lists = [tokenize(sentence) for sentence in candidates]
+    rows, columns, values, term_count = tfidf_matrix(token_lists)
+    scores = textrank(rows, columns, values, len(candidates), term_count)
+    chosen = []
+    chosen_terms = []
+    # Stable order: ties go to the earlier sentence
+    for index in np.argsort(-scores, kind='stable'):
+        terms = set(token_lists[index])
+        if not terms or any(len(terms & other) >= REPEAT_OVERLAP * len(terms) for other in chosen_terms):
+            continue
+        chosen.append(int(index))
+        chosen_terms.append(terms)
+        if len(chosen) == sentences:
+            break
+    return ' '.join(candidates[index] for index in sorted(chosen))
+
+def _summarize_job(job):
+    episode_id, transcript = job
+    return episode_id, summarize_transcript(transcript)
+
+def summarize_episodes(episodes, workers=None):
+    """Yield (episode id, summary) for episodes, summarizing in worker processes
+
+    Episodes are read in batches of BATCH_SIZE per worker, so only a few
+    transcripts are in memory at once. Results come back in episode order;
+    workers=0 or 1 runs in this process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    jobs = ((episode.get('id'), episode.get('transcript') or '') for episode in episodes)
+    if workers <= 1:
+        yield from map(_summarize_job, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        for job in jobs:
+            batch.append(job)
+            if len(batch) == workers * BATCH_SIZE:
+                yield from executor.map(_summarize_job, batch, chunksize=BATCH_SIZE)
+                batch = []
+        if batch:
+            yield from executor.map(_summarize_job, batch, chunksize=BATCH_SIZE)
+
+def main():
+    parser = argparse.ArgumentParser(description="Print extractive summaries of episodes in the store")
+    parser.add_argument("episode_id", nargs="*", help="episode ids (default: every episode)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    wanted = set(args.episode_id)
+    episodes = (episode for episode in iter_episodes(STORE_PATH) if not wanted or episode.get('id') in wanted)
+    for episode_id, summary in summarize_episodes(episodes, args.workers):
+        print(f"\n{episode_id}:\n  {summary or '(no summary)'}")
+
+if __name__ == "__main__":
+    main()
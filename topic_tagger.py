@@ -0,0 +1,92 @@
+"""
+Single-pass topic tagging with a word-level Aho-Corasick automaton.
+
+The taxonomy (config/topic_taxonomy.json) maps each topic to its keywords;
+keywords may be phrases such as "supply chain". All keywords are compiled
+into one automaton over lowercase word tokens, so a transcript is tagged in a
+single pass over its words no matter how many topics or keywords the
+taxonomy holds. Matching is on whole words: "tech" does not match inside
+"technique", and "AI" does not match inside "said".
+"""
+
+import json
+import re
+from collections import deque
+
+TAXONOMY_PATH = "config/topic_taxonomy.json"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def load_taxonomy(path=TAXONOMY_PATH):
+    """Load a {topic: [keyword, ...]} taxonomy, keeping file order"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class TopicTagger:
+    """Aho-Corasick automaton over word tokens built from a topic taxonomy"""
+
+    def __init__(self, taxonomy):
+        self.topics = list(taxonomy)
+        # State 0 is the root; _goto[state] maps a token to the next state and
+        # _outputs[state] lists the topics of every keyword ending there
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [[]]
+
+        for topic_index, topic in enumerate(self.topics):
+            for keyword in taxonomy[topic]:
+                tokens = _TOKEN_RE.findall(keyword.lower())
+                if not tokens:
+                    continue
+                state = 0
+                for token in tokens:
+                    next_state = self._goto[state].get(token)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._outputs.append([])
+                        self._goto[state][token] = next_state
+                    state = next_state
+                if topic_index not in self._outputs[state]:
+                    self._outputs[state].append(topic_index)
+
+        # Breadth-first pass to set failure links and inherit their outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(token, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+                queue.append(next_state)
+
+    @classmethod
+    def from_file(cls, path=TAXONOMY_PATH):
+        return cls(load_taxonomy(path))
+
+    def count_hits(self, text):
+        """Return {topic: number of keyword occurrences} for topics found in text"""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        counts = [0] * len(self.topics)
+        state = 0
+        for token in _TOKEN_RE.findall(text.lower()):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for topic_index in outputs[state]:
+                counts[topic_index] += 1
+        return {self.topics[i]: count for i, count in enumerate(counts) if count}
+
+    def rank_topics(self, text, limit=None):
+        """Return [(topic, hits), ...] most relevant first
+
+        Topics are ordered by hit count; ties keep taxonomy order.
+        """
+        # count_hits returns topics in taxonomy order and sorted() is stable
+        ranked = sorted(self.count_hits(text).items(), key=lambda item: -item[1])
+        return ranked[:limit] if limit is not None else ranked
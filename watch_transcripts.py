@@ -0,0 +1,367 @@
+"""
+Watch mode: ingest transcripts as they are dropped into Test Scripts.
+
+The folder is watched with inotify (through libc, no extra packages); where
+inotify is not available, or with --poll, it is polled by comparing
+(modification time, size) snapshots. A file that changes is ingested once
+it has been stable for --debounce seconds and, for .docx, is a complete zip
+archive, so half-copied files are never read. Office lock files ("~$...")
+and hidden files are ignored.
+
+Ready files are run through the pipeline stages in batches of at most
+--batch files, with the pipeline's bounded thread pool and in-flight limit.
+New episodes are appended to the store; changed ones replace their stored
+record and deleted files remove it. The finalizers (JSON export and index
+builds) then run once per batch from the store, without re-extracting
+anything; the related-episode index is updated incrementally. The
+extraction cache makes re-ingesting an unchanged file free.
+
+Near-duplicates are tracked as in pipeline.py: every file's MinHash
+signature is kept, and a file superseded by a newer version is not ingested
+(its episode is removed if it had one). When the newer version is deleted,
+the older one is ingested again.
+
+On start, files missing from the store or modified after it are ingested.
+
+    python watch_transcripts.py
+    python watch_transcripts.py --no-ai --poll --interval 2
+"""
+
+import argparse
+import asyncio
+import ctypes
+import os
+import select
+import struct
+import sys
+import time
+import zipfile
+from dedup import cached_minhash, find_duplicates, superseded, version_key
+from episode_store import STORE_PATH, iter_episodes, upsert_episodes
+from extraction_cache import CACHE_PATH, ExtractionCache, content_hash
+from filename_info import TRANSCRIPT_EXTENSIONS, episode_id
+from pipeline import (
+    DEFAULT_FINALIZERS, TEST_SCRIPTS_DIR, Pipeline, build_refreshed_episode, read_transcript_file, refresh_stages,
+    source_text,
+)
+
+DEBOUNCE_SECONDS = 1.0
+POLL_INTERVAL = 1.0
+BATCH_FILES = 16
+
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct('iIII')
+
+def is_transcript(filename):
+    """True for transcript files, not lock, hidden or temporary files"""
+    return filename.lower().endswith(TRANSCRIPT_EXTENSIONS) and not filename.startswith(('~$', '.'))
+
+def file_state(path):
+    """(modification time, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def is_complete(path):
+    """False while a .docx is still being written (its zip directory comes last)"""
+    if not path.lower().endswith('.docx'):
+        return True
+    try:
+        return zipfile.is_zipfile(path)
+    except OSError:
+        return False
+
+class InotifyWatcher:
+    """Report the names of changed files in a folder with Linux inotify"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"cannot watch {directory}")
+
+    def wait(self, timeout):
+        """Return the names changed within timeout seconds, or None if everything must be rescanned"""
+        names = set()
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return names
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                if length:
+                    names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+                offset += length
+
+    def close(self):
+        os.close(self._fd)
+
+class PollingWatcher:
+    """Report the names of changed files in a folder by comparing snapshots"""
+
+    def __init__(self, directory, interval=POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout):
+        """Return the names changed since the last call, checking at most every interval seconds"""
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        previous, self._snapshot = self._snapshot, snapshot
+        return {name for name in snapshot.keys() | previous.keys() if snapshot.get(name) != previous.get(name)}
+
+    def close(self):
+        pass
+
+def create_watcher(directory, poll=False, interval=POLL_INTERVAL):
+    """An inotify watcher, or a polling one when asked for or when inotify is unavailable"""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); polling every {interval}s")
+    return PollingWatcher(directory, interval)
+
+class TranscriptWatcher:
+    """Keep the episode store and artifacts up to date with a transcript folder"""
+
+    def __init__(self, pipeline, directory=TEST_SCRIPTS_DIR, store_path=STORE_PATH, cache=None,
+                 debounce=DEBOUNCE_SECONDS, batch=BATCH_FILES):
+        self.pipeline = pipeline
+        self.directory = directory
+        self.store_path = store_path
+        self.cache = cache
+        self.debounce = debounce
+        self.batch = max(1, batch)
+        self.stored_ids = {str(episode.get('id')) for episode in iter_episodes(store_path, legacy_path=None)}
+        # filename -> (state, time of the last change) while waiting to settle
+        self._pending = {}
+        # filename -> state when last ingested (or found up to date on start)
+        self._ingested = {}
+        # filename -> (signature, newness) for near-duplicate detection
+        self._signatures = {}
+        self._skip = set()
+        self._ready = []
+        self._removed = set()
+
+    def start(self):
+        """Queue the files that are missing from the store or newer than it"""
+        store_state = file_state(self.store_path)
+        store_mtime = store_state[0] if store_state else 0
+        names = sorted(name for name in os.listdir(self.directory) if is_transcript(name))
+        for name in names:
+            state = file_state(self._path(name))
+            if state is None:
+                continue
+            self._signature(name, state)
+            if episode_id(name) in self.stored_ids and state[0] <= store_mtime:
+                self._ingested[name] = state
+            else:
+                self._ready.append(name)
+        self._update_duplicates()
+        print(f"Watching {self.directory}: {len(names)} transcripts, {len(self._ready)} to ingest")
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _signature(self, name, state):
+        """Record the MinHash of a file; state is the file_state() it was found in"""
+        path = self._path(name)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            signature = cached_minhash(lambda: source_text(name, content), content_hash(content), self.cache)
+        except Exception as e:
+            print(f"Could not read {name} for duplicate detection: {e}")
+            signature = None
+        # The caller's state, not a new stat: the file may be gone by now
+        self._signatures[name] = (signature, version_key(name, state[0]))
+
+    def _update_duplicates(self):
+        """Recompute which files are superseded; requeue files that no longer are"""
+        items = ((name, signature, newness) for name, (signature, newness) in self._signatures.items())
+        skip = superseded(find_duplicates(items))
+        for name in skip - self._skip:
+            print(f"Superseded by a newer version: {name}")
+            self._removed.add(episode_id(name))
+        for name in self._skip - skip:
+            if name in self._signatures and name not in self._ready:
+                self._ready.append(name)
+        self._skip = skip
+
+    def notice(self, names):
+        """Record changes to names (None: every file) reported by a watcher"""
+        if names is None:
+            names = set(os.listdir(self.directory)) | set(self._ingested) | set(self._pending)
+        now = time.monotonic()
+        for name in names:
+            if is_transcript(name):
+                self._pending[name] = (file_state(self._path(name)), now)
+
+    def settle(self):
+        """Move pending files that have stopped changing to the ready queue (or handle their deletion)"""
+        now = time.monotonic()
+        changed_duplicates = False
+        for name, (state, changed_at) in list(self._pending.items()):
+            current = file_state(self._path(name))
+            if current != state:
+                self._pending[name] = (current, now)
+                continue
+            if now - changed_at < self.debounce:
+                continue
+            if current is None:
+                del self._pending[name]
+                self._forget(name)
+                changed_duplicates = True
+            elif is_complete(self._path(name)):
+                del self._pending[name]
+                if current != self._ingested.get(name):
+                    self._signature(name, current)
+                    changed_duplicates = True
+                    if name not in self._ready:
+                        self._ready.append(name)
+        if changed_duplicates:
+            self._update_duplicates()
+
+    def _forget(self, name):
+        """A file was deleted: its episode goes unless another file has the same id"""
+        self._signatures.pop(name, None)
+        self._ingested.pop(name, None)
+        if name in self._ready:
+            self._ready.remove(name)
+        same_id = episode_id(name)
+        if not any(episode_id(other) == same_id for other in self._signatures):
+            print(f"Deleted: {name}")
+            self._removed.add(same_id)
+
+    def next_timeout(self):
+        """Seconds until pending files should be checked again"""
+        return self.debounce / 2 if self._pending else 1.0
+
+    def _records(self, names):
+        for name in names:
+            try:
+                record = read_transcript_file(self._path(name))
+            except OSError as e:
+                print(f"Could not read {name}: {e}")
+                continue
+            self._ingested[name] = file_state(self._path(name))
+            yield record
+
+    async def ingest(self):
+        """Ingest up to batch ready files and apply removals; returns the number of episodes written"""
+        names = [name for name in self._ready[:self.batch] if name not in self._skip]
+        del self._ready[:self.batch]
+        # Only ids actually in the store cost a rewrite
+        remove = self._removed & self.stored_ids
+        self._removed = set()
+        if not names and not remove:
+            return 0
+        started = time.perf_counter()
+        failed = len(self.pipeline.failures)
+        episodes = await self.pipeline.process(self._records(names), on_episode=lambda episode: print(f"Processed {episode['id']}"))
+        for failure in self.pipeline.failures[failed:]:
+            print(f"  Failed {failure['id']}: {failure['error']}")
+        added, replaced, removed = upsert_episodes(episodes, self.store_path, remove, self.stored_ids)
+        self.stored_ids.update(str(episode['id']) for episode in episodes)
+        self.stored_ids -= remove
+        self.pipeline.finalize(self.store_path)
+        print(f"Ingested {added} new, {replaced} updated, {removed} removed in {time.perf_counter() - started:.1f}s")
+        return len(episodes)
+
+    @property
+    def has_work(self):
+        return bool(self._ready or self._removed)
+
+async def watch(transcripts, watcher):
+    """Ingest changes reported by watcher until interrupted"""
+    transcripts.start()
+    while True:
+        while transcripts.has_work:
+            await transcripts.ingest()
+        names = await asyncio.to_thread(watcher.wait, transcripts.next_timeout())
+        transcripts.notice(names)
+        transcripts.settle()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Watch the transcript folder and ingest new or changed files")
+    parser.add_argument("--source", default=TEST_SCRIPTS_DIR, help=f"transcript folder (default: {TEST_SCRIPTS_DIR})")
+    parser.add_argument("--no-ai", action="store_true", help="skip AI extraction (rule-based fields only)")
+    parser.add_argument("--no-cache", action="store_true", help=f"recompute every stage instead of reusing {CACHE_PATH}")
+    parser.add_argument("--workers", type=int, default=4, help="threads for the non-AI stages (default: 4)")
+    parser.add_argument("--batch", type=int, default=BATCH_FILES,
+                        help=f"files ingested before the indexes are rebuilt (default: {BATCH_FILES})")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help=f"seconds a file must stay unchanged before it is read (default: {DEBOUNCE_SECONDS})")
+    parser.add_argument("--poll", action="store_true", help="poll the folder instead of using inotify")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help=f"seconds between polls (default: {POLL_INTERVAL})")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.isdir(args.source):
+        print(f"Transcript folder not found at {args.source}")
+        return
+    client = None
+    if not args.no_ai:
+        from llm_client import create_client
+        client = create_client()
+    cache = None if args.no_cache else ExtractionCache()
+    pipeline = Pipeline(
+        refresh_stages(client),
+        build=build_refreshed_episode,
+        finalizers=DEFAULT_FINALIZERS,
+        cache=cache,
+        workers=max(1, args.workers),
+    )
+    watcher = create_watcher(args.source, args.poll, args.interval)
+    transcripts = TranscriptWatcher(pipeline, args.source, cache=cache, debounce=args.debounce, batch=args.batch)
+    try:
+        asyncio.run(watch(transcripts, watcher))
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        watcher.close()
+        if client:
+            print(f"AI requests: {client.stats['requests']}, retries: {client.stats['retries']}, failures: {client.stats['failures']}, cached responses: {client.stats['cache_hits']}")
+            client.close()
+        if cache:
+            cache.close()
+
+if __name__ == "__main__":
+    main()